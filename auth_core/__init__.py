@@ -0,0 +1,7 @@
+"""Building blocks shared by the jwt_auth, session_auth and full_auth apps
+
+Users, password hashing, tenancy, caches, rate limiting and lockout, audit
+logging, metrics, replica routing and the production server live here once;
+each app adds only its own views and method-specific pieces on top. The apps
+put the repository root on sys.path to import it.
+"""
@@ -0,0 +1,240 @@
+from collections import deque
+from flask import current_app, has_request_context, request
+from prometheus_client import Counter
+from sqlalchemy import JSON, Column, Float, Integer, MetaData, String, Table, insert
+from auth_core.tenancy import current_tenant
+import atexit
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+
+AUDIT_EVENTS = Counter(
+    "auth_audit_events_total", "Audit events written", ["event"]
+)
+AUDIT_DROPPED = Counter(
+    "auth_audit_events_dropped_total", "Audit events lost because the buffer was full"
+)
+
+# Kept out of the app's models (and migrations): it is only ever appended to
+audit_metadata = MetaData()
+audit_events = Table(
+    "audit_events",
+    audit_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("ts", Float, nullable=False, index=True),
+    Column("event", String, nullable=False),
+    Column("tenant", String),
+    Column("user_id", String, index=True),
+    Column("ip", String),
+    Column("details", JSON),
+)
+
+
+class JsonlSink:
+    """Appends events to JSONL segment files, gzipping each full segment
+
+    Every process writes its own segments (audit-<pid>-<start>-<n>.jsonl), so
+    workers never interleave lines.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.file = None
+        self.segments = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, events):
+        if self.file is None:
+            self.segments += 1
+            name = f"audit-{os.getpid()}-{int(time.time() * 1000)}-{self.segments}.jsonl"
+            self.file = open(os.path.join(self.directory, name), "a", encoding="utf-8")
+        self.file.writelines(json.dumps(event, separators=(",", ":")) + "\n" for event in events)
+        self.file.flush()
+        if self.file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        if self.file is None:
+            return
+        path = self.file.name
+        self.file.close()
+        self.file = None
+        with open(path, "rb") as source, gzip.open(f"{path}.gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(path)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class TableSink:
+    """Appends events to the audit_events table with one INSERT per batch"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        audit_metadata.create_all(engine, checkfirst=True)
+
+    def write(self, events):
+        rows = [
+            {
+                "ts": event["ts"],
+                "event": event["event"],
+                "tenant": event.get("tenant"),
+                "user_id": None if event.get("user_id") is None else str(event["user_id"]),
+                "ip": event.get("ip"),
+                "details": {
+                    k: v
+                    for k, v in event.items()
+                    if k not in ("ts", "event", "tenant", "user_id", "ip")
+                },
+            }
+            for event in events
+        ]
+        with self.engine.begin() as connection:
+            connection.execute(insert(audit_events), rows)
+
+    def close(self):
+        pass
+
+
+class AuditWriter:
+    """Ring buffer of events drained by a background thread in batches
+
+    Recording an event is a deque append; when the sink falls behind, the
+    oldest events are overwritten rather than slowing requests down.
+    """
+
+    def __init__(self, make_sink, capacity, batch_size, interval, logger):
+        self.make_sink = make_sink
+        self.logger = logger
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        # Threads do not survive a fork, so every worker starts its own
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.buffer = deque(maxlen=self.capacity)
+            self.wakeup = threading.Event()
+            self.sink = self.make_sink()
+            self.thread = threading.Thread(target=self._run, name="audit-flush", daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+            atexit.register(self.close)
+
+    def append(self, event):
+        if self.pid != os.getpid():
+            self._start()
+        if len(self.buffer) == self.capacity:
+            AUDIT_DROPPED.inc()
+        self.buffer.append(event)
+        if len(self.buffer) >= self.batch_size:
+            self.wakeup.set()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # The batch is lost, but the thread keeps draining the buffer
+                self.logger.error(f"Writing audit events failed: {e}")
+
+    def flush(self):
+        """Write every buffered event to the sink"""
+        if self.pid != os.getpid():
+            return
+        with self.lock:
+            while self.buffer:
+                batch = []
+                while self.buffer and len(batch) < self.batch_size:
+                    batch.append(self.buffer.popleft())
+                self.sink.write(batch)
+                for event in batch:
+                    AUDIT_EVENTS.labels(event["event"]).inc()
+
+    def close(self):
+        self.flush()
+        if self.pid == os.getpid():
+            self.sink.close()
+
+
+class AuditLog:
+    """Security audit trail of logins, failures, logouts and account changes
+
+    AUDIT_SINK selects where batches go: "jsonl" (segment files in AUDIT_DIR,
+    gzipped once they reach AUDIT_SEGMENT_BYTES) or "table" (the audit_events
+    table of the app's database). Events are buffered in memory (AUDIT_BUFFER_SIZE)
+    and written every AUDIT_FLUSH_INTERVAL seconds or AUDIT_BATCH_SIZE events,
+    so no request waits for the write.
+    """
+
+    def init_app(self, app, engine=None):
+        """``engine`` returns the database engine for the "table" sink"""
+        app.config.setdefault("AUDIT_ENABLED", True)
+        app.config.setdefault("AUDIT_SINK", "jsonl")
+        app.config.setdefault("AUDIT_DIR", os.path.join(app.instance_path, "audit"))
+        app.config.setdefault("AUDIT_SEGMENT_BYTES", 64 * 1024 * 1024)
+        app.config.setdefault("AUDIT_BUFFER_SIZE", 100000)
+        app.config.setdefault("AUDIT_BATCH_SIZE", 500)
+        app.config.setdefault("AUDIT_FLUSH_INTERVAL", 1.0)
+
+        if not app.config["AUDIT_ENABLED"]:
+            app.extensions["audit"] = None
+            return
+
+        if app.config["AUDIT_SINK"] == "table":
+            if engine is None:
+                raise ValueError("AUDIT_SINK = 'table' needs the database engine")
+            make_sink = lambda: TableSink(engine())
+        elif app.config["AUDIT_SINK"] == "jsonl":
+            directory = app.config["AUDIT_DIR"]
+            segment_bytes = app.config["AUDIT_SEGMENT_BYTES"]
+            make_sink = lambda: JsonlSink(directory, segment_bytes)
+        else:
+            raise ValueError(f"Unknown AUDIT_SINK: {app.config['AUDIT_SINK']!r}")
+
+        app.extensions["audit"] = AuditWriter(
+            make_sink,
+            capacity=app.config["AUDIT_BUFFER_SIZE"],
+            batch_size=app.config["AUDIT_BATCH_SIZE"],
+            interval=app.config["AUDIT_FLUSH_INTERVAL"],
+            logger=app.logger,
+        )
+
+    def record(self, event, user_id=None, **details):
+        """Buffer an audit event for the current request"""
+        writer = current_app.extensions.get("audit")
+        if writer is None:
+            return
+        entry = {
+            "ts": time.time(),
+            "event": event,
+            "tenant": current_tenant(),
+            "user_id": user_id,
+            **details,
+        }
+        if has_request_context():
+            entry["ip"] = request.remote_addr
+            entry["user_agent"] = request.user_agent.string or None
+        writer.append(entry)
+
+    def flush(self):
+        """Write the buffered events of this process now (tests, shutdown)"""
+        writer = current_app.extensions.get("audit")
+        if writer is not None:
+            writer.flush()
+
+
+audit = AuditLog()
@@ -0,0 +1,60 @@
+from collections import OrderedDict
+import threading
+
+
+class LRUCache:
+    """Thread-safe bounded LRU mapping (maxsize 0 stores nothing)"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def evict(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class TenantCaches:
+    """One cache per tenant, so a noisy tenant only evicts its own entries
+
+    Args:
+        factory (callable): creates the cache of a tenant the first time it is used
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.caches = {}
+        self.lock = threading.Lock()
+
+    def for_tenant(self, tenant):
+        cache = self.caches.get(tenant)
+        if cache is None:
+            with self.lock:
+                cache = self.caches.get(tenant)
+                if cache is None:
+                    cache = self.caches[tenant] = self.factory()
+        return cache
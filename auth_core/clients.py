@@ -0,0 +1,51 @@
+from flask import current_app, request
+from functools import wraps
+from auth_core.responses import error_response
+import hmac
+
+
+class ServiceClients:
+    """Internal services allowed to call service-only endpoints
+
+    Services authenticate with HTTP Basic credentials listed in SERVICE_CLIENTS
+    ({client id: secret}); with none configured, those endpoints refuse every
+    request. Other groups of callers (e.g. operators, in ADMIN_CLIENTS) get
+    their own instance and setting.
+    """
+
+    def __init__(self, config_key="SERVICE_CLIENTS", realm="services"):
+        self.config_key = config_key
+        self.realm = realm
+
+    def init_app(self, app):
+        app.config.setdefault(self.config_key, {})
+
+    def authorized_client(self):
+        """ID of the client authenticated by the request, or None"""
+        auth = request.authorization
+        if auth is None or auth.type != "basic" or not auth.username:
+            return None
+        secret = current_app.config[self.config_key].get(auth.username)
+        if secret is None or not hmac.compare_digest(
+            secret.encode(), (auth.password or "").encode()
+        ):
+            return None
+        return auth.username
+
+    def required(self, view):
+        """Decorator rejecting requests without valid client credentials"""
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.authorized_client() is None:
+                response, status = error_response("Invalid client credentials", 401)
+                response.headers["WWW-Authenticate"] = f'Basic realm="{self.realm}"'
+                return response, status
+            return view(*args, **kwargs)
+
+        return wrapper
+
+
+service_clients = ServiceClients()
+# Operators, for admin endpoints such as the user export
+admin_clients = ServiceClients("ADMIN_CLIENTS", realm="admin")
@@ -0,0 +1,55 @@
+import json
+import os
+
+
+def env_list(name, default=""):
+    """Comma-separated environment variable as a list (empty items dropped)"""
+    return [item for item in os.getenv(name, default).split(",") if item]
+
+
+class CoreConfig:
+    """Settings understood by every auth app, with their defaults
+
+    Each app's configuration classes build on this one and add their own
+    database URIs, secrets and method-specific settings.
+    """
+
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_RECORD_QUERIES = True
+    # Key of the message in JSON error responses
+    AUTH_ERROR_KEY = "error"
+    # Products sharing this deployment; requests pick one with the X-Tenant-ID header
+    TENANTS = env_list("TENANTS", "default")
+    DEFAULT_TENANT = "default"
+    # Read-your-writes window after a write, and when replicas are considered too stale
+    SQLALCHEMY_REPLICA_URIS = []
+    REPLICA_STICKY_SECONDS = 10
+    REPLICA_MAX_LAG_SECONDS = 5
+    # Rate limits as (max requests, window in seconds), checked before any DB query or hash
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "true").lower() == "true"
+    RATELIMIT_RULES = {
+        "register": {"ip": (10, 60)},
+        "login": {"ip": (30, 60), "identifier": (10, 60)},
+    }
+    # Failed logins per identifier and per IP before logins are refused; the
+    # lock starts at LOCKOUT_BASE_SECONDS and doubles with each further failure
+    LOCKOUT_ENABLED = os.getenv("LOCKOUT_ENABLED", "true").lower() == "true"
+    LOCKOUT_THRESHOLDS = {"identifier": 5, "ip": 50}
+    LOCKOUT_WINDOW = 15 * 60
+    LOCKOUT_BASE_SECONDS = 30
+    LOCKOUT_MAX_SECONDS = 60 * 60
+    # Unknown identifiers wait about as long as a password check before failing
+    LOGIN_TIMING_PADDING = os.getenv("LOGIN_TIMING_PADDING", "true").lower() == "true"
+    # Auth events are buffered in memory and appended in batches to JSONL
+    # segments in the instance folder ("jsonl") or the audit_events table ("table")
+    AUDIT_SINK = os.getenv("AUDIT_SINK", "jsonl")
+    AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", 1.0))
+    # Operators allowed to call the admin endpoints with HTTP Basic auth ({"id": "secret"})
+    ADMIN_CLIENTS = json.loads(os.getenv("ADMIN_CLIENTS", "{}"))
+    # Rows fetched from the database (and written out) at a time by the user export
+    EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 1000))
+    # Admin user listing; substring search (?q=) needs the trigram indexes of
+    # create-search-indexes (PostgreSQL), so it is off by default
+    USER_LIST_PAGE_SIZE = 50
+    USER_LIST_MAX_PAGE_SIZE = 200
+    USER_SEARCH_CONTAINS = os.getenv("USER_SEARCH_CONTAINS", "false").lower() == "true"
@@ -0,0 +1,87 @@
+from collections import deque
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+from auth_core.metrics import track_time
+import random
+import secrets
+import threading
+import time
+
+
+class PasswordHasher:
+    """Password checks that remember how long they take
+
+    Logins for unknown identifiers wait (sleep) for a duration drawn from
+    recent real checks, so they match the timing distribution of wrong
+    passwords without burning a core on a throwaway hash. Until enough real
+    checks have been seen, a precomputed dummy hash is checked instead, which
+    also provides the first samples.
+    """
+
+    def __init__(self, samples=256, warmup=3):
+        self.dummy_hash = generate_password_hash(secrets.token_urlsafe(16))
+        self.samples = deque(maxlen=samples)
+        self.warmup = warmup
+        self.lock = threading.Lock()
+
+    def check(self, password_hash, password):
+        """check_password_hash, timed"""
+        start = time.perf_counter()
+        with track_time("hash"):
+            matches = check_password_hash(password_hash, password)
+        with self.lock:
+            self.samples.append(time.perf_counter() - start)
+        return matches
+
+    def pad(self):
+        """Take as long as a password check would have, without doing one"""
+        with self.lock:
+            warm = len(self.samples) >= self.warmup
+            duration = random.choice(self.samples) if warm else None
+        if not warm:
+            self.check(self.dummy_hash, "")
+            return
+        time.sleep(duration)
+
+
+class Passwords:
+    """Password hashing service shared by the login and registration views
+
+    With LOGIN_TIMING_PADDING, every worker keeps a PasswordHasher (created
+    before forking, so the dummy hash is computed once) and logins for unknown
+    identifiers take about as long as a wrong password. Without it, they fail
+    immediately.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("LOGIN_TIMING_PADDING", True)
+        app.config.setdefault("LOGIN_TIMING_SAMPLES", 256)
+
+        if app.config["LOGIN_TIMING_PADDING"]:
+            app.extensions["password_hasher"] = PasswordHasher(
+                app.config["LOGIN_TIMING_SAMPLES"]
+            )
+        else:
+            app.extensions["password_hasher"] = None
+
+    def hash(self, password):
+        """Hash a new password"""
+        with track_time("hash"):
+            return generate_password_hash(password)
+
+    def check(self, password_hash, password):
+        """Verify a password, feeding its duration to the padding"""
+        hasher = current_app.extensions["password_hasher"]
+        if hasher is None:
+            with track_time("hash"):
+                return check_password_hash(password_hash, password)
+        return hasher.check(password_hash, password)
+
+    def pad_unknown_user(self):
+        """Delay a failed lookup by about as long as a password check"""
+        hasher = current_app.extensions["password_hasher"]
+        if hasher is not None:
+            hasher.pad()
+
+
+passwords = Passwords()
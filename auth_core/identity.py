@@ -0,0 +1,123 @@
+from dataclasses import dataclass
+from flask import current_app
+from auth_core.cache import LRUCache, TenantCaches
+from auth_core.tenancy import current_tenant
+import time
+
+
+@dataclass(frozen=True)
+class Identity:
+    """Read-only snapshot of a user, safe to share between requests and threads"""
+
+    id: str
+    tenant: str
+    first_name: str
+    last_name: str
+    username: str
+    email: str
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(
+            id=user.id,
+            tenant=user.tenant,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            username=user.username,
+            email=user.email,
+        )
+
+    def profile(self):
+        """Public profile fields, as returned by the profile endpoints"""
+        return {
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "username": self.username,
+            "email": self.email,
+        }
+
+
+class IdentityCache:
+    """Resolves user IDs to identities through a per-worker cache
+
+    Every path that turns a user ID into a user (session cookies, bearer tokens,
+    batch lookups) shares one entry per user, so the user table is read once per
+    IDENTITY_CACHE_TTL seconds per worker. Caches are partitioned per tenant
+    (see TenantCaches); unknown IDs are not cached. IDENTITY_CACHE_SIZE = 0
+    disables it.
+    """
+
+    def init_app(self, app, repository, identity=Identity):
+        app.config.setdefault("IDENTITY_CACHE_SIZE", 10000)
+        app.config.setdefault("IDENTITY_CACHE_TTL", 60)
+
+        size = app.config["IDENTITY_CACHE_SIZE"]
+        app.extensions["identity_cache"] = {
+            "repository": repository,
+            "identity": identity,
+            "caches": TenantCaches(lambda: LRUCache(size)) if size else None,
+        }
+
+    def _cache(self, state):
+        return state["caches"].for_tenant(current_tenant()) if state["caches"] else None
+
+    def _cached(self, cache, user_id):
+        entry = cache.get(user_id) if cache is not None else None
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def _store(self, state, cache, user):
+        identity = state["identity"].from_user(user)
+        if cache is not None:
+            ttl = current_app.config["IDENTITY_CACHE_TTL"]
+            cache.put(user.id, (identity, time.monotonic() + ttl))
+        return identity
+
+    def resolve(self, user_id):
+        """Identity of a user of the current tenant, or None"""
+        state = current_app.extensions["identity_cache"]
+        cache = self._cache(state)
+
+        identity = self._cached(cache, user_id)
+        if identity is not None:
+            return identity
+
+        user = state["repository"].get(user_id, current_tenant())
+        if user is None:
+            return None
+        return self._store(state, cache, user)
+
+    def resolve_many(self, user_ids):
+        """Identities of several users of the current tenant
+
+        Cached users are served from the cache; the rest are loaded together
+        (see UserRepository.get_many).
+
+        Returns:
+            dict: user ID -> Identity, for the IDs that exist
+        """
+        state = current_app.extensions["identity_cache"]
+        cache = self._cache(state)
+
+        found, misses = {}, []
+        for user_id in dict.fromkeys(user_ids):
+            identity = self._cached(cache, user_id)
+            if identity is not None:
+                found[user_id] = identity
+            else:
+                misses.append(user_id)
+
+        if misses:
+            for user in state["repository"].get_many(misses, current_tenant()):
+                found[user.id] = self._store(state, cache, user)
+        return found
+
+    def evict(self, user_id):
+        """Drop a user from this worker's cache (e.g. after it changed)"""
+        caches = current_app.extensions["identity_cache"]["caches"]
+        if caches is not None:
+            caches.for_tenant(current_tenant()).evict(user_id)
+
+
+identities = IdentityCache()
@@ -0,0 +1,94 @@
+from flask import current_app
+from flask_jwt_extended import decode_token
+from auth_core.metrics import track_time
+from auth_core.refresh_tokens import family_key
+from auth_core.revocation import RevocationStore
+from auth_core.tenancy import current_tenant
+import time
+
+# Claims of active tokens included in results (RFC 7662 section 2.2)
+RESULT_CLAIMS = ("sub", "jti", "exp", "iat", "nbf")
+
+INACTIVE = {"active": False}
+
+
+class Introspection:
+    """RFC 7662 token introspection for services that only hold a token
+
+    Only internal services may call it (see ServiceClients). A request may
+    carry up to INTROSPECTION_MAX_TOKENS tokens. Their signatures are checked
+    locally and every blocklist and refresh family lookup goes to Redis in a
+    single pipeline.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("INTROSPECTION_MAX_TOKENS", 100)
+        # Upper bound on how long gateways may cache a result (cacheable mode)
+        app.config.setdefault("INTROSPECTION_CACHE_SECONDS", 30)
+
+    def introspect(self, redis_client, encoded_tokens):
+        """Results for a batch of tokens of the current tenant, in order
+
+        Returns:
+            tuple: (list of result dicts, seconds until the first active one expires)
+        """
+        payloads = []
+        for encoded_token in encoded_tokens:
+            try:
+                payloads.append(decode_token(encoded_token))
+            except Exception:
+                # Bad signature, malformed, expired or signed for another tenant
+                payloads.append(None)
+
+        active = [payload for payload in payloads if payload is not None]
+        if not active:
+            return [dict(INACTIVE) for _ in payloads], None
+
+        store = RevocationStore(redis_client, current_tenant())
+        with track_time("redis"):
+            pipe = redis_client.pipeline(transaction=False)
+            for payload in active:
+                store.queue_check(pipe, payload)
+                if payload.get("type") == "refresh":
+                    # Rotated or logged-out refresh tokens are no longer their family's current one
+                    pipe.get(family_key(payload.get("fam")))
+            replies = iter(pipe.execute())
+
+        results = []
+        expires_in = None
+        now = time.time()
+        for payload in payloads:
+            if payload is None:
+                results.append(dict(INACTIVE))
+                continue
+
+            revoked = store.check_result(payload, next(replies), next(replies))
+            if payload.get("type") == "refresh" and next(replies) != payload["jti"]:
+                revoked = True
+            if revoked:
+                results.append(dict(INACTIVE))
+                continue
+
+            result = {"active": True, "token_type": payload.get("type", "access")}
+            result.update({claim: payload[claim] for claim in RESULT_CLAIMS if claim in payload})
+            results.append(result)
+
+            remaining = max(int(payload["exp"] - now), 0)
+            expires_in = remaining if expires_in is None else min(expires_in, remaining)
+        return results, expires_in
+
+    def cache_control(self, response, cacheable, expires_in):
+        """Let gateways cache the results, never past the first expiry"""
+        if not cacheable:
+            response.headers["Cache-Control"] = "no-store"
+            return response
+
+        max_age = current_app.config["INTROSPECTION_CACHE_SECONDS"]
+        if expires_in is not None:
+            max_age = min(max_age, expires_in)
+        response.headers["Cache-Control"] = f"private, max-age={max_age}"
+        response.vary.update(["Authorization", current_app.config["TENANT_HEADER"]])
+        return response
+
+
+introspection = Introspection()
@@ -0,0 +1,117 @@
+from flask import current_app, jsonify, request
+from sqlalchemy import text
+from auth_core.export import export_columns, plain
+from auth_core.responses import error_response
+from auth_core.tenancy import current_tenant
+import base64
+import binascii
+import json
+
+# Columns covered by trigram indexes for substring search
+TRIGRAM_COLUMNS = ("username", "email")
+
+
+def encode_cursor(order_by, value):
+    raw = json.dumps([order_by, value]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, order_by):
+    """Last value of the previous page, or None if the cursor is invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_order, value = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if cursor_order != order_by or not isinstance(value, str):
+        return None
+    return value
+
+
+def create_trigram_indexes(engine, table):
+    """Create pg_trgm indexes for substring search on a PostgreSQL database
+
+    Returns:
+        bool: False (nothing created) for other databases
+    """
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for column in TRIGRAM_COLUMNS:
+            connection.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table.name}_{column}_trgm "
+                    f'ON "{table.name}" USING gin ({column} gin_trgm_ops)'
+                )
+            )
+    return True
+
+
+class UserListing:
+    """Admin listing and search of a tenant's users
+
+    Pages are keyset-paginated over username or email (see
+    UserRepository.page): the opaque cursor holds the last value of the page,
+    so the next one is a range scan of the (tenant, column) unique index and
+    page 1000 costs the same as page 1. ``prefix`` searches the ordering
+    column through the same index. Substring search (``q``) is off unless
+    USER_SEARCH_CONTAINS is set, which only makes sense with the trigram
+    indexes of create_trigram_indexes (PostgreSQL).
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("USER_LIST_PAGE_SIZE", 50)
+        app.config.setdefault("USER_LIST_MAX_PAGE_SIZE", 200)
+        app.config.setdefault("USER_SEARCH_CONTAINS", False)
+
+    def response(self, repository):
+        """A page of the current tenant's users
+
+        Query parameters: sort (username or email), prefix, q, limit, cursor.
+        """
+        order_by = request.args.get("sort", "username")
+        if order_by not in repository.ORDER_COLUMNS:
+            return error_response(f"sort must be one of: {', '.join(repository.ORDER_COLUMNS)}", 400)
+
+        try:
+            limit = int(request.args.get("limit", current_app.config["USER_LIST_PAGE_SIZE"]))
+        except ValueError:
+            return error_response("limit must be a number", 400)
+        if not 1 <= limit <= current_app.config["USER_LIST_MAX_PAGE_SIZE"]:
+            return error_response("limit is out of range", 400)
+
+        after = None
+        cursor = request.args.get("cursor")
+        if cursor:
+            after = decode_cursor(cursor, order_by)
+            if after is None:
+                return error_response("Invalid cursor", 400)
+
+        contains = request.args.get("q")
+        if contains and not current_app.config["USER_SEARCH_CONTAINS"]:
+            return error_response("Substring search is not enabled", 400)
+
+        columns = export_columns(repository.model)
+        names = [column.name for column in columns]
+        # One extra row tells whether there is a next page
+        rows = repository.page(
+            current_tenant(),
+            columns,
+            order_by=order_by,
+            after=after,
+            prefix=request.args.get("prefix") or None,
+            contains=contains or None,
+            limit=limit + 1,
+        )
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(order_by, rows[-1]._mapping[order_by])
+
+        results = [{name: plain(value) for name, value in zip(names, row)} for row in rows]
+        return jsonify({"users": results, "next_cursor": next_cursor}), 200
+
+
+user_listing = UserListing()
@@ -0,0 +1,224 @@
+from flask import current_app, request
+from auth_core.metrics import track_time
+from auth_core.responses import error_response
+from auth_core.tenancy import current_tenant
+import hashlib
+import math
+import threading
+import time
+
+# Failed-login counters with exponential lockout. Each key is a hash of
+#   failures  - failed attempts since the key was created
+#   locked    - time (ms) until which logins are refused
+# Once a key reaches its threshold, every further failure locks it for
+#   min(base * 2 ** (failures - threshold), max)
+# and the key expires once neither the window nor the lock needs it any more.
+
+# KEYS: counter keys
+# Returns the longest remaining lock in ms (0 if none is locked)
+CHECK_LUA = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local remaining = 0
+for i = 1, #KEYS do
+    local locked = tonumber(redis.call('HGET', KEYS[i], 'locked') or '0')
+    if locked - now_ms > remaining then
+        remaining = locked - now_ms
+    end
+end
+return remaining
+"""
+
+# KEYS: counter keys
+# ARGV: base lock ms, max lock ms, window ms, then the threshold of each key
+# Counts one failure against every key and returns the longest resulting lock in ms
+FAIL_LUA = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local base = tonumber(ARGV[1])
+local max_lock = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local longest = 0
+for i = 1, #KEYS do
+    local threshold = tonumber(ARGV[3 + i])
+    local failures = redis.call('HINCRBY', KEYS[i], 'failures', 1)
+    local ttl = window
+    if failures >= threshold then
+        local lock = math.min(base * 2 ^ (failures - threshold), max_lock)
+        redis.call('HSET', KEYS[i], 'locked', now_ms + lock)
+        ttl = math.max(window, lock + window)
+        if lock > longest then
+            longest = lock
+        end
+    end
+    redis.call('PEXPIRE', KEYS[i], math.floor(ttl))
+end
+return math.floor(longest)
+"""
+
+
+class MemoryBackend:
+    """Per-process counters (used for tests, single-worker setups and Redis outages)"""
+
+    # Drop expired counters once the table grows past this many keys
+    PRUNE_THRESHOLD = 10000
+
+    def __init__(self):
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def check(self, keys):
+        """Longest remaining lock of ``keys`` in seconds (0 if none is locked)"""
+        now = time.time()
+        with self.lock:
+            remaining = [self.counters[key][1] - now for key in keys if key in self.counters]
+        return max([0.0, *remaining])
+
+    def fail(self, keys, thresholds, base, max_lock, window):
+        """Count one failure against every key; returns the longest resulting lock"""
+        now = time.time()
+        longest = 0.0
+        with self.lock:
+            for key, threshold in zip(keys, thresholds):
+                failures, locked, expires = self.counters.get(key, (0, 0.0, 0.0))
+                if expires <= now:
+                    failures, locked = 0, 0.0
+                failures += 1
+                ttl = window
+                if failures >= threshold:
+                    lock = min(base * 2 ** (failures - threshold), max_lock)
+                    locked = now + lock
+                    ttl = lock + window
+                    longest = max(longest, lock)
+                self.counters[key] = (failures, locked, now + ttl)
+
+            if len(self.counters) > self.PRUNE_THRESHOLD:
+                self.counters = {
+                    key: counter for key, counter in self.counters.items() if counter[2] > now
+                }
+        return longest
+
+    def reset(self, keys):
+        with self.lock:
+            for key in keys:
+                self.counters.pop(key, None)
+
+
+class RedisBackend:
+    """Counters shared by every worker through Redis, one round trip per call"""
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.from_url(url, socket_timeout=0.5)
+        self.check_script = self.client.register_script(CHECK_LUA)
+        self.fail_script = self.client.register_script(FAIL_LUA)
+
+    def check(self, keys):
+        with track_time("redis"):
+            return self.check_script(keys=keys) / 1000
+
+    def fail(self, keys, thresholds, base, max_lock, window):
+        args = [int(base * 1000), int(max_lock * 1000), int(window * 1000), *thresholds]
+        with track_time("redis"):
+            return self.fail_script(keys=keys, args=args) / 1000
+
+    def reset(self, keys):
+        with track_time("redis"):
+            self.client.delete(*keys)
+
+
+class LoginLockout:
+    """Locks accounts and client IPs out after repeated failed logins
+
+    Logins are refused once an identifier (per tenant) or an IP reaches its
+    LOCKOUT_THRESHOLDS of failures within LOCKOUT_WINDOW seconds. The lock lasts
+    LOCKOUT_BASE_SECONDS and doubles with every further failure, up to
+    LOCKOUT_MAX_SECONDS; a successful login clears the identifier's counter.
+    Counters live in LOCKOUT_STORAGE_URL (defaults to RATELIMIT_STORAGE_URL);
+    when Redis cannot be reached, each worker falls back to its own counters.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("LOCKOUT_ENABLED", True)
+        app.config.setdefault(
+            "LOCKOUT_STORAGE_URL", app.config.get("RATELIMIT_STORAGE_URL", "memory://")
+        )
+        app.config.setdefault("LOCKOUT_THRESHOLDS", {"identifier": 5, "ip": 50})
+        app.config.setdefault("LOCKOUT_WINDOW", 15 * 60)
+        app.config.setdefault("LOCKOUT_BASE_SECONDS", 30)
+        app.config.setdefault("LOCKOUT_MAX_SECONDS", 60 * 60)
+
+        storage_url = app.config["LOCKOUT_STORAGE_URL"]
+        if storage_url.startswith("memory://"):
+            backend = MemoryBackend()
+        else:
+            backend = RedisBackend(storage_url)
+        app.extensions["login_lockout"] = (backend, MemoryBackend())
+
+    @staticmethod
+    def _digest(value):
+        normalized = str(value).strip().lower().encode()
+        return hashlib.sha256(normalized).hexdigest()[:32]
+
+    def _keys(self, identifier):
+        """(key, threshold) pairs for the identifier and the client IP"""
+        thresholds = current_app.config["LOCKOUT_THRESHOLDS"]
+        keys = []
+        if "identifier" in thresholds and identifier:
+            digest = self._digest(f"{current_tenant()}:{identifier}")
+            keys.append((f"lo:id:{digest}", thresholds["identifier"]))
+        if "ip" in thresholds:
+            digest = self._digest(request.remote_addr or "unknown")
+            keys.append((f"lo:ip:{digest}", thresholds["ip"]))
+        return keys
+
+    def _call(self, method, *args):
+        backend, fallback = current_app.extensions["login_lockout"]
+        try:
+            return getattr(backend, method)(*args)
+        except Exception as e:
+            current_app.logger.warning(f"Lockout store unavailable, using local counters: {e}")
+            return getattr(fallback, method)(*args)
+
+    def check(self, identifier):
+        """Seconds until a login for ``identifier`` is allowed again (0 if it is)"""
+        if not current_app.config["LOCKOUT_ENABLED"]:
+            return 0.0
+        keys = [key for key, _ in self._keys(identifier)]
+        return self._call("check", keys) if keys else 0.0
+
+    def failed(self, identifier):
+        """Count a failed login; returns the lock it caused in seconds (0 if none)"""
+        if not current_app.config["LOCKOUT_ENABLED"]:
+            return 0.0
+        keys = self._keys(identifier)
+        if not keys:
+            return 0.0
+        config = current_app.config
+        return self._call(
+            "fail",
+            [key for key, _ in keys],
+            [threshold for _, threshold in keys],
+            config["LOCKOUT_BASE_SECONDS"],
+            config["LOCKOUT_MAX_SECONDS"],
+            config["LOCKOUT_WINDOW"],
+        )
+
+    def succeeded(self, identifier):
+        """Clear the failures of ``identifier`` (the IP's count is kept)"""
+        if not current_app.config["LOCKOUT_ENABLED"]:
+            return
+        keys = [key for key, _ in self._keys(identifier) if key.startswith("lo:id:")]
+        if keys:
+            self._call("reset", keys)
+
+
+def locked_response(retry_after):
+    """429 telling the client when it may try again"""
+    response, status = error_response("Too many failed login attempts, try again later", 429)
+    response.headers["Retry-After"] = str(math.ceil(retry_after))
+    return response, status
+
+
+lockout = LoginLockout()
@@ -0,0 +1,169 @@
+from flask import Response, g, has_request_context, request
+from contextlib import contextmanager
+from collections import defaultdict
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+import os
+import time
+
+# Buckets tuned for auth endpoints: sub-millisecond token checks up to slow password hashes
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+# Time spent outside Python code, tracked separately so slow endpoints can be explained
+DEPENDENCIES = ("hash", "db", "redis")
+
+REQUEST_LATENCY = Histogram(
+    "auth_request_duration_seconds",
+    "Request latency by route",
+    ["endpoint", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_COUNT = Counter(
+    "auth_requests_total",
+    "Requests by route and status code",
+    ["endpoint", "method", "status"],
+)
+DEPENDENCY_LATENCY = Histogram(
+    "auth_dependency_duration_seconds",
+    "Time per request spent hashing passwords, querying the database or calling Redis",
+    ["endpoint", "dependency"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "auth_requests_in_flight",
+    "Requests currently being handled",
+    multiprocess_mode="livesum",
+)
+
+
+def record_time(dependency, seconds):
+    """Add time spent in a dependency to the current request's breakdown"""
+    if has_request_context() and "dependency_time" in g:
+        g.dependency_time[dependency] += seconds
+
+
+@contextmanager
+def track_time(dependency):
+    """Time a block of code as part of the current request's dependency breakdown"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(dependency, time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_time("db", time.perf_counter() - conn.info["query_start"].pop())
+
+
+def _handle_error(exception_context):
+    # A statement that raised never reaches after_cursor_execute; without this
+    # its start time would stay on the (pooled) connection and skew later queries
+    conn = exception_context.connection
+    if exception_context.execution_context is None or not conn.info.get("query_start"):
+        return
+    record_time("db", time.perf_counter() - conn.info["query_start"].pop())
+
+
+class Metrics:
+    """Prometheus metrics for every request plus a /metrics endpoint
+
+    When PROMETHEUS_MULTIPROC_DIR is set (required under the preforking
+    server), each worker writes its samples to that directory and /metrics
+    aggregates all workers, so any worker can answer a scrape.
+    """
+
+    def __init__(self):
+        self._db_listeners_installed = False
+
+    def init_app(self, app):
+        app.config.setdefault("METRICS_ENABLED", True)
+        if not app.config["METRICS_ENABLED"]:
+            return
+
+        if not self._db_listeners_installed:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Engine, "handle_error", _handle_error)
+            self._db_listeners_installed = True
+
+        app.before_request(self._start_request)
+        app.after_request(self._record_response)
+        app.teardown_request(self._finish_request)
+        app.add_url_rule("/metrics", "metrics", self.export)
+
+    @staticmethod
+    def _endpoint():
+        return request.endpoint or "unmatched"
+
+    def _start_request(self):
+        if request.endpoint == "metrics":
+            return
+        g.metrics_start = time.perf_counter()
+        g.metrics_recorded = False
+        g.dependency_time = defaultdict(float)
+        IN_FLIGHT.inc()
+
+    def _observe(self, status):
+        endpoint, method = self._endpoint(), request.method
+        REQUEST_LATENCY.labels(endpoint, method).observe(
+            time.perf_counter() - g.metrics_start
+        )
+        REQUEST_COUNT.labels(endpoint, method, str(status)).inc()
+        for dependency in DEPENDENCIES:
+            if dependency in g.dependency_time:
+                DEPENDENCY_LATENCY.labels(endpoint, dependency).observe(
+                    g.dependency_time[dependency]
+                )
+        g.metrics_recorded = True
+
+    def _record_response(self, response):
+        if "metrics_start" in g:
+            self._observe(response.status_code)
+        return response
+
+    def _finish_request(self, exc):
+        if "metrics_start" not in g:
+            return
+        # Unhandled exceptions skip after_request, count them as 500s here
+        if not g.metrics_recorded:
+            self._observe(500)
+        IN_FLIGHT.dec()
+
+        # g outlives the request when an app context was already pushed
+        g.pop("metrics_start")
+        g.pop("dependency_time")
+
+    @staticmethod
+    def export():
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def mark_worker_dead(pid):
+    """Discard a dead worker's live gauges (called from the server's child_exit hook)"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+metrics = Metrics()
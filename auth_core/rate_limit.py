@@ -0,0 +1,227 @@
+from flask import current_app, request
+from functools import wraps
+from auth_core.metrics import track_time
+from auth_core.responses import error_response
+import hashlib
+import math
+import threading
+import time
+
+# Sliding-window counter: a hit is allowed while
+#   previous_window_count * (1 - elapsed_fraction) + current_window_count < limit
+# which approximates a true sliding window with two counters per key.
+#
+# KEYS: (current, previous) window key pairs, one pair per rule
+# ARGV: window length in ms for each rule, followed by its limit
+# Returns {1, 0} if allowed (all counters incremented) or {0, retry_after_ms}
+SLIDING_WINDOW_LUA = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local rules = #ARGV / 2
+local retry_after = 0
+
+for i = 1, rules do
+    local window = tonumber(ARGV[2 * i - 1])
+    local limit = tonumber(ARGV[2 * i])
+    local index = math.floor(now_ms / window)
+    local elapsed = (now_ms % window) / window
+    local current_key = KEYS[2 * i - 1] .. ':' .. index
+    local previous_key = KEYS[2 * i] .. ':' .. (index - 1)
+    local current = tonumber(redis.call('GET', current_key) or '0')
+    local previous = tonumber(redis.call('GET', previous_key) or '0')
+    if previous * (1 - elapsed) + current >= limit then
+        local wait = window - (now_ms % window)
+        if wait > retry_after then
+            retry_after = wait
+        end
+    end
+end
+
+if retry_after > 0 then
+    return {0, retry_after}
+end
+
+for i = 1, rules do
+    local window = tonumber(ARGV[2 * i - 1])
+    local current_key = KEYS[2 * i - 1] .. ':' .. math.floor(now_ms / window)
+    if redis.call('INCR', current_key) == 1 then
+        redis.call('PEXPIRE', current_key, window * 2)
+    end
+end
+return {1, 0}
+"""
+
+
+class MemoryBackend:
+    """Per-process sliding-window counters (used for tests and single-worker setups)"""
+
+    # Drop expired windows once the table grows past this many keys
+    PRUNE_THRESHOLD = 10000
+
+    def __init__(self):
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def hit(self, rules):
+        """Check and count one hit against every (key, limit, window) rule atomically
+
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        now = time.time()
+        retry_after = 0.0
+
+        with self.lock:
+            for key, limit, window in rules:
+                index = int(now // window)
+                elapsed = (now % window) / window
+                current = self.counters.get((key, index), 0)
+                previous = self.counters.get((key, index - 1), 0)
+                if previous * (1 - elapsed) + current >= limit:
+                    retry_after = max(retry_after, window - (now % window))
+
+            if retry_after:
+                return False, retry_after
+
+            for key, limit, window in rules:
+                index = int(now // window)
+                self.counters[(key, index)] = self.counters.get((key, index), 0) + 1
+
+            if len(self.counters) > self.PRUNE_THRESHOLD:
+                self._prune(now)
+
+        return True, 0.0
+
+    def _prune(self, now):
+        self.counters = {
+            (key, index): count
+            for (key, index), count in self.counters.items()
+            if index >= int(now // self._window_of(key)) - 1
+        }
+
+    @staticmethod
+    def _window_of(key):
+        return int(key.rsplit(":", 1)[1])
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+
+
+class RedisBackend:
+    """Sliding-window counters shared by every worker through Redis
+
+    All rules for a request are checked and incremented by a single Lua script,
+    so the decision costs one round trip and cannot race between workers.
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.from_url(url, socket_timeout=0.5)
+        self.script = self.client.register_script(SLIDING_WINDOW_LUA)
+
+    def hit(self, rules):
+        keys, args = [], []
+        for key, limit, window in rules:
+            keys.extend([key, key])
+            args.extend([int(window * 1000), limit])
+
+        with track_time("redis"):
+            allowed, retry_after_ms = self.script(keys=keys, args=args)
+        return bool(allowed), retry_after_ms / 1000
+
+    def reset(self):
+        for key in self.client.scan_iter(match="rl:*"):
+            self.client.delete(key)
+
+
+class RateLimiter:
+    """Throttles expensive endpoints per client IP and per submitted identifier
+
+    Rules come from the RATELIMIT_RULES config, e.g.
+        {"login": {"ip": (30, 60), "identifier": (10, 60)}}
+    meaning at most 30 login attempts per minute from one IP and 10 per minute
+    against one username/email. Counters live in RATELIMIT_STORAGE_URL
+    ("memory://" or a redis:// URL).
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("RATELIMIT_ENABLED", True)
+        app.config.setdefault("RATELIMIT_STORAGE_URL", "memory://")
+        app.config.setdefault("RATELIMIT_RULES", {})
+
+        storage_url = app.config["RATELIMIT_STORAGE_URL"]
+        if storage_url.startswith("memory://"):
+            backend = MemoryBackend()
+        else:
+            backend = RedisBackend(storage_url)
+        app.extensions["rate_limiter"] = backend
+
+    @staticmethod
+    def _client_ip():
+        return request.remote_addr or "unknown"
+
+    @staticmethod
+    def _digest(value):
+        normalized = str(value).strip().lower().encode()
+        return hashlib.sha256(normalized).hexdigest()[:32]
+
+    def _rules_for(self, scope, identifier_field):
+        """Build the (key, limit, window) rules that apply to the current request"""
+        configured = current_app.config["RATELIMIT_RULES"].get(scope, {})
+        rules = []
+
+        if "ip" in configured:
+            limit, window = configured["ip"]
+            key = f"rl:{scope}:ip:{self._digest(self._client_ip())}:{window}"
+            rules.append((key, limit, window))
+
+        if "identifier" in configured and identifier_field:
+            data = request.get_json(silent=True)
+            identifier = data.get(identifier_field) if isinstance(data, dict) else None
+            if identifier:
+                limit, window = configured["identifier"]
+                key = f"rl:{scope}:id:{self._digest(identifier)}:{window}"
+                rules.append((key, limit, window))
+
+        return rules
+
+    def check(self, scope, identifier_field=None):
+        """Count the current request and return (allowed, retry_after_seconds)"""
+        if not current_app.config["RATELIMIT_ENABLED"]:
+            return True, 0.0
+
+        rules = self._rules_for(scope, identifier_field)
+        if not rules:
+            return True, 0.0
+
+        backend = current_app.extensions["rate_limiter"]
+        try:
+            return backend.hit(rules)
+        except Exception as e:
+            # Fail open: an unavailable counter store must not lock everyone out
+            current_app.logger.warning(f"Rate limiter unavailable: {e}")
+            return True, 0.0
+
+    def limit(self, scope, identifier_field=None):
+        """Decorator rejecting requests over the limit before the view runs"""
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                allowed, retry_after = self.check(scope, identifier_field)
+                if not allowed:
+                    response, status = error_response(
+                        "Too many requests, try again later", 429
+                    )
+                    response.headers["Retry-After"] = str(math.ceil(retry_after))
+                    return response, status
+                return view(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+
+limiter = RateLimiter()
@@ -0,0 +1,100 @@
+from flask import current_app
+from flask_jwt_extended import create_access_token, create_refresh_token
+from auth_core.metrics import track_time
+from auth_core.tenancy import current_tenant
+from datetime import timedelta
+import time
+import uuid
+
+# Every login starts a refresh token family. Redis keeps one key per family (scoped
+# to the tenant) holding the JTI of the only refresh token that may still be used;
+# it expires together with the family, so logged-out and abandoned sessions cost
+# nothing.
+#
+# KEYS[1]: family key
+# ARGV[1]: JTI of the presented refresh token, ARGV[2]: JTI of its replacement
+# Returns 1 if rotated, 0 if the family is gone (logged out or expired) and -1 if an
+# already rotated token was replayed, in which case the whole family is revoked.
+ROTATE_REFRESH_LUA = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return -1
+end
+redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+return 1
+"""
+
+
+def family_key(family):
+    return f"refresh_family:{current_tenant()}:{family}"
+
+
+def remaining_lifetime(jwt_payload):
+    """Time left until the token expires (revocation entries never need to outlive it)"""
+    return timedelta(seconds=max(int(jwt_payload["exp"] - time.time()), 1))
+
+
+def _create_pair(identity, family, refresh_jti, refresh_expires):
+    access_token = create_access_token(
+        identity=identity, additional_claims={"fam": family}
+    )
+    refresh_token = create_refresh_token(
+        identity=identity,
+        additional_claims={"fam": family, "jti": refresh_jti},
+        expires_delta=refresh_expires,
+    )
+    return access_token, refresh_token
+
+
+def issue_tokens(redis_client, identity):
+    """Start a new refresh token family and return its (access, refresh) tokens"""
+    family = uuid.uuid4().hex
+    refresh_jti = str(uuid.uuid4())
+    refresh_expires = current_app.config["JWT_REFRESH_TOKEN_EXPIRES"]
+
+    with track_time("redis"):
+        redis_client.set(family_key(family), refresh_jti, ex=refresh_expires)
+    return _create_pair(identity, family, refresh_jti, refresh_expires)
+
+
+def rotate_tokens(redis_client, refresh_payload):
+    """Exchange a refresh token for a new pair, invalidating the presented one
+
+    Rotated refresh tokens keep the family's original expiry, so a session cannot be
+    extended forever by refreshing.
+
+    Returns:
+        tuple: (access_token, refresh_token), or None if the token was revoked or reused
+    """
+    family = refresh_payload.get("fam")
+    if not family:
+        return None
+
+    refresh_jti = str(uuid.uuid4())
+    script = redis_client.register_script(ROTATE_REFRESH_LUA)
+    with track_time("redis"):
+        result = script(keys=[family_key(family)], args=[refresh_payload["jti"], refresh_jti])
+
+    if int(result) == -1:
+        current_app.logger.warning(
+            f"Refresh token reuse detected, revoked family {family} "
+            f"of user {refresh_payload['sub']}"
+        )
+    if int(result) != 1:
+        return None
+
+    return _create_pair(
+        refresh_payload["sub"], family, refresh_jti, remaining_lifetime(refresh_payload)
+    )
+
+
+def revoke_family(redis_client, jwt_payload):
+    """Invalidate the refresh token of the session the given token belongs to"""
+    family = jwt_payload.get("fam")
+    if family:
+        with track_time("redis"):
+            redis_client.delete(family_key(family))
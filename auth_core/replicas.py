@@ -0,0 +1,189 @@
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from functools import wraps
+from sqlalchemy import create_engine, event, exc, text
+import random
+import threading
+import time
+
+# Cookie keeping a client on the primary for a short while after it wrote something,
+# so it reads its own writes even if the replicas have not caught up yet
+PIN_COOKIE = "db_pin"
+
+# Seconds a replica is behind the primary (0 when it has replayed everything it
+# received); dialects without an entry are only checked for reachability
+LAG_QUERIES = {
+    "postgresql": (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+}
+
+
+class ReplicaSet:
+    """Replica engines, and which of them are healthy enough to serve reads"""
+
+    def __init__(self, engines, max_lag, check_interval, retry_after):
+        self.engines = dict(engines)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self.down_until = {}
+        self.checked_at = {}
+        self.watched = set()
+        self.lock = threading.Lock()
+
+    def pick(self):
+        """A random healthy replica engine, or None to use the primary"""
+        healthy = [key for key, engine in self.engines.items() if self._is_healthy(key, engine)]
+        return self.engines[random.choice(healthy)] if healthy else None
+
+    def dispose(self):
+        """Drop pooled connections, e.g. after forking a worker"""
+        for engine in self.engines.values():
+            engine.dispose(close=False)
+
+    def mark_down(self, key, reason):
+        with self.lock:
+            self.down_until[key] = time.monotonic() + self.retry_after
+        current_app.logger.warning(f"Replica {key} disabled for {self.retry_after}s: {reason}")
+
+    def _is_healthy(self, key, engine):
+        if key not in self.watched:
+            self._watch(key, engine)
+
+        now = time.monotonic()
+        if self.down_until.get(key, 0) > now:
+            return False
+
+        with self.lock:
+            due = now - self.checked_at.get(key, float("-inf")) >= self.check_interval
+            if due:
+                self.checked_at[key] = now
+        if due:
+            self._check(key, engine)
+        return self.down_until.get(key, 0) <= now
+
+    def _check(self, key, engine):
+        query = LAG_QUERIES.get(engine.dialect.name, "SELECT 0")
+        try:
+            with engine.connect() as connection:
+                lag = connection.execute(text(query)).scalar()
+        except Exception as e:
+            self.mark_down(key, e)
+            return
+        if lag is not None and lag > self.max_lag:
+            self.mark_down(key, f"{lag:.1f}s behind the primary")
+
+    def _watch(self, key, engine):
+        """Disable a replica as soon as one of its queries fails to reach it"""
+
+        def on_error(context):
+            if context.is_disconnect or isinstance(
+                context.sqlalchemy_exception, exc.OperationalError
+            ):
+                self.mark_down(key, context.original_exception)
+
+        with self.lock:
+            if key not in self.watched:
+                event.listen(engine, "handle_error", on_error)
+                self.watched.add(key)
+
+
+def _reads_from_replica():
+    return has_request_context() and g.get("db_read_only") and not g.get("db_wrote")
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of read-only endpoints to a replica
+
+    Writes (flushes and INSERT/UPDATE/DELETE statements), and every statement
+    after a write in the same request, always use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _reads_from_replica():
+            router = current_app.extensions.get("replica_router")
+            engine = router.pick() if router else None
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _remember_write(session, flush_context):
+    if has_request_context():
+        g.db_wrote = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _remember_statement_write(orm_execute_state):
+    # Bulk INSERT/UPDATE/DELETE statements write without flushing; runs before
+    # get_bind, so the statement itself goes to the primary too
+    if has_request_context() and (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        g.db_wrote = True
+
+
+class ReplicaRouter:
+    """Routes the reads of read-only views to the SQLALCHEMY_REPLICA_URIS databases
+
+    Replicas are not SQLAlchemy binds, so create_all and migrations only ever touch
+    the primary. Without replicas every query uses the primary.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("SQLALCHEMY_REPLICA_URIS", [])
+        app.config.setdefault("REPLICA_STICKY_SECONDS", 10)
+        app.config.setdefault("REPLICA_MAX_LAG_SECONDS", 5)
+        app.config.setdefault("REPLICA_CHECK_INTERVAL", 5)
+        app.config.setdefault("REPLICA_RETRY_SECONDS", 30)
+
+        engines = {
+            f"replica_{index}": create_engine(uri, pool_pre_ping=True)
+            for index, uri in enumerate(app.config["SQLALCHEMY_REPLICA_URIS"])
+        }
+        app.extensions["replica_router"] = ReplicaSet(
+            engines,
+            max_lag=app.config["REPLICA_MAX_LAG_SECONDS"],
+            check_interval=app.config["REPLICA_CHECK_INTERVAL"],
+            retry_after=app.config["REPLICA_RETRY_SECONDS"],
+        )
+
+        if engines:
+            app.before_request(self._start_request)
+            app.after_request(self._pin_after_write)
+
+    @staticmethod
+    def _start_request():
+        g.db_read_only = False
+        g.db_wrote = False
+
+    @staticmethod
+    def _pin_after_write(response):
+        if g.get("db_wrote"):
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=current_app.config["REPLICA_STICKY_SECONDS"],
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def read_only(self, view):
+        """Decorator letting the view's queries go to a replica"""
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.db_read_only = PIN_COOKIE not in request.cookies
+            try:
+                return view(*args, **kwargs)
+            finally:
+                g.db_read_only = False
+
+        return wrapper
+
+
+replicas = ReplicaRouter()
@@ -0,0 +1,6 @@
+from flask import current_app, jsonify
+
+
+def error_response(message, status):
+    """JSON error in the app's format, ``{AUTH_ERROR_KEY: message}``"""
+    return jsonify({current_app.config.get("AUTH_ERROR_KEY", "error"): message}), status
@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+
+from gunicorn.app.base import BaseApplication
+
+
+def default_workers():
+    """Gunicorn's recommended worker count for the current machine"""
+    return multiprocessing.cpu_count() * 2 + 1
+
+
+def post_fork(server, worker):
+    """Drop connections inherited from the master so workers never share sockets"""
+    flask_app = server.app.application
+    with flask_app.app_context():
+        for engine in flask_app.extensions["sqlalchemy"].engines.values():
+            engine.dispose(close=False)
+    # Engines the app's extensions created outside Flask-SQLAlchemy
+    for name in ("replica_router", "user_shards"):
+        if name in flask_app.extensions:
+            flask_app.extensions[name].dispose()
+
+
+def worker_exit(server, worker):
+    """Write the audit events still buffered in the exiting worker"""
+    writer = server.app.application.extensions.get("audit")
+    if writer is not None:
+        writer.close()
+
+
+def child_exit(server, worker):
+    """Let the metrics aggregator forget a worker that has exited"""
+    from auth_core.metrics import mark_worker_dead
+
+    mark_worker_dead(worker.pid)
+
+
+class ProductionServer(BaseApplication):
+    """Preforking Gunicorn server hosting an already-created Flask app
+
+    The app is imported once in the master (preload_app) and workers are forked
+    from it, so imported modules are shared copy-on-write instead of being
+    loaded again in every worker. SIGHUP to the master replaces the workers
+    gracefully and SIGTERM drains in-flight requests before exiting. Because
+    the code is preloaded, deploy new code with SIGUSR2 (start a new master)
+    followed by SIGTERM to the old one.
+
+    Args:
+        application (Flask): the app to serve
+        options (dict): Gunicorn settings, e.g. bind, workers, threads
+    """
+
+    def __init__(self, application, options=None):
+        self.application = application
+        self.options = {
+            "preload_app": True,
+            "worker_class": "gthread",
+            "post_fork": post_fork,
+            "worker_exit": worker_exit,
+            "child_exit": child_exit,
+            **(options or {}),
+        }
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        return self.application
+
+
+def serve(application, bind, workers, threads, timeout, graceful_timeout,
+          max_requests, pidfile=None):
+    """Run the app under Gunicorn until the master process is stopped"""
+    options = {
+        "bind": bind,
+        "workers": workers,
+        "threads": threads,
+        "timeout": timeout,
+        "graceful_timeout": graceful_timeout,
+        # Recycle workers periodically (with jitter so they don't restart together)
+        "max_requests": max_requests,
+        "max_requests_jitter": max_requests // 10 if max_requests else 0,
+        "pidfile": pidfile,
+        "accesslog": os.getenv("ACCESS_LOG"),
+    }
+    ProductionServer(application, options).run()
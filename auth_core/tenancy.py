@@ -0,0 +1,123 @@
+from flask import current_app, g, has_request_context, request
+from flask.sessions import SecureCookieSessionInterface
+from auth_core.responses import error_response
+import hashlib
+import hmac
+import re
+import threading
+
+DEFAULT_TENANT = "default"
+
+# Tenant IDs end up in Redis keys, token claims and cookie salts, so keep them simple
+TENANT_PATTERN = re.compile(r"^[a-z0-9_-]{1,64}$")
+
+
+def requested_tenant():
+    """Tenant named by the request's TENANT_HEADER header (not yet validated)"""
+    return request.headers.get(
+        current_app.config["TENANT_HEADER"], current_app.config["DEFAULT_TENANT"]
+    )
+
+
+def current_tenant():
+    """Tenant of the current request (the default tenant outside of requests)"""
+    if has_request_context() and "tenant" in g:
+        return g.tenant
+    return current_app.config.get("DEFAULT_TENANT", DEFAULT_TENANT)
+
+
+class TenantKeyring:
+    """Per-tenant JWT signing keys, resolved once and cached
+
+    Keys come from JWT_TENANT_KEYS ({tenant: secret}). The default tenant falls
+    back to JWT_SECRET_KEY so existing tokens stay valid; any other tenant gets
+    a key derived from JWT_SECRET_KEY, so one tenant's tokens never verify
+    under another tenant's key.
+    """
+
+    def __init__(self, master_key, tenant_keys=None, default_tenant=DEFAULT_TENANT):
+        self.master_key = master_key
+        self.tenant_keys = dict(tenant_keys or {})
+        self.default_tenant = default_tenant
+        self.keys = {}
+        self.lock = threading.Lock()
+
+    def key_for(self, tenant):
+        key = self.keys.get(tenant)
+        if key is None:
+            with self.lock:
+                key = self.keys.setdefault(tenant, self._resolve(tenant))
+        return key
+
+    def _resolve(self, tenant):
+        if tenant in self.tenant_keys:
+            return self.tenant_keys[tenant]
+        if tenant == self.default_tenant:
+            return self.master_key
+        return hmac.new(
+            self.master_key.encode(), f"jwt:{tenant}".encode(), hashlib.sha256
+        ).hexdigest()
+
+
+class TenantSessionInterface(SecureCookieSessionInterface):
+    """Signs session cookies with a per-tenant salt
+
+    A cookie issued for one tenant fails signature verification for any other,
+    so a session can never be replayed across products. The session is opened
+    before request hooks run, hence the tenant is read from the header here.
+    """
+
+    def get_signing_serializer(self, app):
+        if has_request_context():
+            tenant = requested_tenant()
+        else:
+            tenant = app.config["DEFAULT_TENANT"]
+        serializer = super().get_signing_serializer(app)
+        if serializer is not None and tenant != app.config["DEFAULT_TENANT"]:
+            # Keep the default tenant's salt so existing sessions stay valid
+            serializer.salt = f"{self.salt}:{tenant}"
+        return serializer
+
+
+class Tenancy:
+    """Resolves the tenant of each request from the TENANT_HEADER header
+
+    Requests without the header belong to DEFAULT_TENANT; tenants missing from
+    TENANTS are rejected before any view runs. TENANT_SESSION_COOKIES salts
+    session cookies per tenant (for apps that log users in with the session).
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("DEFAULT_TENANT", DEFAULT_TENANT)
+        app.config.setdefault("TENANTS", [app.config["DEFAULT_TENANT"]])
+        app.config.setdefault("TENANT_HEADER", "X-Tenant-ID")
+        app.config.setdefault("TENANT_SESSION_COOKIES", False)
+        app.config.setdefault("JWT_TENANT_KEYS", {})
+
+        for tenant in app.config["TENANTS"]:
+            if not TENANT_PATTERN.match(tenant):
+                raise ValueError(f"Invalid tenant ID: {tenant!r}")
+
+        app.extensions["tenant_keyring"] = TenantKeyring(
+            app.config.get("JWT_SECRET_KEY"),
+            app.config["JWT_TENANT_KEYS"],
+            app.config["DEFAULT_TENANT"],
+        )
+        if app.config["TENANT_SESSION_COOKIES"]:
+            app.session_interface = TenantSessionInterface()
+        app.before_request(self._resolve_tenant)
+
+    @staticmethod
+    def _resolve_tenant():
+        tenant = requested_tenant()
+        if tenant not in current_app.config["TENANTS"]:
+            return error_response("Unknown tenant", 400)
+        g.tenant = tenant
+
+
+def tenant_key():
+    """Signing key of the current tenant"""
+    return current_app.extensions["tenant_keyring"].key_for(current_tenant())
+
+
+tenancy = Tenancy()
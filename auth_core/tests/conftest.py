@@ -0,0 +1,51 @@
+import pytest
+import sys
+import os
+
+# Add the repository root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DateTime, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Optional
+from datetime import datetime
+from auth_core.config import CoreConfig
+from auth_core.hashing import passwords
+from auth_core.tenancy import tenancy
+from auth_core.users import UserColumns
+
+db = SQLAlchemy()
+
+
+class CoreUser(UserColumns, db.Model):
+    """Minimal user table built on the shared columns"""
+
+    __tablename__ = "core_users"
+    __table_args__ = (
+        UniqueConstraint("tenant", "username", name="uq_core_users_tenant_username"),
+        UniqueConstraint("tenant", "email", name="uq_core_users_tenant_email"),
+    )
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+@pytest.fixture
+def app():
+    """Bare Flask app with the core extensions and an in-memory database"""
+    app = Flask(__name__)
+    app.config.from_object(CoreConfig)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+        TENANTS=["default", "acme"],
+        LOGIN_TIMING_PADDING=False,
+    )
+    tenancy.init_app(app)
+    passwords.init_app(app)
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,384 @@
+import pytest
+import csv
+import io
+import json
+import os
+import sys
+import tracemalloc
+from auth_core.cache import LRUCache, TenantCaches
+from auth_core.export import export_columns, user_export
+from auth_core.listing import decode_cursor, encode_cursor
+from auth_core.hashing import PasswordHasher, passwords
+from auth_core.identity import identities
+from auth_core.users import UserRepository, prefix_end
+from auth_core.validation import is_strong_password, is_valid_email, password_problem
+from conftest import CoreUser, db
+
+
+def add_user(users, username, tenant="default", **fields):
+    return users.add(
+        CoreUser(
+            tenant=tenant,
+            first_name="Test",
+            last_name="User",
+            username=username,
+            email=f"{username}@example.com",
+            password_hash=passwords.hash("StrongPass123!"),
+            **fields,
+        )
+    )
+
+
+class TestLRUCache:
+    """Test the bounded cache shared by the lookup and decode caches"""
+
+    def test_evicts_least_recently_used(self):
+        """Test reading an entry keeps it over older ones"""
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert len(cache) == 2
+
+    def test_zero_size_stores_nothing(self):
+        """Test a disabled cache never holds entries"""
+        cache = LRUCache(0)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+
+    def test_tenants_get_separate_caches(self):
+        """Test one tenant filling its cache leaves the others alone"""
+        caches = TenantCaches(lambda: LRUCache(1))
+        caches.for_tenant("acme").put("k", "acme")
+        caches.for_tenant("globex").put("k", "globex")
+        caches.for_tenant("globex").put("other", "globex")
+
+        assert caches.for_tenant("acme").get("k") == "acme"
+        assert caches.for_tenant("acme") is caches.for_tenant("acme")
+
+
+class TestValidation:
+    """Test the email and password rules shared by every app"""
+
+    def test_email_format(self):
+        assert is_valid_email("user@example.com")
+        assert not is_valid_email("user@example")
+        assert not is_valid_email(None)
+
+    @pytest.mark.parametrize(
+        "password, problem",
+        [
+            ("Sh0rt", "Password must be at least 8 characters"),
+            ("lowercase123", "Password must contain at least one uppercase letter"),
+            ("UPPERCASE123", "Password must contain at least one lowercase letter"),
+            ("NoNumbersHere", "Password must contain at least one number"),
+            ("StrongPass123", None),
+        ],
+    )
+    def test_password_strength(self, password, problem):
+        assert password_problem(password) == problem
+        assert is_strong_password(password) is (problem is None)
+
+
+class TestUserRepository:
+    """Test lookups are scoped to a tenant and to active users"""
+
+    def test_find_by_username_or_email(self, app):
+        users = UserRepository(db, CoreUser)
+        user = add_user(users, "alice")
+        db.session.commit()
+
+        assert users.find("default", "alice") is user
+        assert users.find("default", "alice@example.com") is user
+        assert users.find("default", "alice@example.com", kinds=("username",)) is None
+        assert users.find("acme", "alice") is None
+
+    def test_get_checks_tenant(self, app):
+        users = UserRepository(db, CoreUser)
+        user = add_user(users, "alice", tenant="acme")
+        db.session.commit()
+
+        assert users.get(user.id) is user
+        assert users.get(user.id, "acme") is user
+        assert users.get(user.id, "default") is None
+
+    def test_taken(self, app):
+        users = UserRepository(db, CoreUser)
+        add_user(users, "alice")
+        db.session.commit()
+
+        assert users.taken("default", "alice", "new@example.com") == "username"
+        assert users.taken("default", "new", "alice@example.com") == "email"
+        assert users.taken("default", "new", "new@example.com") is None
+        assert users.taken("acme", "alice", "alice@example.com") is None
+
+    def test_inactive_users_are_hidden(self, app):
+        """Test the active criteria applies to lookups but not to taken"""
+        from datetime import datetime
+
+        users = UserRepository(db, CoreUser, active=lambda m: m.deleted_at.is_(None))
+        user = add_user(users, "alice", deleted_at=datetime.utcnow())
+        db.session.commit()
+
+        assert users.find("default", "alice") is None
+        assert users.get(user.id) is None
+        assert users.taken("default", "alice", "x@example.com") == "username"
+
+    def test_get_many_in_chunks(self, app, monkeypatch):
+        """Test batches split into IN queries still find every user of the tenant"""
+        users = UserRepository(db, CoreUser)
+        monkeypatch.setattr(users, "IN_CHUNK", 2)
+        ids = [add_user(users, f"user{i}").id for i in range(5)]
+        other = add_user(users, "other", tenant="acme").id
+        db.session.commit()
+
+        found = users.get_many(ids + [other, "unknown"], "default")
+        assert sorted(user.id for user in found) == sorted(ids)
+
+
+class TestIdentityCache:
+    """Test identities are resolved through the per-worker cache"""
+
+    @pytest.fixture
+    def users(self, app):
+        users = UserRepository(db, CoreUser)
+        identities.init_app(app, users)
+        return users
+
+    def test_resolve_caches_identity(self, app, users):
+        user_id = add_user(users, "alice").id
+        db.session.commit()
+
+        identity = identities.resolve(user_id)
+        assert identity.profile()["username"] == "alice"
+        db.session.delete(users.get(user_id))
+        db.session.commit()
+        assert identities.resolve(user_id) is identity
+
+        identities.evict(user_id)
+        assert identities.resolve(user_id) is None
+
+    def test_resolve_many_loads_only_misses(self, app, users, monkeypatch):
+        ids = [add_user(users, f"user{i}").id for i in range(3)]
+        db.session.commit()
+        identities.resolve(ids[0])
+
+        loaded = []
+        get_many = users.get_many
+
+        def counting_get_many(user_ids, tenant):
+            loaded.append(list(user_ids))
+            return get_many(user_ids, tenant)
+
+        monkeypatch.setattr(users, "get_many", counting_get_many)
+        found = identities.resolve_many(ids + ["unknown"])
+
+        assert sorted(found) == sorted(ids)
+        assert loaded == [[ids[1], ids[2], "unknown"]]
+
+
+class TestPasswords:
+    """Test the hashing service and its login timing padding"""
+
+    def test_hash_and_check(self, app):
+        password_hash = passwords.hash("StrongPass123!")
+        assert passwords.check(password_hash, "StrongPass123!")
+        assert not passwords.check(password_hash, "wrong")
+
+    def test_padding_disabled(self, app):
+        """Test unknown users fail immediately without padding"""
+        assert app.extensions["password_hasher"] is None
+        passwords.pad_unknown_user()
+
+    def test_pad_samples_real_checks(self, monkeypatch):
+        """Test a warm hasher sleeps for a recorded duration instead of hashing"""
+        import importlib
+
+        module = importlib.import_module("auth_core.hashing")
+        hasher = PasswordHasher(samples=4, warmup=2)
+        hasher.pad()
+        assert len(hasher.samples) == 1
+
+        # Replace the real (random) duration so the sampled one is known
+        hasher.samples[0] = 0.01
+        hasher.samples.append(0.01)
+        slept = []
+        monkeypatch.setattr(module.time, "sleep", slept.append)
+        hasher.pad()
+        assert slept == [0.01]
+
+
+class TestUserExport:
+    """Test users are streamed out chunk by chunk, without password hashes"""
+
+    # Export the million-row fixture with EXPORT_FIXTURE_ROWS=1000000
+    FIXTURE_ROWS = int(os.getenv("EXPORT_FIXTURE_ROWS", 20000))
+
+    @pytest.fixture
+    def users(self, app):
+        users = UserRepository(db, CoreUser, active=lambda m: m.deleted_at.is_(None))
+        user_export.init_app(app)
+        return users
+
+    def load(self, count, tenant="default"):
+        """Bulk-insert count users without going through the ORM"""
+        from sqlalchemy import insert
+
+        for start in range(0, count, 10000):
+            db.session.execute(
+                insert(CoreUser),
+                [
+                    {
+                        "id": f"{tenant}-{i:07d}",
+                        "tenant": tenant,
+                        "first_name": "Export",
+                        "last_name": f"User {i}",
+                        "username": f"{tenant}{i:07d}",
+                        "email": f"{tenant}{i:07d}@example.com",
+                        "password_hash": "not-a-real-hash",
+                    }
+                    for i in range(start, min(start + 10000, count))
+                ],
+            )
+        db.session.commit()
+
+    def export(self, users, fmt, **kwargs):
+        output = io.StringIO()
+        rows, _ = user_export.write(users, "default", fmt, output, **kwargs)
+        return rows, output.getvalue()
+
+    def test_csv(self, users):
+        from datetime import datetime
+
+        self.load(3)
+        self.load(2, tenant="acme")
+        users.get("default-0000001").deleted_at = datetime.utcnow()
+        db.session.commit()
+
+        rows, text = self.export(users, "csv")
+        records = list(csv.DictReader(io.StringIO(text)))
+        assert rows == 2
+        assert [record["username"] for record in records] == ["default0000000", "default0000002"]
+        assert "password_hash" not in records[0]
+        assert "not-a-real-hash" not in text
+
+    def test_jsonl_and_columnar_agree(self, users):
+        self.load(5)
+        _, jsonl = self.export(users, "jsonl", chunk_size=2)
+        _, columnar = self.export(users, "columnar", chunk_size=2)
+
+        records = [json.loads(line) for line in jsonl.splitlines()]
+        header, *groups = [json.loads(line) for line in columnar.splitlines()]
+        assert [group["rows"] for group in groups] == [2, 2, 1]
+        assert "password_hash" not in header["columns"]
+        rebuilt = [
+            dict(zip(header["columns"], values))
+            for group in groups
+            for values in zip(*(group["columns"][name] for name in header["columns"]))
+        ]
+        assert rebuilt == records
+
+    def test_empty_table(self, users):
+        rows, text = self.export(users, "csv")
+        assert rows == 0
+        assert text.splitlines() == [
+            "deleted_at,id,tenant,first_name,last_name,username,email"
+        ]
+        assert self.export(users, "jsonl") == (0, "")
+        with pytest.raises(ValueError):
+            user_export.stream(users, "default", "parquet")
+
+    def test_memory_stays_under_chunk_ceiling(self, users):
+        """Test peak memory depends on the chunk size, not on the table size"""
+        self.load(self.FIXTURE_ROWS)
+        written = [0]
+
+        class Sink:
+            def write(self, piece):
+                written[0] += len(piece)
+
+        tracemalloc.start()
+        try:
+            rows, elapsed = user_export.write(users, "default", "csv", Sink(), chunk_size=500)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        assert rows == self.FIXTURE_ROWS
+        # Holding the output alone would take more than the ceiling
+        assert written[0] > 1024 * 1024
+        assert peak < 1024 * 1024, f"peak {peak} bytes for {rows} rows ({rows / elapsed:.0f} rows/s)"
+
+
+class TestUserListing:
+    """Test keyset pagination and prefix search over the unique indexes"""
+
+    @pytest.fixture
+    def users(self, app):
+        users = UserRepository(db, CoreUser)
+        for name in ["carol", "alice", "bob", "alfred", "dave", "al_x"]:
+            add_user(users, name)
+        add_user(users, "alina", tenant="acme")
+        db.session.commit()
+        return users
+
+    def usernames(self, rows):
+        return [row._mapping["username"] for row in rows]
+
+    def test_pages_cover_every_user_once(self, users):
+        columns = export_columns(CoreUser)
+        seen, after = [], None
+        while True:
+            rows = users.page("default", columns, after=after, limit=2)
+            if not rows:
+                break
+            seen.extend(self.usernames(rows))
+            after = rows[-1]._mapping["username"]
+        assert seen == ["al_x", "alfred", "alice", "bob", "carol", "dave"]
+
+    def test_prefix_and_contains(self, users):
+        columns = export_columns(CoreUser)
+        assert self.usernames(users.page("default", columns, prefix="al")) == ["al_x", "alfred", "alice"]
+        assert self.usernames(users.page("default", columns, order_by="email", prefix="b")) == ["bob"]
+        assert self.usernames(users.page("default", columns, contains="L_")) == ["al_x"]
+        assert self.usernames(users.page("default", columns, contains="ALI")) == ["alice"]
+
+    def test_prefix_ending_in_the_last_code_point(self, users):
+        """Test a prefix with no successor character scans to the end of the range"""
+        last = chr(sys.maxunicode)
+        add_user(users, f"z{last}{last}a")
+        db.session.commit()
+
+        assert prefix_end(f"z{last}") == "{"
+        assert prefix_end(last * 2) is None
+        assert prefix_end("\ud7ff") == "\ue000"
+        columns = export_columns(CoreUser)
+        assert self.usernames(users.page("default", columns, prefix=f"z{last}")) == [f"z{last}{last}a"]
+        assert self.usernames(users.page("default", columns, prefix=last)) == []
+
+    @pytest.mark.parametrize("order_by", ["username", "email"])
+    def test_deep_pages_use_the_unique_index(self, users, order_by):
+        """Test a page is an index range scan with no sort step"""
+        from sqlalchemy import text
+
+        statement = users._page_select(
+            "default", export_columns(CoreUser), order_by, after="m", prefix="mallory", limit=50
+        )
+        compiled = statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+        plan = " ".join(
+            row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+        )
+        # SQLite names the (tenant, column) unique constraint's index sqlite_autoindex_*
+        assert "SEARCH core_users USING INDEX" in plan
+        assert f"(tenant=? AND {order_by}>? AND {order_by}<?)" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor("email", "bob@example.com")
+        assert decode_cursor(cursor, "email") == "bob@example.com"
+        assert decode_cursor(cursor, "username") is None
+        assert decode_cursor("not a cursor", "email") is None
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from datetime import timedelta
+from flask import current_app
+from flask_jwt_extended import JWTManager
+from flask_jwt_extended.config import config
+from auth_core.cache import TenantCaches
+from auth_core.tenancy import current_tenant
+import hashlib
+import threading
+import time
+
+
+def token_digest(encoded_token):
+    return hashlib.blake2b(encoded_token.encode(), digest_size=16).digest()
+
+
+class DecodeCache:
+    """Bounded LRU of verified claims keyed by token digest, valid until exp"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # digest -> claims
+        self.digests = {}  # jti -> digest, for eviction on logout
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, leeway=0):
+        with self.lock:
+            claims = self.entries.get(key)
+            if claims is None:
+                self.misses += 1
+                return None
+            if claims["exp"] + leeway <= time.time():
+                # Let the regular decode raise the proper expiry error
+                self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(claims)
+
+    def put(self, key, claims):
+        if "exp" not in claims:
+            return  # never cache tokens that do not expire
+        with self.lock:
+            self.entries[key] = claims
+            self.digests[claims["jti"]] = key
+            while len(self.entries) > self.maxsize:
+                _, oldest = self.entries.popitem(last=False)
+                self.digests.pop(oldest["jti"], None)
+
+    def evict(self, jti):
+        with self.lock:
+            key = self.digests.get(jti)
+            if key is not None:
+                self._remove(key)
+
+    def _remove(self, key):
+        claims = self.entries.pop(key, None)
+        if claims is not None:
+            self.digests.pop(claims["jti"], None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.digests.clear()
+
+
+class CachingJWTManager(JWTManager):
+    """JWTManager that skips signature checks for tokens it has already verified
+
+    A client sending the same token on every request only pays for the HMAC and
+    JSON parsing once per worker. The cache only replaces decoding: the
+    blocklist check still runs on every request, so revocations made by other
+    workers take effect immediately. JWT_DECODE_CACHE_SIZE (per tenant) = 0
+    disables it.
+    """
+
+    def init_app(self, app, add_context_processor=False):
+        super().init_app(app, add_context_processor)
+        app.config.setdefault("JWT_DECODE_CACHE_SIZE", 10000)
+        size = app.config["JWT_DECODE_CACHE_SIZE"]
+        app.extensions["jwt_decode_cache"] = (
+            TenantCaches(lambda: DecodeCache(size)) if size else None
+        )
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        caches = current_app.extensions.get("jwt_decode_cache")
+        if caches is None or csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        # Partitioning by tenant also means a token verified under one tenant's key
+        # is never served from the cache for another tenant
+        cache = caches.for_tenant(current_tenant())
+
+        leeway = config.leeway
+        if isinstance(leeway, timedelta):
+            leeway = leeway.total_seconds()
+
+        key = token_digest(encoded_token)
+        claims = cache.get(key, leeway=leeway)
+        if claims is None:
+            claims = super()._decode_jwt_from_config(encoded_token)
+            cache.put(key, dict(claims))
+        return claims
+
+    def evict(self, jwt_payload):
+        """Drop a revoked token from this worker's cache"""
+        caches = current_app.extensions.get("jwt_decode_cache")
+        if caches is not None:
+            caches.for_tenant(current_tenant()).evict(jwt_payload["jti"])
@@ -0,0 +1,194 @@
+from sqlalchemy import String, or_, select
+from sqlalchemy.orm import Mapped, mapped_column
+from auth_core.tenancy import DEFAULT_TENANT
+from auth_core.validation import generate_uuid
+import sys
+
+
+class UserColumns:
+    """Columns shared by the user tables of every app (a declarative mixin)
+
+    Attributes:
+        id (str): a 36-character string converted from UUID (a string so it can be a JWT subject)
+        tenant (str): product the account belongs to
+        first_name (str): user's first name
+        last_name (str): user's last name
+        username (str): username that must be unique within the tenant
+        email (str): valid email address, unique within the tenant
+        password_hash (str): user's password that has been hashed for security
+    """
+
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    tenant: Mapped[str] = mapped_column(
+        String, nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT
+    )
+    first_name: Mapped[str] = mapped_column(String, nullable=False)
+    last_name: Mapped[str] = mapped_column(String, nullable=False)
+    username: Mapped[str] = mapped_column(String, nullable=False)
+    email: Mapped[str] = mapped_column(String, nullable=False)
+    password_hash: Mapped[str] = mapped_column(String, nullable=False)
+
+    def __repr__(self):
+        return f"User {self.first_name} {self.last_name}: \n ID: {self.id} \n username: {self.username} \n email: {self.email}"
+
+
+def prefix_end(prefix):
+    """Smallest string after every string starting with prefix (for range scans)
+
+    Returns:
+        str: None if there is none (the prefix is only U+10FFFF characters)
+    """
+    # The last code point has no successor, so carry over to the one before it
+    stripped = prefix.rstrip(chr(sys.maxunicode))
+    if not stripped:
+        return None
+    code = ord(stripped[-1]) + 1
+    # Surrogates cannot be encoded for the database; skip past them
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000
+    return stripped[:-1] + chr(code)
+
+
+def like_escape(value):
+    """Escape LIKE wildcards, with backslash as the escape character"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class UserRepository:
+    """Loads and stores the users of one app
+
+    Every lookup is scoped to a tenant and served by the (tenant, username) and
+    (tenant, email) unique indexes.
+
+    Args:
+        db (SQLAlchemy): the app's Flask-SQLAlchemy instance
+        model (class): the user model, built on UserColumns
+        active (callable): returns extra criteria for users that may still sign
+            in (e.g. not soft-deleted); None means every row counts
+    """
+
+    # IDs per IN (...) list, under the bound-parameter limits of SQLite and PostgreSQL
+    IN_CHUNK = 500
+    # Columns listings can be ordered by; each has a (tenant, column) unique index
+    ORDER_COLUMNS = ("username", "email")
+
+    def __init__(self, db, model, active=None):
+        self.db = db
+        self.model = model
+        self.active = active
+
+    def _select(self, *criteria, columns=None):
+        statement = select(*(columns or [self.model])).where(*criteria)
+        if self.active is not None:
+            statement = statement.where(self.active(self.model))
+        return statement
+
+    def find(self, tenant, identifier, kinds=("username", "email")):
+        """Find a user of the tenant by username and/or email"""
+        matches = [getattr(self.model, kind) == identifier for kind in kinds]
+        return self.db.session.scalars(
+            self._select(self.model.tenant == tenant, or_(*matches))
+        ).first()
+
+    def get(self, user_id, tenant=None):
+        """Load a user by ID (of the given tenant, if any)"""
+        criteria = [self.model.id == user_id]
+        if tenant is not None:
+            criteria.append(self.model.tenant == tenant)
+        return self.db.session.scalars(self._select(*criteria)).first()
+
+    def get_many(self, user_ids, tenant):
+        """Load the users of a tenant with the given IDs
+
+        One ``WHERE id IN (...)`` query per IN_CHUNK IDs (databases cap the
+        number of bound parameters).
+
+        Returns:
+            list: the users found, in no particular order
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        found = []
+        for start in range(0, len(user_ids), self.IN_CHUNK):
+            chunk = user_ids[start : start + self.IN_CHUNK]
+            found.extend(
+                self.db.session.scalars(
+                    self._select(self.model.tenant == tenant, self.model.id.in_(chunk))
+                )
+            )
+        return found
+
+    def stream(self, tenant, columns, chunk_size=1000):
+        """Rows of the given columns for every user of a tenant, chunk by chunk
+
+        The rows come from a server-side cursor (``yield_per``), so memory
+        holds one chunk at a time however large the table is.
+
+        Yields:
+            list: up to chunk_size rows
+        """
+        statement = self._select(self.model.tenant == tenant, columns=columns)
+        yield from self.db.session.execute(
+            statement.execution_options(yield_per=chunk_size)
+        ).partitions()
+
+    def _page_select(self, tenant, columns, order_by, after=None, prefix=None, contains=None, limit=50):
+        order = getattr(self.model, order_by)
+        criteria = [self.model.tenant == tenant]
+        if after is not None:
+            criteria.append(order > after)
+        if prefix:
+            criteria.append(order >= prefix)
+            end = prefix_end(prefix)
+            if end is not None:
+                criteria.append(order < end)
+        if contains:
+            pattern = f"%{like_escape(contains)}%"
+            criteria.append(
+                or_(
+                    self.model.username.ilike(pattern, escape="\\"),
+                    self.model.email.ilike(pattern, escape="\\"),
+                )
+            )
+        return self._select(*criteria, columns=columns).order_by(order).limit(limit)
+
+    def page(self, tenant, columns, order_by="username", after=None, prefix=None, contains=None, limit=50):
+        """One page of a tenant's users in order_by order (keyset pagination)
+
+        A page starts after the last value of the previous one instead of
+        skipping an offset, so with the (tenant, order_by) index every page
+        costs the same however deep it is. ``prefix`` (case-sensitive) narrows
+        the same index range. ``contains`` matches anywhere in the username or
+        email and is only cheap with trigram indexes (see auth_core.listing).
+
+        Returns:
+            list: up to limit rows of the given columns
+        """
+        statement = self._page_select(tenant, columns, order_by, after, prefix, contains, limit)
+        return self.db.session.execute(statement).all()
+
+    def taken(self, tenant, username, email):
+        """Which of username/email already belongs to an account of the tenant
+
+        Returns:
+            str: "username", "email" or None, with a single query
+        """
+        rows = self.db.session.execute(
+            select(self.model.username, self.model.email)
+            .where(
+                self.model.tenant == tenant,
+                or_(self.model.username == username, self.model.email == email),
+            )
+            .limit(2)
+        ).all()
+        if any(row.username == username for row in rows):
+            return "username"
+        if rows:
+            return "email"
+        return None
+
+    def add(self, user):
+        """Add a new user to the session (the caller commits)"""
+        if user.id is None:
+            user.id = generate_uuid()
+        self.db.session.add(user)
+        return user
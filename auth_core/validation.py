@@ -0,0 +1,32 @@
+import re
+import uuid
+
+# Syntax only; full_auth additionally checks the domain with email_validator
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
+
+def generate_uuid():
+    """Generate a new UUID for each record (as a string, so it fits JWT subjects)"""
+    return str(uuid.uuid4())
+
+
+def is_valid_email(email):
+    """Validate email format"""
+    return isinstance(email, str) and EMAIL_PATTERN.match(email) is not None
+
+
+def password_problem(password):
+    """Why a password is too weak, or None if it is acceptable"""
+    if len(password) < 8:
+        return "Password must be at least 8 characters"
+    if not re.search(r"[A-Z]", password):
+        return "Password must contain at least one uppercase letter"
+    if not re.search(r"[a-z]", password):
+        return "Password must contain at least one lowercase letter"
+    if not re.search(r"\d", password):
+        return "Password must contain at least one number"
+    return None
+
+
+def is_strong_password(password):
+    return password_problem(password) is None
@@ -0,0 +1,543 @@
+"""Reproducible JWT vs session auth benchmarks.
+
+Runs the pytest-benchmark micro-benchmarks of each app and a headless Locust
+load test against each app served by its production server, writes the
+results as JSON and compares them with a stored baseline.
+
+    python benchmarks/harness.py run --output results.json
+    python benchmarks/harness.py compare results.json
+    python benchmarks/harness.py run --save-baseline
+    python benchmarks/harness.py run --locust-workers 4 --slo benchmarks/slo.json
+"""
+
+import csv
+import json
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+import click
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+SLO_PATH = Path(__file__).resolve().parent / "slo.json"
+
+APPS = {
+    "jwt_auth": {
+        "dir": ROOT / "jwt_auth",
+        "env": {"PROD_JWT_SECRET_KEY": "benchmark-jwt-secret"},
+    },
+    "session_auth": {
+        "dir": ROOT / "session_auth",
+        "env": {"PROD_SECRET_KEY": "benchmark-session-secret"},
+    },
+}
+
+# Metrics where a larger value is a regression (everything else: smaller is worse)
+HIGHER_IS_WORSE = {"mean", "median", "p50", "p95", "p99", "failure_ratio"}
+
+LOAD_METRICS = ("rps", "p50", "p95", "p99", "failure_ratio")
+MICRO_METRICS = ("mean", "median")
+
+# Seconds allowed on top of --run-time for Locust to start and write its CSVs
+LOCUST_GRACE = 120
+# How long a distributed master waits for its workers to connect
+WORKER_CONNECT_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def app_env(name, workdir, redis_url, seed):
+    """Environment for running one app in production mode against a scratch database"""
+    env = {
+        **os.environ,
+        "FLASK_ENV": "production",
+        "PROD_DATABASE_URI": f"sqlite:///{workdir / f'{name}.db'}",
+        "PROD_REDIS_URL": redis_url,
+        "PROD_RATELIMIT_STORAGE_URL": "memory://",
+        # Every simulated user comes from 127.0.0.1, so throttling would skew results
+        "RATELIMIT_ENABLED": "false",
+        "LOCUST_SEED": str(seed),
+        "PYTHONHASHSEED": str(seed),
+        **APPS[name]["env"],
+    }
+    return env
+
+
+def wait_until_healthy(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise click.ClickException(f"Server at {url} did not become healthy")
+
+
+def run_time_seconds(run_time):
+    """Seconds in a Locust --run-time value such as 90, 60s or 1h30m"""
+    match = re.fullmatch(r"(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s?)?", run_time.strip())
+    if not match or not any(match.groups()):
+        raise click.BadParameter(f"Invalid run time: {run_time}", param_hint="--run-time")
+    hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def tail(path, lines=20):
+    """Last lines of a log file, for error messages"""
+    try:
+        return "\n".join(Path(path).read_text(errors="replace").splitlines()[-lines:])
+    except OSError:
+        return ""
+
+
+def stat(value):
+    """A number from Locust's CSV, None where it writes N/A (no requests)"""
+    return None if value == "N/A" else float(value)
+
+
+def parse_locust_stats(path):
+    """Per-endpoint throughput and latency percentiles (ms) from Locust's *_stats.csv"""
+    results = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            requests = int(row["Request Count"])
+            name = row["Name"] if row["Type"] else "Aggregated"
+            results[name] = {
+                "requests": requests,
+                "failures": int(row["Failure Count"]),
+                "failure_ratio": int(row["Failure Count"]) / requests if requests else 0.0,
+                "rps": stat(row["Requests/s"]),
+                "mean": stat(row["Average Response Time"]),
+                "p50": stat(row["50%"]),
+                "p95": stat(row["95%"]),
+                "p99": stat(row["99%"]),
+            }
+    return results
+
+
+def run_load_test(name, workdir, options):
+    """Serve one app with Gunicorn, drive it with headless Locust and return the stats"""
+    app_dir = APPS[name]["dir"]
+    env = app_env(name, workdir, options["redis_url"], options["seed"])
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+
+    subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "run", "upgrade-db"],
+        cwd=app_dir, env=env, check=True, capture_output=True,
+    )
+    subprocess.run(
+        [
+            sys.executable, "-m", "flask", "--app", "run", "seed-users",
+            "--count", str(options["pool_size"]),
+            "--hash-method", options["hash_method"],
+        ],
+        cwd=app_dir, env=env, check=True, capture_output=True,
+    )
+    env["LOCUST_USER_POOL_SIZE"] = str(options["pool_size"])
+    env["LOCUST_TASKS_PER_SECOND"] = str(options["rate"])
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "run.py", "serve",
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--workers", str(options["workers"]),
+            "--threads", str(options["threads"]),
+        ],
+        cwd=app_dir, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_healthy(url)
+        csv_prefix = workdir / name
+        run_locust(app_dir, env, url, csv_prefix, options)
+        return parse_locust_stats(f"{csv_prefix}_stats.csv")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def run_locust(app_dir, env, url, csv_prefix, options):
+    """Run Locust headless, as one process or as a master with N local worker processes
+
+    In distributed mode the master merges every worker's samples, so the CSV it
+    writes already holds percentiles over all simulated users.
+    """
+    locustfile = str(app_dir / "tests" / "locustfile.py")
+    command = [
+        sys.executable, "-m", "locust",
+        "-f", locustfile,
+        "--headless",
+        "--host", url,
+        "--users", str(options["users"]),
+        "--spawn-rate", str(options["spawn_rate"]),
+        "--run-time", options["run_time"],
+        "--csv", str(csv_prefix),
+        "--only-summary",
+    ]
+    # Failed requests are measured through failure_ratio, so a non-zero exit
+    # code only means Locust itself could not run
+    command += ["--exit-code-on-error", "0"]
+    timeout = run_time_seconds(options["run_time"]) + LOCUST_GRACE
+    worker_count = options["locust_workers"]
+    if not worker_count:
+        try:
+            result = subprocess.run(
+                [*command, *options["user_classes"]],
+                cwd=app_dir, env=env, capture_output=True, text=True, timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            raise click.ClickException(f"Locust did not finish within {timeout}s")
+        if result.returncode != 0:
+            raise click.ClickException(
+                f"Locust exited with {result.returncode}:\n{result.stderr[-4000:]}"
+            )
+        return
+
+    master_port = free_port()
+    env = {**env, "LOCUST_WORKER_COUNT": str(worker_count)}
+    # Output goes to log files next to the CSVs so failures can be diagnosed
+    master_log = Path(f"{csv_prefix}_master.log")
+    logs = [master_log.open("w")]
+    master = subprocess.Popen(
+        [
+            *command,
+            "--master",
+            "--master-bind-host", "127.0.0.1",
+            "--master-bind-port", str(master_port),
+            "--expect-workers", str(worker_count),
+            "--expect-workers-max-wait", str(WORKER_CONNECT_TIMEOUT),
+            *options["user_classes"],
+        ],
+        cwd=app_dir, env=env,
+        stdout=logs[0], stderr=subprocess.STDOUT,
+    )
+    workers = []
+    for index in range(worker_count):
+        logs.append(Path(f"{csv_prefix}_worker{index}.log").open("w"))
+        workers.append(
+            subprocess.Popen(
+                [
+                    sys.executable, "-m", "locust",
+                    "-f", locustfile,
+                    "--worker",
+                    "--master-host", "127.0.0.1",
+                    "--master-port", str(master_port),
+                    *options["user_classes"],
+                ],
+                cwd=app_dir, env=env,
+                stdout=logs[-1], stderr=subprocess.STDOUT,
+            )
+        )
+    try:
+        try:
+            master.wait(timeout=timeout + WORKER_CONNECT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            master.kill()
+            master.wait()
+            raise click.ClickException(
+                f"Locust master did not finish within {timeout + WORKER_CONNECT_TIMEOUT}s:\n"
+                f"{tail(master_log)}"
+            )
+        if master.returncode != 0:
+            raise click.ClickException(
+                f"Locust master exited with {master.returncode}:\n{tail(master_log)}"
+            )
+    finally:
+        for worker in workers:
+            try:
+                worker.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+                worker.wait()
+        for log in logs:
+            log.close()
+
+
+def run_micro_benchmarks(name, workdir):
+    """Run the app's pytest-benchmark suite and return timings (seconds) per benchmark"""
+    output = workdir / f"{name}_micro.json"
+    subprocess.run(
+        [
+            sys.executable, "-m", "pytest", "tests/test_benchmarks.py",
+            "--benchmark-only", f"--benchmark-json={output}", "-q",
+        ],
+        cwd=APPS[name]["dir"], check=True, capture_output=True,
+    )
+    report = json.loads(output.read_text())
+    return {
+        bench["name"]: {
+            "mean": bench["stats"]["mean"],
+            "median": bench["stats"]["median"],
+            "ops": bench["stats"]["ops"],
+        }
+        for bench in report["benchmarks"]
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def load_slos(path):
+    """SLOs as a list of {app, endpoint, metric, max|min, users?} objects"""
+    return json.loads(Path(path).read_text())["slos"]
+
+
+def check_slos(results, slos):
+    """Evaluate each SLO that applies to this run and return one verdict per SLO
+
+    An SLO with a "users" field only applies to runs at that peak user count.
+    A missing endpoint counts as a violation so a broken scenario cannot pass.
+    """
+    verdicts = []
+    run_users = results["meta"].get("users")
+    for slo in slos:
+        if slo.get("users") not in (None, run_users):
+            continue
+        if slo["app"] not in results.get("load", {}):
+            continue
+
+        stats = results["load"][slo["app"]].get(slo["endpoint"], {})
+        actual = stats.get(slo["metric"])
+        if actual is None:
+            passed = False
+        elif "max" in slo:
+            passed = actual <= slo["max"]
+        else:
+            passed = actual >= slo["min"]
+        verdicts.append({**slo, "actual": actual, "passed": passed})
+    return verdicts
+
+
+def print_slo_verdicts(verdicts):
+    for verdict in verdicts:
+        marker = "✅" if verdict["passed"] else "❌"
+        bound = f"<= {verdict['max']}" if "max" in verdict else f">= {verdict['min']}"
+        click.echo(
+            f"{marker} SLO {verdict['app']} {verdict['endpoint']} "
+            f"{verdict['metric']} {bound}: {verdict['actual']}"
+        )
+
+
+def append_history(path, results):
+    """Append a one-line summary of the run for trend tracking"""
+    summary = {
+        "timestamp": results["meta"]["timestamp"],
+        "commit": results["meta"]["commit"],
+        "users": results["meta"]["users"],
+        "locust_workers": results["meta"]["locust_workers"],
+        "load": {
+            app_name: {
+                endpoint: {metric: stats[metric] for metric in LOAD_METRICS}
+                for endpoint, stats in endpoints.items()
+            }
+            for app_name, endpoints in results.get("load", {}).items()
+        },
+        "slo_passed": all(v["passed"] for v in results.get("slo", [])),
+    }
+    with open(path, "a") as f:
+        f.write(json.dumps(summary) + "\n")
+
+
+def compare_results(results, baseline, tolerance):
+    """Return (rows, regressions) comparing every metric present in both reports"""
+    rows, regressions = [], []
+    for section, metrics in (("load", LOAD_METRICS), ("micro", MICRO_METRICS)):
+        for app_name, entries in results.get(section, {}).items():
+            for entry, values in entries.items():
+                base_values = baseline.get(section, {}).get(app_name, {}).get(entry)
+                if not base_values:
+                    continue
+                for metric in metrics:
+                    current, base = values.get(metric), base_values.get(metric)
+                    if current is None or not base:
+                        continue
+                    change = (current - base) / base
+                    worse = change > tolerance if metric in HIGHER_IS_WORSE else change < -tolerance
+                    row = (section, app_name, entry, metric, base, current, change, worse)
+                    rows.append(row)
+                    if worse:
+                        regressions.append(row)
+    return rows, regressions
+
+
+@click.group()
+def cli():
+    """JWT vs session auth benchmark harness."""
+
+
+@cli.command()
+@click.option("--apps", "-a", multiple=True, default=tuple(APPS), type=click.Choice(list(APPS)))
+@click.option("--users", "-u", default=100, help="Peak number of simulated users")
+@click.option("--spawn-rate", "-r", default=10, help="Users started per second")
+@click.option("--run-time", "-t", default="60s", help="Load test duration per app")
+@click.option("--workers", "-w", default=4, help="Gunicorn worker processes")
+@click.option("--threads", default=4, help="Threads per Gunicorn worker")
+@click.option("--seed", default=42, help="Seed for Locust's random choices")
+@click.option("--pool-size", default=1000, help="Pre-seeded users shared by simulated users")
+@click.option(
+    "--hash-method",
+    default="scrypt",
+    help="Password hash of pool users (scrypt matches production login cost)",
+)
+@click.option("--rate", default=0.5, help="Tasks per second per simulated user")
+@click.option("--redis-url", default="redis://localhost:6379/3", help="Redis used by jwt_auth")
+@click.option(
+    "--user-class",
+    "user_classes",
+    multiple=True,
+    help="Locust scenarios to run (ProfileReader, LoginStorm, LogoutChurn, MixedTraffic)",
+)
+@click.option(
+    "--locust-workers",
+    default=0,
+    help="Run Locust as a master plus this many local worker processes (0 = single process)",
+)
+@click.option(
+    "--slo",
+    "slo_path",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Fail the run if these SLOs are violated",
+)
+@click.option(
+    "--history",
+    type=click.Path(dir_okay=False),
+    help="Append a run summary to this JSONL file",
+)
+@click.option("--skip-load", is_flag=True, help="Only run the micro-benchmarks")
+@click.option("--skip-micro", is_flag=True, help="Only run the load tests")
+@click.option("--output", "-o", type=click.Path(dir_okay=False), help="Write results JSON here")
+@click.option("--save-baseline", is_flag=True, help="Store the results as the new baseline")
+def run(apps, users, spawn_rate, run_time, workers, threads, seed, pool_size,
+        hash_method, rate, redis_url, user_classes, locust_workers, slo_path, history,
+        skip_load, skip_micro, output, save_baseline):
+    """Run the benchmarks for each app and emit JSON results."""
+    if skip_load and slo_path:
+        raise click.UsageError("--slo checks the load tests, so it cannot be used with --skip-load")
+    run_time_seconds(run_time)
+    options = {
+        "users": users,
+        "spawn_rate": spawn_rate,
+        "run_time": run_time,
+        "workers": workers,
+        "threads": threads,
+        "seed": seed,
+        "pool_size": pool_size,
+        "hash_method": hash_method,
+        "rate": rate,
+        "redis_url": redis_url,
+        "user_classes": list(user_classes),
+        "locust_workers": locust_workers,
+    }
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            **{k: v for k, v in options.items() if k != "redis_url"},
+        },
+        "load": {},
+        "micro": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="auth-bench-") as tmp:
+        workdir = Path(tmp)
+        for name in apps:
+            if not skip_micro:
+                click.echo(f"⏱  {name}: micro-benchmarks")
+                results["micro"][name] = run_micro_benchmarks(name, workdir)
+            if not skip_load:
+                click.echo(f"🐝 {name}: {users} users for {run_time}")
+                results["load"][name] = run_load_test(name, workdir, options)
+
+    if slo_path:
+        results["slo"] = check_slos(results, load_slos(slo_path))
+        print_slo_verdicts(results["slo"])
+    if history:
+        append_history(history, results)
+
+    report = json.dumps(results, indent=2)
+    if output:
+        Path(output).write_text(report)
+        click.echo(f"✅ Results written to {output}")
+    if save_baseline:
+        BASELINE_PATH.write_text(report)
+        click.echo(f"✅ Baseline updated: {BASELINE_PATH}")
+    if not output and not save_baseline:
+        click.echo(report)
+
+    violations = [v for v in results.get("slo", []) if not v["passed"]]
+    if violations:
+        click.echo(f"❌ {len(violations)} SLO violation(s)")
+        sys.exit(1)
+
+
+@cli.command("check-slo")
+@click.argument("results_path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--slo", "slo_path", default=str(SLO_PATH), type=click.Path(exists=True, dir_okay=False)
+)
+def check_slo(results_path, slo_path):
+    """Check an existing results file against SLOs; exits 1 on violations."""
+    results = json.loads(Path(results_path).read_text())
+    verdicts = check_slos(results, load_slos(slo_path))
+    print_slo_verdicts(verdicts)
+    if not all(v["passed"] for v in verdicts):
+        sys.exit(1)
+    click.echo(f"✅ {len(verdicts)} SLO(s) met")
+
+
+@cli.command()
+@click.argument("results_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--baseline", "baseline_path", default=str(BASELINE_PATH), type=click.Path(dir_okay=False))
+@click.option("--tolerance", default=0.2, help="Allowed relative change before flagging (0.2 = 20%)")
+def compare(results_path, baseline_path, tolerance):
+    """Compare a results file with the baseline; exits 1 on regressions."""
+    if not Path(baseline_path).exists():
+        raise click.ClickException(
+            f"No baseline at {baseline_path}, create one with: run --save-baseline"
+        )
+
+    results = json.loads(Path(results_path).read_text())
+    baseline = json.loads(Path(baseline_path).read_text())
+    rows, regressions = compare_results(results, baseline, tolerance)
+
+    for section, app_name, entry, metric, base, current, change, worse in rows:
+        marker = "❌" if worse else "  "
+        click.echo(
+            f"{marker} {section:5} {app_name:12} {entry[:40]:40} {metric:13} "
+            f"{base:12.6g} -> {current:12.6g} ({change:+.1%})"
+        )
+
+    if regressions:
+        click.echo(f"❌ {len(regressions)} regression(s) beyond {tolerance:.0%}")
+        sys.exit(1)
+    click.echo(f"✅ No regressions beyond {tolerance:.0%} ({len(rows)} metrics compared)")
+
+
+if __name__ == "__main__":
+    cli()
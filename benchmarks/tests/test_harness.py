@@ -0,0 +1,167 @@
+import pytest
+import subprocess
+import click
+from click.testing import CliRunner
+
+import harness
+from harness import check_slos, cli, compare_results, parse_locust_stats, run_time_seconds
+
+STATS_HEADER = (
+    "Type,Name,Request Count,Failure Count,Median Response Time,Average Response Time,"
+    "Min Response Time,Max Response Time,Average Content Size,Requests/s,Failures/s,"
+    "50%,66%,75%,80%,90%,95%,98%,99%,99.9%,99.99%,100%"
+)
+
+
+@pytest.fixture
+def stats_csv(tmp_path):
+    """A Locust *_stats.csv with two endpoints and the aggregated row"""
+    path = tmp_path / "jwt_auth_stats.csv"
+    path.write_text(
+        "\n".join(
+            [
+                STATS_HEADER,
+                "POST,/api/jwt/login,200,10,40,45.5,5,300,120,20.0,1.0,40,50,55,60,80,120,150,200,290,300,300",
+                "GET,/api/jwt/profile,0,0,0,0,0,0,0,0.0,0.0,N/A,N/A,N/A,N/A,N/A,N/A,N/A,N/A,N/A,N/A,N/A",
+                ",Aggregated,200,10,40,45.5,5,300,120,20.0,1.0,40,50,55,60,80,120,150,200,290,300,300",
+            ]
+        )
+        + "\n"
+    )
+    return path
+
+
+def load_results(users=100, **stats):
+    return {
+        "meta": {"users": users},
+        "load": {"jwt_auth": {"Aggregated": {"p95": 100.0, "rps": 50.0, "failure_ratio": 0.0, **stats}}},
+    }
+
+
+class TestParseLocustStats:
+    """Test Locust's stats CSV is read into per-endpoint metrics"""
+
+    def test_endpoints_and_aggregate(self, stats_csv):
+        results = parse_locust_stats(stats_csv)
+
+        assert set(results) == {"/api/jwt/login", "/api/jwt/profile", "Aggregated"}
+        login = results["/api/jwt/login"]
+        assert login["requests"] == 200
+        assert login["failure_ratio"] == 0.05
+        assert login["rps"] == 20.0
+        assert (login["p50"], login["p95"], login["p99"]) == (40.0, 120.0, 200.0)
+
+    def test_endpoint_without_requests(self, stats_csv):
+        """Test an endpoint that was never hit has no failure ratio or percentiles"""
+        profile = parse_locust_stats(stats_csv)["/api/jwt/profile"]
+
+        assert profile["failure_ratio"] == 0.0
+        assert profile["p95"] is None
+
+
+class TestCheckSlos:
+    """Test SLO verdicts over a run's load results"""
+
+    def test_max_and_min(self):
+        slos = [
+            {"app": "jwt_auth", "endpoint": "Aggregated", "metric": "p95", "max": 150},
+            {"app": "jwt_auth", "endpoint": "Aggregated", "metric": "rps", "min": 60},
+        ]
+        verdicts = check_slos(load_results(), slos)
+
+        assert [(v["metric"], v["actual"], v["passed"]) for v in verdicts] == [
+            ("p95", 100.0, True),
+            ("rps", 50.0, False),
+        ]
+
+    def test_bound_is_inclusive(self):
+        slo = {"app": "jwt_auth", "endpoint": "Aggregated", "metric": "p95", "max": 100}
+        assert check_slos(load_results(), [slo])[0]["passed"]
+
+    def test_missing_endpoint_fails(self):
+        """Test a scenario that never hit the endpoint cannot pass"""
+        slo = {"app": "jwt_auth", "endpoint": "/api/jwt/refresh", "metric": "p95", "max": 100}
+        verdict = check_slos(load_results(), [slo])[0]
+
+        assert verdict["actual"] is None
+        assert not verdict["passed"]
+
+    def test_slos_of_other_runs_are_skipped(self):
+        """Test SLOs for another user count or an app that was not run are ignored"""
+        slos = [
+            {"app": "jwt_auth", "endpoint": "Aggregated", "metric": "p95", "max": 1, "users": 500},
+            {"app": "session_auth", "endpoint": "Aggregated", "metric": "p95", "max": 1},
+        ]
+        assert check_slos(load_results(users=100), slos) == []
+
+
+class TestCompareResults:
+    """Test regressions against the baseline"""
+
+    def test_direction_of_each_metric(self):
+        """Test higher latency and lower throughput are regressions, the reverse is not"""
+        baseline = load_results(p95=100.0, rps=50.0)
+        rows, regressions = compare_results(load_results(p95=130.0, rps=70.0), baseline, 0.2)
+        assert [row[3] for row in regressions] == ["p95"]
+
+        rows, regressions = compare_results(load_results(p95=70.0, rps=30.0), baseline, 0.2)
+        assert [row[3] for row in regressions] == ["rps"]
+
+    def test_within_tolerance(self):
+        baseline = load_results(p95=100.0, rps=50.0)
+        rows, regressions = compare_results(load_results(p95=119.0, rps=41.0), baseline, 0.2)
+
+        assert regressions == []
+        assert {row[3] for row in rows} == {"rps", "p95"}
+
+    def test_only_shared_metrics_are_compared(self):
+        """Test entries missing from the baseline and zero baselines are skipped"""
+        results = load_results()
+        results["load"]["jwt_auth"]["/api/jwt/login"] = {"p95": 10.0}
+        results["micro"] = {"jwt_auth": {"test_login": {"mean": 0.02, "median": 0.02}}}
+        baseline = load_results()
+        baseline["micro"] = {"jwt_auth": {"test_login": {"mean": 0.01, "median": 0.02}}}
+
+        rows, regressions = compare_results(results, baseline, 0.2)
+
+        # failure_ratio is 0 in the baseline, so it has no relative change
+        assert {(row[0], row[2], row[3]) for row in rows} == {
+            ("load", "Aggregated", "p95"),
+            ("load", "Aggregated", "rps"),
+            ("micro", "test_login", "mean"),
+            ("micro", "test_login", "median"),
+        }
+        assert [(row[2], row[3]) for row in regressions] == [("test_login", "mean")]
+
+
+class TestErrorPaths:
+    """Test the harness stops with a clear message instead of failing later"""
+
+    def test_run_time(self):
+        assert run_time_seconds("90") == 90
+        assert run_time_seconds("1h30m") == 5400
+        with pytest.raises(click.BadParameter):
+            run_time_seconds("soon")
+
+    def test_slo_needs_load_tests(self, tmp_path):
+        slo = tmp_path / "slo.json"
+        slo.write_text('{"slos": []}')
+
+        result = CliRunner().invoke(cli, ["run", "--skip-load", "--slo", str(slo)])
+        assert result.exit_code == 2
+        assert "--skip-load" in result.output
+
+    def test_locust_failure_shows_stderr(self, tmp_path, monkeypatch):
+        def failed_run(command, **kwargs):
+            return subprocess.CompletedProcess(command, 2, "", "ImportError: no locustfile")
+
+        monkeypatch.setattr(harness.subprocess, "run", failed_run)
+        options = {
+            "users": 1,
+            "spawn_rate": 1,
+            "run_time": "1s",
+            "locust_workers": 0,
+            "user_classes": [],
+        }
+        with pytest.raises(click.ClickException, match="no locustfile"):
+            harness.run_locust(tmp_path, {}, "http://127.0.0.1:1", tmp_path / "app", options)
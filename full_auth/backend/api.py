@@ -1,13 +1,10 @@
-from flask import Flask, Blueprint, jsonify, request, url_for, session, redirect
+from flask import Flask, Blueprint, g, jsonify, request, url_for, session, redirect
 from flask_jwt_extended import (
-    JWTManager,
     jwt_required,
     get_jwt_identity,
-    create_access_token,
     get_jwt,
 )
-from werkzeug.security import generate_password_hash, check_password_hash
-from model import db, User
+from model import db, User, users
 from utils import (
     validate_required_fields,
     verify_token,
@@ -18,17 +15,34 @@ from utils import (
     send_reset_password_email,
     generate_reset_password_link,
 )
+from auth_core.rate_limit import limiter
+from auth_core.refresh_tokens import issue_tokens, rotate_tokens, revoke_family
+from auth_core.revocation import RevocationStore
+from auth_core.token_cache import CachingJWTManager
+from auth_core.tenancy import current_tenant, tenant_key
+from auth_core.replicas import replicas
+from auth_core.audit import audit
+from auth_core.lockout import lockout, locked_response
+from auth_core.hashing import passwords
+from auth_core.clients import admin_clients
+from auth_core.export import user_export
+from auth_core.listing import user_listing
+from oauth import ProviderKeyCache, GOOGLE_ISSUERS, HTTP_TIMEOUT
+from profile_patch import ProfilePatch, PatchError
+from events import publish_user_changed
+from deletion import mark_deleted
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 import google_auth_oauthlib.flow
 import os
+import secrets
 
 os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
 
 import json
-import requests
-from datetime import timedelta
 import redis
 
-jwt = JWTManager()
+jwt = CachingJWTManager()
 
 oauth_config = {
     "web": {
@@ -57,19 +71,40 @@ print("GOOGLE_CLIENT_ID:", os.environ.get("GOOGLE_CLIENT_ID"))
 print("GOOGLE_CLIENT_SECRET:", os.environ.get("GOOGLE_CLIENT_SECRET"))
 print("GOOGLE_REDIRECT_URI:", os.environ.get("GOOGLE_REDIRECT_URI"))
 
+# Discovery document and signing keys are cached per Cache-Control, so ID tokens
+# are verified locally instead of calling the userinfo endpoint on every login
+google_keys = ProviderKeyCache(issuers=GOOGLE_ISSUERS)
 
-ACCESS_EXPIRES = timedelta(hours=24)
 
 jwt_redis_blocklist = redis.StrictRedis(
     host="localhost", port=6379, db=0, decode_responses=True
 )
 
 
+# One-time codes the OAuth callback hands the frontend instead of the tokens
+OAUTH_CODE_PREFIX = "oauth_code"
+OAUTH_CODE_TTL = 60
+
+
+def revoked_tokens():
+    """Blocklist partition of the current tenant"""
+    return RevocationStore(jwt_redis_blocklist, current_tenant())
+
+
 @jwt.token_in_blocklist_loader
 def check_if_token_is_revoked(jwt_header, jwt_payload: dict):
-    jti = jwt_payload["jti"]
-    token_in_redis = jwt_redis_blocklist.get(jti)
-    return token_in_redis is not None
+    return revoked_tokens().is_revoked(jwt_payload)
+
+
+# Tokens are signed and verified with the key of the tenant the request is for
+@jwt.encode_key_loader
+def tenant_signing_key(identity):
+    return tenant_key()
+
+
+@jwt.decode_key_loader
+def tenant_verification_key(jwt_header, jwt_payload):
+    return tenant_key()
 
 
 bp_auth = Blueprint("auth", __name__)
@@ -77,6 +112,7 @@ bp_auth = Blueprint("auth", __name__)
 
 # Traditional Registration
 @bp_auth.route("/register", methods=["POST"])
+@limiter.limit("register")
 def register():
     data = request.get_json()
     required_fields = ["first_name", "last_name", "username", "email", "password"]
@@ -99,33 +135,43 @@ def register():
             400,
         )
 
-    if User.query.filter_by(username=data.get("username")).first():
+    tenant = current_tenant()
+    taken = users.taken(tenant, data.get("username"), data.get("email"))
+    if taken == "username":
         return jsonify({"message": "Username already exists"}), 400
 
-    if User.query.filter_by(email=data.get("email")).first():
+    if taken == "email":
         return jsonify({"message": "Email already exists"}), 400
 
+    password_hash = passwords.hash(data.get("password"))
+
     new_user = User(
+        tenant=tenant,
         first_name=data.get("first_name"),
         last_name=data.get("last_name"),
         username=data.get("username"),
         email=data.get("email"),
-        password_hash=generate_password_hash(data.get("password")),
+        password_hash=password_hash,
         is_verified=False,
         is_active=True,
         is_oauth=False,
     )
 
-    db.session.add(new_user)
+    users.add(new_user)
     db.session.commit()
+    audit.record("register", user_id=new_user.id)
 
-    access_token = create_access_token(identity=new_user.id)
+    access_token, refresh_token = issue_tokens(jwt_redis_blocklist, new_user.id)
 
     send_verify_email(new_user.email, generate_verification_link(new_user.id))
 
     return (
         jsonify(
-            {"message": "User registered successfully", "access_token": access_token}
+            {
+                "message": "User registered successfully",
+                "access_token": access_token,
+                "refresh_token": refresh_token,
+            }
         ),
         201,
     )
@@ -133,6 +179,8 @@ def register():
 
 # Traditional Login
 @bp_auth.route("/login", methods=["POST"])
+@limiter.limit("login", identifier_field="login")
+@replicas.read_only
 def login():
     data = request.get_json()
     required_fields = ["login", "password"]
@@ -143,26 +191,73 @@ def login():
     login_identifier = data.get("login")
     password = data.get("password")
 
+    # Refuse locked-out identifiers and IPs before any lookup or hash
+    retry_after = lockout.check(login_identifier)
+    if retry_after:
+        audit.record("login_locked", identifier=login_identifier)
+        return locked_response(retry_after)
+
     # Find user by username or email
-    user = User.query.filter(
-        (User.username == login_identifier) | (User.email == login_identifier)
-    ).first()
+    user = users.find(current_tenant(), login_identifier)
 
     if not user:
+        # Answer no sooner than a wrong password would be
+        passwords.pad_unknown_user()
+        lockout.failed(login_identifier)
+        audit.record("login_failed", identifier=login_identifier, reason="unknown_user")
         return jsonify({"message": "Invalid credentials"}), 400
 
-    if not check_password_hash(user.password_hash, password):
+    password_matches = passwords.check(user.password_hash, password)
+
+    if not password_matches:
+        lockout.failed(login_identifier)
+        audit.record("login_failed", user_id=user.id, reason="bad_password")
         return jsonify({"message": "Invalid credentials"}), 400
 
     if not user.is_active:
+        audit.record("login_failed", user_id=user.id, reason="inactive")
         return jsonify({"message": "Account is deactivated"}), 400
 
-    access_token = create_access_token(identity=user.id)
-    return jsonify({"message": "Login successful", "access_token": access_token}), 200
+    lockout.succeeded(login_identifier)
+    access_token, refresh_token = issue_tokens(jwt_redis_blocklist, user.id)
+    audit.record("login", user_id=user.id)
+    return (
+        jsonify(
+            {
+                "message": "Login successful",
+                "access_token": access_token,
+                "refresh_token": refresh_token,
+            }
+        ),
+        200,
+    )
+
+
+# Exchange a refresh token for a new token pair
+@bp_auth.route("/refresh", methods=["POST"])
+@jwt_required(refresh=True)
+def refresh():
+    tokens = rotate_tokens(jwt_redis_blocklist, get_jwt())
+    if tokens is None:
+        audit.record("refresh_rejected", user_id=get_jwt_identity())
+        return jsonify({"message": "Refresh token is no longer valid"}), 401
+
+    access_token, refresh_token = tokens
+    return (
+        jsonify(
+            {
+                "message": "Tokens refreshed",
+                "access_token": access_token,
+                "refresh_token": refresh_token,
+            }
+        ),
+        200,
+    )
 
 
 # Verify email for new user
 @bp_auth.route("/verify/<token>", methods=["POST"])
+@limiter.limit("verify")
 def verify_email(token):
     """
     The logic here is that the user will be sent a verification link after they register
@@ -175,7 +270,7 @@ def verify_email(token):
         return jsonify({"message": "Invalid or expired verification token"}), 400
 
     # Find the user by ID
-    user = User.query.filter_by(id=user_id).first()
+    user = users.get(user_id)
     if not user:
         return jsonify({"message": "User not found"}), 404
 
@@ -186,6 +281,7 @@ def verify_email(token):
     # Update user verification status
     user.is_verified = True
     db.session.commit()
+    audit.record("email_verified", user_id=user.id)
 
     return jsonify({"message": "Email verified successfully"}), 200
 
@@ -196,6 +292,8 @@ def login_oauth():
     oauth_flow.redirect_uri = url_for("auth.oauth2callback", _external=True)
     authorization_url, state = oauth_flow.authorization_url()
     session["state"] = state
+    # The provider's redirect back carries no tenant header
+    session["tenant"] = current_tenant()
     return redirect(authorization_url)
 
 
@@ -206,16 +304,27 @@ def oauth2callback():
         return redirect(f"{frontend_url}/login?error=invalid_state")
 
     try:
-        oauth_flow.fetch_token(authorization_response=request.url)
-        credentials = oauth_flow.credentials
-        user_info_response = requests.get(
-            "https://www.googleapis.com/oauth2/v2/userinfo",
-            headers={"Authorization": f"Bearer {credentials.token}"},
+        oauth_flow.fetch_token(
+            authorization_response=request.url, timeout=HTTP_TIMEOUT
         )
-        user_info = user_info_response.json()
+        credentials = oauth_flow.credentials
+        if credentials.id_token:
+            user_info = google_keys.verify_id_token(
+                credentials.id_token, audience=oauth_config["web"]["client_id"]
+            )
+        else:
+            user_info = google_keys.fetch_userinfo(credentials.token)
 
-        existing_user = User.query.filter_by(email=user_info["email"]).first()
+        g.tenant = session.get("tenant", current_tenant())
+        existing_user = User.query.filter_by(
+            tenant=g.tenant, email=user_info["email"]
+        ).first()
         if existing_user:
+            if existing_user.deleted_at is not None:
+                # The email is freed once the deleted account has been purged
+                audit.record("login_failed", user_id=existing_user.id, reason="deleted")
+                frontend_url = os.environ.get("FRONTEND_URL", "http://localhost:3000")
+                return redirect(f"{frontend_url}/login?error=account_deleted")
             if not existing_user.is_oauth:
                 # Redirect to frontend with error
                 frontend_url = os.environ.get("FRONTEND_URL", "http://localhost:3000")
@@ -225,6 +334,7 @@ def oauth2callback():
             user = existing_user
         else:
             user = User(
+                tenant=g.tenant,
                 first_name=user_info.get("given_name", ""),
                 last_name=user_info.get("family_name", ""),
                 username=user_info["email"],
@@ -234,14 +344,23 @@ def oauth2callback():
                 is_active=True,
                 is_oauth=True,
             )
-            db.session.add(user)
+            users.add(user)
             db.session.commit()
-
-        access_token = create_access_token(identity=user.id)
-
-        # Redirect to frontend with token
+            audit.record("register", user_id=user.id, method="oauth")
+
+        access_token, refresh_token = issue_tokens(jwt_redis_blocklist, user.id)
+        audit.record("login", user_id=user.id, method="oauth")
+
+        # Tokens in the URL would end up in browser history, logs and Referer
+        # headers; the frontend exchanges this short-lived code for them over POST
+        code = secrets.token_urlsafe(32)
+        jwt_redis_blocklist.set(
+            f"{OAUTH_CODE_PREFIX}:{g.tenant}:{code}",
+            json.dumps({"access_token": access_token, "refresh_token": refresh_token}),
+            ex=OAUTH_CODE_TTL,
+        )
         frontend_url = os.environ.get("FRONTEND_URL", "http://localhost:3000")
-        return redirect(f"{frontend_url}/oauth/callback?token={access_token}")
+        return redirect(f"{frontend_url}/oauth/callback?code={code}")
 
     except Exception as e:
         # Redirect to frontend with error
@@ -250,11 +369,31 @@ def oauth2callback():
         return redirect(f"{frontend_url}/login?error=oauth_failed")
 
 
+# Exchange the one-time code of the OAuth callback for the token pair
+@bp_auth.route("/oauth/token", methods=["POST"])
+def oauth_token():
+    code = (request.get_json(silent=True) or {}).get("code")
+    if not code:
+        return jsonify({"message": "code is required"}), 400
+
+    key = f"{OAUTH_CODE_PREFIX}:{current_tenant()}:{code}"
+    pipe = jwt_redis_blocklist.pipeline()
+    pipe.get(key)
+    pipe.delete(key)
+    tokens, deleted = pipe.execute()
+    # Only the request that deleted the code gets the tokens
+    if not deleted:
+        return jsonify({"message": "Invalid or expired code"}), 400
+
+    return jsonify({"message": "Login successful", **json.loads(tokens)}), 200
+
+
 @bp_auth.route("/protected", methods=["GET"])
 @jwt_required()
+@replicas.read_only
 def protected():
     current_user_id = get_jwt_identity()
-    user = User.query.filter_by(id=current_user_id).first()
+    user = users.get(current_user_id, current_tenant())
 
     if not user:
         return jsonify({"message": "User not found"}), 404
@@ -267,6 +406,7 @@ def protected():
                 "last_name": user.last_name,
                 "username": user.username,
                 "email": user.email,
+                "version": user.version,
             }
         ),
         200,
@@ -277,8 +417,12 @@ def protected():
 @bp_auth.route("/logout", methods=["DELETE"])
 @jwt_required()
 def logout():
-    jti = get_jwt()["jti"]
-    jwt_redis_blocklist.set(jti, "", ex=ACCESS_EXPIRES)
+    claims = get_jwt()
+    # Kept only until the token would have expired anyway
+    revoked_tokens().revoke(claims)
+    revoke_family(jwt_redis_blocklist, claims)
+    jwt.evict(claims)
+    audit.record("logout", user_id=claims["sub"])
     return jsonify(msg="Access token revoked")
 
 
@@ -290,31 +434,79 @@ def update_account():
     if not current_user_id:
         return jsonify({"error": "User is not authenticated"}), 404
 
-    data = request.get_json()
-    fields = ["first_name", "last_name", "username", "email", "password"]
-    user = User.query.filter_by(id=current_user_id).first()
+    try:
+        patch = ProfilePatch.from_json(request.get_json(silent=True))
+    except PatchError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Only the columns the patch can change (and the hash when it is needed)
+    columns = [User.version, *(getattr(User, column) for column in ProfilePatch.COLUMNS)]
+    if patch.password is not None:
+        columns.append(User.password_hash)
+    current = db.session.execute(
+        select(*columns).where(
+            User.id == current_user_id,
+            User.tenant == current_tenant(),
+            User.deleted_at.is_(None),
+        )
+    ).mappings().first()
 
-    if not user:
+    if not current:
         return jsonify({"error": "User not found"}), 404
 
+    expected_version = patch.version if patch.version is not None else current["version"]
+    if expected_version != current["version"]:
+        return jsonify({"error": "Profile was changed by another request"}), 409
+
+    changes = patch.changes(current)
+
     # Handle password change securely
-    if data.get("password"):
-        if not data.get("current_password"):
-            return (
-                jsonify({"error": "Current password is required to change password"}),
-                400,
-            )
-        if not check_password_hash(user.password_hash, data["current_password"]):
+    if patch.password is not None:
+        password_matches = passwords.check(
+            current["password_hash"], patch.current_password
+        )
+        if not password_matches:
+            audit.record("password_change_failed", user_id=current_user_id)
             return jsonify({"error": "Current password is incorrect"}), 400
-        user.password_hash = generate_password_hash(data["password"])
+        changes["password_hash"] = passwords.hash(patch.password)
 
-    # Update other fields
-    for field in fields:
-        if field != "password" and data.get(field):
-            setattr(user, field, data[field])
+    if not changes:
+        return (
+            jsonify({"message": "No changes to update", "version": current["version"]}),
+            200,
+        )
 
-    db.session.commit()
-    return jsonify({"message": "User information updated successfully"}), 200
+    try:
+        result = db.session.execute(
+            update(User)
+            .where(
+                User.id == current_user_id,
+                User.tenant == current_tenant(),
+                User.version == expected_version,
+                User.deleted_at.is_(None),
+            )
+            .values(**changes, version=User.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Username or email already exists"}), 409
+
+    if result.rowcount == 0:
+        return jsonify({"error": "Profile was changed by another request"}), 409
+
+    publish_user_changed(jwt_redis_blocklist, current_user_id, changed=set(changes))
+    audit.record("profile_updated", user_id=current_user_id, changed=sorted(changes))
+    return (
+        jsonify(
+            {
+                "message": "User information updated successfully",
+                "version": expected_version + 1,
+            }
+        ),
+        200,
+    )
 
 
 # Delete account
@@ -325,16 +517,38 @@ def delete_account():
     if not current_user_id:
         return jsonify({"error": "User is not authenticated"}), 404
 
-    user = User.query.filter_by(id=current_user_id).first()
-    if not user:
+    user_exists = db.session.scalar(
+        select(User.id).where(
+            User.id == current_user_id,
+            User.tenant == current_tenant(),
+            User.deleted_at.is_(None),
+        )
+    )
+    if not user_exists:
         return jsonify({"error": "User not found"}), 404
 
-    # Add token to blocklist before deleting account
-    jti = get_jwt()["jti"]
-    jwt_redis_blocklist.set(jti, "", ex=ACCESS_EXPIRES)
+    # Locks the user out everywhere (all tokens revoked); the row itself is
+    # purged in the background
+    mark_deleted(jwt_redis_blocklist, [current_user_id])
 
-    # Delete the user
-    db.session.delete(user)
-    db.session.commit()
+    claims = get_jwt()
+    revoke_family(jwt_redis_blocklist, claims)
+    jwt.evict(claims)
 
     return jsonify({"message": "Account deleted successfully"}), 200
+
+
+# Export users for analytics
+@bp_auth.route("/admin/users:export", methods=["GET"])
+@admin_clients.required
+@replicas.read_only
+def export_users():
+    return user_export.response(users)
+
+
+# Browse and search users (keyset-paginated)
+@bp_auth.route("/admin/users", methods=["GET"])
+@admin_clients.required
+@replicas.read_only
+def list_users():
+    return user_listing.response(users)
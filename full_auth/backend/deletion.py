@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import delete, func, select, update
+from model import db, User
+from auth_core.metrics import LATENCY_BUCKETS
+from auth_core.revocation import RevocationStore
+from events import publish_user_changed
+from auth_core.audit import audit
+import threading
+import time
+
+# Accounts are deleted in two steps. mark_deleted flags the rows and revokes every
+# token of the users at once, so they are locked out right away without waiting
+# for the database work. purge_deleted removes the flagged rows later, in batches,
+# from a background thread or the purge-deleted-accounts command.
+
+ACCOUNTS_DELETED = Counter("auth_accounts_deleted_total", "Accounts marked for deletion")
+ACCOUNTS_PURGED = Counter("auth_accounts_purged_total", "Deleted accounts purged from the database")
+PURGE_BATCH_LATENCY = Histogram(
+    "auth_purge_batch_duration_seconds",
+    "Time to purge one batch of deleted accounts",
+    buckets=LATENCY_BUCKETS,
+)
+PENDING_PURGE = Gauge(
+    "auth_accounts_pending_purge",
+    "Deleted accounts not purged yet",
+    multiprocess_mode="max",
+)
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def mark_deleted(redis_client, user_ids, batch_size=500):
+    """Soft-delete users and revoke all their tokens
+
+    Args:
+        redis_client: Redis holding the token blocklist
+        user_ids (iterable): IDs of the users to delete (any tenant)
+        batch_size (int): users per UPDATE statement and Redis pipeline
+
+    Returns:
+        int: number of users that were not already deleted
+    """
+    lifetime = current_app.config["JWT_REFRESH_TOKEN_EXPIRES"]
+    user_ids = list(dict.fromkeys(user_ids))
+    deleted = 0
+
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start : start + batch_size]
+        rows = db.session.execute(
+            update(User)
+            .where(User.id.in_(batch), User.deleted_at.is_(None))
+            .values(deleted_at=utcnow(), is_active=False, version=User.version + 1)
+            .returning(User.id, User.tenant)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        by_tenant = {}
+        for user_id, tenant in rows:
+            by_tenant.setdefault(tenant, []).append(user_id)
+        # Revoke before committing: a failure here leaves the accounts untouched
+        for tenant, tenant_user_ids in by_tenant.items():
+            RevocationStore(redis_client, tenant).revoke_users(tenant_user_ids, lifetime)
+        db.session.commit()
+
+        for user_id, tenant in rows:
+            publish_user_changed(redis_client, user_id, tenant=tenant)
+            audit.record("account_deleted", user_id=user_id, tenant=tenant)
+        ACCOUNTS_DELETED.inc(len(rows))
+        deleted += len(rows)
+    return deleted
+
+
+def purge_deleted(batch_size=500, delay=timedelta(0), max_batches=None):
+    """Remove soft-deleted rows older than ``delay`` from the database
+
+    Returns:
+        int: number of rows removed
+    """
+    cutoff = utcnow() - delay
+    purged = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        start = time.perf_counter()
+        user_ids = db.session.scalars(
+            select(User.id)
+            .where(User.deleted_at.is_not(None), User.deleted_at <= cutoff)
+            .limit(batch_size)
+        ).all()
+        if not user_ids:
+            break
+
+        db.session.execute(
+            delete(User)
+            .where(User.id.in_(user_ids), User.deleted_at.is_not(None))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        PURGE_BATCH_LATENCY.observe(time.perf_counter() - start)
+        ACCOUNTS_PURGED.inc(len(user_ids))
+        purged += len(user_ids)
+        batches += 1
+
+    PENDING_PURGE.set(
+        db.session.scalar(select(func.count()).where(User.deleted_at.is_not(None)))
+    )
+    return purged
+
+
+class AccountDeletion:
+    """Purges soft-deleted accounts from a background thread
+
+    Every ACCOUNT_PURGE_INTERVAL seconds (0 disables the thread, e.g. when
+    purging from cron with the CLI) rows deleted more than ACCOUNT_PURGE_DELAY
+    seconds ago are removed in batches of ACCOUNT_PURGE_BATCH_SIZE. Purging is
+    idempotent, so several workers may run it at once.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("ACCOUNT_PURGE_INTERVAL", 60)
+        app.config.setdefault("ACCOUNT_PURGE_DELAY", 0)
+        app.config.setdefault("ACCOUNT_PURGE_BATCH_SIZE", 500)
+
+        if app.config["ACCOUNT_PURGE_INTERVAL"] and not app.testing:
+            thread = threading.Thread(
+                target=self._run, args=(app,), name="account-purge", daemon=True
+            )
+            app.extensions["account_deletion"] = thread
+            thread.start()
+
+    @staticmethod
+    def _run(app):
+        while True:
+            time.sleep(app.config["ACCOUNT_PURGE_INTERVAL"])
+            with app.app_context():
+                try:
+                    purge_deleted(
+                        batch_size=app.config["ACCOUNT_PURGE_BATCH_SIZE"],
+                        delay=timedelta(seconds=app.config["ACCOUNT_PURGE_DELAY"]),
+                    )
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f"Purging deleted accounts failed: {e}")
+                finally:
+                    db.session.remove()
+
+
+account_deletion = AccountDeletion()
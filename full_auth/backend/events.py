@@ -0,0 +1,40 @@
+from blinker import Namespace
+from flask import current_app
+from auth_core.metrics import track_time
+from auth_core.tenancy import current_tenant
+import json
+import redis
+
+# Redis channel other workers and services subscribe to for dropping cached users
+INVALIDATION_CHANNEL = "user-invalidations"
+
+signals = Namespace()
+
+# Sent after a user change is committed, with user_id, tenant and the changed
+# columns (None when the user was deleted)
+user_changed = signals.signal("user-changed")
+
+
+def publish_user_changed(redis_client, user_id, changed=None, tenant=None):
+    """Tell in-process listeners and every other worker that a user changed"""
+    tenant = tenant or current_tenant()
+    user_changed.send(
+        current_app._get_current_object(),
+        user_id=user_id,
+        tenant=tenant,
+        changed=changed,
+    )
+
+    message = json.dumps(
+        {
+            "user_id": user_id,
+            "tenant": tenant,
+            "changed": sorted(changed) if changed is not None else None,
+        }
+    )
+    try:
+        with track_time("redis"):
+            redis_client.publish(INVALIDATION_CHANNEL, message)
+    except redis.RedisError as e:
+        # Subscribers fall back to their TTLs; the change itself is committed
+        current_app.logger.warning(f"Could not publish change of user {user_id}: {e}")
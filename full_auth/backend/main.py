@@ -1,14 +1,40 @@
+import os
+import sys
+
+# The shared auth_core package lives at the repository root
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
 from flask import Flask
 from flask_cors import CORS
 from model import db
 from api import bp_auth, jwt
-import os
+from deletion import account_deletion
+from auth_core.config import CoreConfig, env_list
+from auth_core.rate_limit import limiter
+from auth_core.metrics import metrics
+from auth_core.tenancy import tenancy
+from auth_core.replicas import replicas
+from auth_core.audit import audit
+from auth_core.lockout import lockout
+from auth_core.hashing import passwords
+from auth_core.clients import admin_clients
+from auth_core.export import user_export
+from auth_core.listing import user_listing
+import json
+import time
+import click
 from datetime import timedelta
-from flask_cors import CORS
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
-    
+
+    # Settings shared by every auth app; the ones below are specific to this one
+    app.config.from_object(CoreConfig)
+    # Error responses of this API carry their text under "message"
+    app.config["AUTH_ERROR_KEY"] = "message"
+
     # Configuration
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "your-secret-key-here")
 
@@ -16,11 +42,38 @@ def create_app():
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv(
         "DATABASE_URL", "sqlite:///app.db"  # Default to SQLite for development
     )
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # Comma-separated read replicas of DATABASE_URL for read-only endpoints; clients
+    # stay on the primary for a few seconds after writing so they read their writes
+    app.config["SQLALCHEMY_REPLICA_URIS"] = env_list("DATABASE_REPLICA_URLS")
+    app.config["REPLICA_STICKY_SECONDS"] = int(os.getenv("REPLICA_STICKY_SECONDS", 10))
+    app.config["REPLICA_MAX_LAG_SECONDS"] = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
 
     # JWT configuration
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", app.config["SECRET_KEY"])
-    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=24)
+    # Short-lived access tokens keep blocklist entries short-lived too;
+    # sessions are extended through rotating refresh tokens
+    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(minutes=15)
+    app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=30)
+    # Verified claims kept per worker so repeat requests skip the signature check (0 disables)
+    app.config["JWT_DECODE_CACHE_SIZE"] = int(os.getenv("JWT_DECODE_CACHE_SIZE", 10000))
+
+    # Deleted accounts are purged from the database in the background
+    app.config["ACCOUNT_PURGE_INTERVAL"] = int(os.getenv("ACCOUNT_PURGE_INTERVAL", 60))
+    app.config["ACCOUNT_PURGE_DELAY"] = int(os.getenv("ACCOUNT_PURGE_DELAY", 0))
+
+    # Optional explicit signing keys ({"tenant": "secret"}); others are derived from JWT_SECRET_KEY
+    app.config["JWT_TENANT_KEYS"] = json.loads(os.getenv("JWT_TENANT_KEYS", "{}"))
+
+    # Rate limits as (max requests, window in seconds), checked before any DB query or hash
+    app.config["RATELIMIT_STORAGE_URL"] = os.getenv(
+        "RATELIMIT_STORAGE_URL", "redis://localhost:6379/0"
+    )
+    app.config["RATELIMIT_RULES"] = {
+        **CoreConfig.RATELIMIT_RULES,
+        "verify": {"ip": (20, 60)},
+    }
+    app.config["LOCKOUT_BASE_SECONDS"] = int(os.getenv("LOCKOUT_BASE_SECONDS", 30))
+    app.config["LOCKOUT_MAX_SECONDS"] = int(os.getenv("LOCKOUT_MAX_SECONDS", 3600))
 
     # SendGrid configuration
     app.config["SENDGRID_API_KEY"] = os.getenv("SENDGRID_API_KEY")
@@ -35,9 +88,24 @@ def create_app():
     
     CORS(app, origins=["http://localhost:5173"], supports_credentials=True)
 
+    # Settings of the tests, which take precedence over the environment
+    if test_config:
+        app.config.update(test_config)
+
     # Initialize extensions
+    tenancy.init_app(app)
+    replicas.init_app(app)
     db.init_app(app)
     jwt.init_app(app)
+    limiter.init_app(app)
+    lockout.init_app(app)
+    passwords.init_app(app)
+    admin_clients.init_app(app)
+    user_export.init_app(app)
+    user_listing.init_app(app)
+    metrics.init_app(app)
+    account_deletion.init_app(app)
+    audit.init_app(app, engine=lambda: db.engine)
 
     # Enable CORS for frontend integration
     CORS(app, origins=os.getenv("FRONTEND_URL", "http://localhost:3000"))
@@ -59,6 +127,80 @@ def create_app():
     def index():
         return {"message": "Welcome to the Authentication API"}, 200
 
+    @app.cli.command("revocation-report")
+    def revocation_report():
+        """Show how much Redis memory the token blocklist uses."""
+        from api import jwt_redis_blocklist
+        from auth_core.revocation import RevocationStore
+
+        for tenant in app.config["TENANTS"]:
+            report = RevocationStore(jwt_redis_blocklist, tenant).memory_report()
+            print(f"[{tenant}]")
+            print(f"Revoked tokens: {report['entries']}")
+            print(f"Buckets: {report['buckets']}")
+            print(f"Memory: {report['memory_bytes']} bytes")
+            print(f"Bytes per token: {report['bytes_per_entry']}")
+            for encoding, count in sorted(report["encodings"].items()):
+                print(f"  {encoding}: {count} buckets")
+
+    @app.cli.command("delete-accounts")
+    @click.argument("ids_file", type=click.File("r"))
+    @click.option("--batch-size", default=500, help="Accounts per batch")
+    def delete_accounts(ids_file, batch_size):
+        """Delete the accounts listed in IDS_FILE (one user ID per line, - for stdin)."""
+        from api import jwt_redis_blocklist
+        from deletion import mark_deleted
+
+        user_ids = [line.strip() for line in ids_file if line.strip()]
+        start = time.perf_counter()
+        deleted = mark_deleted(jwt_redis_blocklist, user_ids, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"Deleted {deleted} of {len(user_ids)} accounts in {elapsed:.2f}s "
+              f"({deleted / elapsed if elapsed else 0:.0f}/s)")
+
+    @app.cli.command("purge-deleted-accounts")
+    @click.option("--batch-size", default=500, help="Rows per DELETE")
+    @click.option("--delay", default=0, help="Only purge accounts deleted this many seconds ago")
+    def purge_deleted_accounts(batch_size, delay):
+        """Remove deleted accounts from the database now."""
+        from deletion import purge_deleted
+
+        start = time.perf_counter()
+        purged = purge_deleted(batch_size=batch_size, delay=timedelta(seconds=delay))
+        elapsed = time.perf_counter() - start
+        print(f"Purged {purged} accounts in {elapsed:.2f}s "
+              f"({purged / elapsed if elapsed else 0:.0f}/s)")
+
+    @app.cli.command("export-users")
+    @click.option(
+        "--format",
+        "fmt",
+        type=click.Choice(["csv", "jsonl", "columnar"]),
+        default="csv",
+        help="Output format (columnar: one JSON row group per chunk)",
+    )
+    @click.option("--tenant", default="default", help="Tenant whose users are exported")
+    @click.option("--output", "-o", type=click.File("w"), default="-", help="Output file (default: stdout)")
+    @click.option("--chunk-size", default=None, type=int, help="Rows fetched and written at a time")
+    def export_users(fmt, tenant, output, chunk_size):
+        """Stream the user table to a file for analytics (without password hashes)."""
+        from model import users
+
+        rows, elapsed = user_export.write(users, tenant, fmt, output, chunk_size=chunk_size)
+        click.echo(f"Exported {rows} users in {elapsed:.2f}s "
+                   f"({rows / elapsed if elapsed else 0:.0f}/s)", err=True)
+
+    @app.cli.command("create-search-indexes")
+    def create_search_indexes():
+        """Create trigram indexes for substring user search (PostgreSQL only)."""
+        from auth_core.listing import create_trigram_indexes
+        from model import User
+
+        if create_trigram_indexes(db.engine, User.__table__):
+            print("Created trigram indexes; set USER_SEARCH_CONTAINS=true to enable ?q= search")
+        else:
+            print("Trigram indexes need PostgreSQL; nothing created")
+
     return app
 
 
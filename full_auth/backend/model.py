@@ -1,30 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Integer, String, Boolean, Index
-from sqlalchemy.orm import relationship, mapped_column, Mapped
-import uuid
+from sqlalchemy import Integer, String, Boolean, DateTime, UniqueConstraint
+from sqlalchemy.orm import mapped_column, Mapped
+from datetime import datetime
+from typing import Optional
+from auth_core.replicas import RoutingSession
+from auth_core.users import UserColumns, UserRepository
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
-def generate_uuid():
-    return str(uuid.uuid4())  # Convert to string for consistency
-
-
-class User(db.Model):
+class User(UserColumns, db.Model):
     __tablename__ = "user"
 
-    # Add indexes for performance
+    # Usernames and emails are unique per tenant; these indexes also serve the lookups
     __table_args__ = (
-        Index("idx_user_email", "email"),
-        Index("idx_user_username", "username"),
+        UniqueConstraint("tenant", "email", name="uq_user_tenant_email"),
+        UniqueConstraint("tenant", "username", name="uq_user_tenant_username"),
     )
 
-    # User's basic information
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
-    first_name: Mapped[str] = mapped_column(String, nullable=False)
-    last_name: Mapped[str] = mapped_column(String, nullable=False)
-    username: Mapped[str] = mapped_column(String, nullable=False)
-    email: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    # OAuth accounts have no password
     password_hash: Mapped[str] = mapped_column(String, nullable=True)
 
     # Boolean field to check if the user email is verified and if the user is active
@@ -32,5 +26,16 @@ class User(db.Model):
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     is_oauth: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
 
+    # Set when the account is deleted; the row is purged later by the deletion job
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+
+    # Bumped on every write, so concurrent profile updates cannot overwrite each other
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     def get_user_id(self):
         return self.id
+
+
+# Deleted accounts cannot sign in (or be found) while they wait to be purged
+users = UserRepository(db, User, active=lambda model: model.deleted_at.is_(None))
@@ -0,0 +1,181 @@
+import re
+import threading
+import time
+from typing import Optional
+
+import jwt as pyjwt
+import requests
+
+GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
+GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
+
+# Google documents both forms of its issuer claim
+GOOGLE_ISSUERS = ["https://accounts.google.com", "accounts.google.com"]
+
+# Network calls to the provider must never hang a login request
+HTTP_TIMEOUT = 5
+
+# Used when the provider sends no (or an unparsable) Cache-Control header
+DEFAULT_MAX_AGE = 300
+
+# Allowed clock skew when checking exp/iat/nbf on ID tokens
+CLOCK_SKEW_SECONDS = 60
+
+# Minimum gap between two JWKS refreshes triggered by an unknown key id
+MIN_REFRESH_INTERVAL = 30
+
+_MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+def parse_max_age(headers) -> int:
+    """Return how many seconds a response may be cached according to its headers"""
+    cache_control = headers.get("Cache-Control", "")
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+
+    match = _MAX_AGE_PATTERN.search(cache_control)
+    if not match:
+        return DEFAULT_MAX_AGE
+
+    max_age = int(match.group(1))
+    try:
+        max_age -= int(headers.get("Age", 0))
+    except ValueError:
+        pass
+    return max(max_age, 0)
+
+
+class CachedDocument:
+    """A JSON document fetched over HTTP and kept until its max-age runs out
+
+    Args:
+        url (str): location of the document
+        session (requests.Session): shared session so the TCP/TLS connection is reused
+        timeout (float): seconds to wait for the provider before giving up
+    """
+
+    def __init__(self, url: str, session: requests.Session, timeout: float = HTTP_TIMEOUT):
+        self.url = url
+        self.session = session
+        self.timeout = timeout
+        self.data: Optional[dict] = None
+        self.expires_at = 0.0
+        self.fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        return self.data is not None and time.monotonic() < self.expires_at
+
+    def get(self, force: bool = False) -> dict:
+        """Return the cached document, fetching it when stale or when forced"""
+        if not force and self.is_fresh():
+            return self.data
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if not force and self.is_fresh():
+                return self.data
+
+            response = self.session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+
+            now = time.monotonic()
+            self.data = response.json()
+            self.fetched_at = now
+            self.expires_at = now + parse_max_age(response.headers)
+            return self.data
+
+
+class ProviderKeyCache:
+    """Verifies OpenID Connect ID tokens locally with cached provider signing keys
+
+    The discovery document and the JWKS are each cached for as long as the provider's
+    Cache-Control header allows, so a login normally costs no extra round trip to the provider.
+
+    Args:
+        discovery_url (str): the provider's /.well-known/openid-configuration URL
+        issuers (list): accepted values for the iss claim (defaults to the discovery issuer)
+        timeout (float): seconds to wait for the provider before giving up
+    """
+
+    def __init__(
+        self,
+        discovery_url: str = GOOGLE_DISCOVERY_URL,
+        issuers: Optional[list] = None,
+        timeout: float = HTTP_TIMEOUT,
+    ):
+        self.session = requests.Session()
+        self.timeout = timeout
+        self.issuers = issuers
+        self.discovery = CachedDocument(discovery_url, self.session, timeout)
+        self._jwks: Optional[CachedDocument] = None
+        self._keys: dict = {}
+        self._keys_source: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def _jwks_document(self) -> CachedDocument:
+        jwks_uri = self.discovery.get()["jwks_uri"]
+        with self._lock:
+            if self._jwks is None or self._jwks.url != jwks_uri:
+                self._jwks = CachedDocument(jwks_uri, self.session, self.timeout)
+            return self._jwks
+
+    def _load_keys(self, force: bool = False) -> dict:
+        """Return signing keys by kid, parsing the JWKS only when it changed"""
+        jwks = self._jwks_document().get(force=force)
+        if jwks is not self._keys_source:
+            keys = {}
+            for jwk in jwks.get("keys", []):
+                if jwk.get("use", "sig") != "sig" or "kid" not in jwk:
+                    continue
+                try:
+                    keys[jwk["kid"]] = pyjwt.PyJWK(jwk)
+                except pyjwt.PyJWKError:
+                    continue
+            self._keys = keys
+            self._keys_source = jwks
+        return self._keys
+
+    def get_signing_key(self, kid: str) -> pyjwt.PyJWK:
+        """Return the key for kid, refreshing the JWKS once if the provider rotated keys"""
+        keys = self._load_keys()
+        if kid in keys:
+            return keys[kid]
+
+        jwks = self._jwks_document()
+        if time.monotonic() - jwks.fetched_at >= MIN_REFRESH_INTERVAL:
+            keys = self._load_keys(force=True)
+            if kid in keys:
+                return keys[kid]
+
+        raise pyjwt.InvalidTokenError(f"Unknown signing key: {kid}")
+
+    def verify_id_token(self, id_token: str, audience: str) -> dict:
+        """Verify an ID token's signature and standard claims and return its payload
+
+        Raises:
+            jwt.InvalidTokenError: if the token is malformed, expired or not signed by the provider
+        """
+        header = pyjwt.get_unverified_header(id_token)
+        signing_key = self.get_signing_key(header.get("kid"))
+        issuers = self.issuers or [self.discovery.get()["issuer"]]
+
+        return pyjwt.decode(
+            id_token,
+            key=signing_key.key,
+            algorithms=[signing_key.algorithm_name],
+            audience=audience,
+            issuer=issuers,
+            leeway=CLOCK_SKEW_SECONDS,
+            options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+        )
+
+    def fetch_userinfo(self, access_token: str, url: str = GOOGLE_USERINFO_URL) -> dict:
+        """Fallback for providers that return no ID token"""
+        response = self.session.get(
+            url,
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
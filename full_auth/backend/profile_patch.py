@@ -0,0 +1,76 @@
+from dataclasses import dataclass, fields
+from typing import Optional
+from utils import validate_email_field, validate_password_strength
+
+
+class PatchError(ValueError):
+    """Raised for a profile patch that cannot be applied"""
+
+
+@dataclass(frozen=True)
+class ProfilePatch:
+    """Fields a PATCH /profile request asks to change
+
+    Missing, null and empty fields are left untouched, and fields that cannot
+    be changed this way (id, flags, ...) are ignored, so clients may send back
+    the whole profile they fetched. ``version`` is the profile version the
+    client last saw; when given, the update fails if the profile changed since.
+    """
+
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    username: Optional[str] = None
+    email: Optional[str] = None
+    password: Optional[str] = None
+    current_password: Optional[str] = None
+    version: Optional[int] = None
+
+    # Columns the patch writes directly (the password goes through its hash)
+    COLUMNS = ("first_name", "last_name", "username", "email")
+
+    @classmethod
+    def from_json(cls, data):
+        if not isinstance(data, dict):
+            raise PatchError("Request body must be a JSON object")
+
+        values = {}
+        for field in fields(cls):
+            value = data.get(field.name)
+            if value is None or value == "":
+                continue
+            if field.name == "version":
+                if isinstance(value, bool) or not isinstance(value, int):
+                    raise PatchError("version must be an integer")
+            elif not isinstance(value, str):
+                raise PatchError(f"{field.name} must be a string")
+            elif field.name not in ("password", "current_password"):
+                value = value.strip()
+                if not value:
+                    raise PatchError(f"{field.name} must not be blank")
+            values[field.name] = value
+
+        patch = cls(**values)
+        patch.validate()
+        return patch
+
+    def validate(self):
+        if self.email is not None:
+            email_error = validate_email_field(self.email)
+            if email_error:
+                raise PatchError(f"Invalid email: {email_error}")
+        if self.password is not None:
+            if not self.current_password:
+                raise PatchError("Current password is required to change password")
+            if not validate_password_strength(self.password):
+                raise PatchError(
+                    "Password must be at least 8 characters with uppercase, lowercase, and digit"
+                )
+
+    def changes(self, current):
+        """Columns whose requested value differs from ``current`` ({column: value})"""
+        return {
+            column: getattr(self, column)
+            for column in self.COLUMNS
+            if getattr(self, column) is not None
+            and getattr(self, column) != current[column]
+        }
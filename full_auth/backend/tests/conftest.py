@@ -0,0 +1,179 @@
+import pytest
+import sys
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the backend directory and the repository root (for auth_core) to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(BACKEND_DIR, "..", "..")))
+sys.path.insert(0, BACKEND_DIR)
+
+import jwt as pyjwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+class StubProvider:
+    """Local stand-in for an OpenID provider serving a discovery document and a JWKS"""
+
+    def __init__(self):
+        self.keys = {}
+        self.hits = {"discovery": 0, "jwks": 0}
+        self.max_age = 3600
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.issuer = self.url
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def add_key(self, kid):
+        """Generate a new RSA signing key and publish it in the JWKS"""
+        self.keys[kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        return self.keys[kid]
+
+    def sign(self, claims, kid):
+        """Issue an ID token signed with one of the published keys"""
+        return pyjwt.encode(
+            claims, self.keys[kid], algorithm="RS256", headers={"kid": kid}
+        )
+
+    def _handler(self):
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/.well-known/openid-configuration":
+                    provider.hits["discovery"] += 1
+                    body = {"issuer": provider.issuer, "jwks_uri": f"{provider.url}/certs"}
+                elif self.path == "/certs":
+                    provider.hits["jwks"] += 1
+                    body = {
+                        "keys": [
+                            {
+                                **json.loads(
+                                    pyjwt.algorithms.RSAAlgorithm.to_jwk(key.public_key())
+                                ),
+                                "kid": kid,
+                                "alg": "RS256",
+                                "use": "sig",
+                            }
+                            for kid, key in provider.keys.items()
+                        ]
+                    }
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={provider.max_age}")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def stub_provider():
+    """Stub JWKS server running on a random local port"""
+    provider = StubProvider()
+    provider.add_key("key-1")
+    provider.thread.start()
+    yield provider
+    provider.server.shutdown()
+    provider.server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def _push_request_context():
+    """Replace pytest-flask's context around each test
+
+    Requests then push their own app context (and g), as they do in production,
+    so one request's write flag or tenant cannot leak into the next.
+    """
+
+
+@pytest.fixture
+def redis_client():
+    """Redis for the blocklist and user events, emptied before each test"""
+    import redis
+
+    client = redis.from_url(
+        os.getenv("TEST_REDIS_URL", "redis://localhost:6379/3"), decode_responses=True
+    )
+    client.flushdb()
+    return client
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch, redis_client):
+    """Build apps on a temporary SQLite database, with extra settings per test"""
+    import api
+    import profile_patch
+    from main import create_app
+
+    # Read from the environment by create_app and the email link helpers
+    monkeypatch.setenv("SECRET_KEY", "test-secret-key-for-the-full-auth-tests")
+    monkeypatch.setattr(api, "jwt_redis_blocklist", redis_client)
+    # No DNS lookups or emails from the tests
+    for module in (api, profile_patch):
+        monkeypatch.setattr(module, "validate_email_field", lambda email: None)
+    monkeypatch.setattr(api, "send_verify_email", lambda *args: None)
+
+    def make(**config):
+        return create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path}/app.db",
+                "RATELIMIT_STORAGE_URL": "memory://",
+                "AUDIT_ENABLED": False,
+                "LOGIN_TIMING_PADDING": False,
+                "ACCOUNT_PURGE_INTERVAL": 0,
+                **config,
+            }
+        )
+
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    """Test application"""
+    app = make_app()
+    yield app
+    with app.app_context():
+        from model import db
+
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    """Test client"""
+    return app.test_client()
+
+
+@pytest.fixture
+def user_data():
+    """Sample user data"""
+    return {
+        "first_name": "Test",
+        "last_name": "User",
+        "username": "testuser",
+        "email": "test@example.com",
+        "password": "StrongPass123",
+    }
+
+
+@pytest.fixture
+def tokens(client, user_data):
+    """Token pair of a registered user"""
+    response = client.post("/api/auth/register", json=user_data)
+    assert response.status_code == 201
+    return response.get_json()
@@ -0,0 +1,143 @@
+import pytest
+from datetime import timedelta
+from sqlalchemy import event, select
+
+from deletion import mark_deleted, purge_deleted, utcnow
+from model import db, User
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def login(client, user_data):
+    login_data = {"login": user_data["username"], "password": user_data["password"]}
+    return client.post("/api/auth/login", json=login_data)
+
+
+def add_users(count, deleted_ago=None):
+    """Insert users directly, soft-deleted deleted_ago ago when given"""
+    users = [
+        User(
+            first_name="Purge",
+            last_name=f"User {i}",
+            username=f"purge{deleted_ago}{i}",
+            email=f"purge{deleted_ago}{i}@example.com",
+            password_hash="not-a-real-hash",
+            deleted_at=utcnow() - deleted_ago if deleted_ago is not None else None,
+            is_active=deleted_ago is None,
+        )
+        for i in range(count)
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+
+class TestDeleteAccount:
+    """Test DELETE /profile locks the user out at once and keeps the row for the purge"""
+
+    def test_row_is_soft_deleted(self, app, client, tokens):
+        assert client.delete("/api/auth/profile", headers=bearer(tokens["access_token"])).status_code == 200
+
+        with app.app_context():
+            user = db.session.scalars(select(User)).one()
+            assert user.deleted_at is not None
+            assert user.is_active is False
+
+    def test_every_token_of_the_user_is_revoked(self, client, tokens, user_data, redis_client):
+        """Test tokens the request did not carry fail through the per-user key"""
+        other = login(client, user_data).get_json()
+        client.delete("/api/auth/profile", headers=bearer(tokens["access_token"]))
+
+        assert redis_client.keys("rvu:default:*")
+        assert client.get("/api/auth/protected", headers=bearer(other["access_token"])).status_code == 401
+        refresh = client.post("/api/auth/refresh", headers=bearer(other["refresh_token"]))
+        assert refresh.status_code == 401
+
+    def test_deleted_account_cannot_log_in(self, client, tokens, user_data):
+        client.delete("/api/auth/profile", headers=bearer(tokens["access_token"]))
+
+        response = login(client, user_data)
+        assert response.status_code == 400
+        assert response.get_json()["message"] == "Invalid credentials"
+
+    def test_protected_ignores_deleted_rows(self, app, client, tokens):
+        """Test a still-valid token finds no user once the row is flagged"""
+        with app.app_context():
+            user = db.session.scalars(select(User)).one()
+            user.deleted_at = utcnow()
+            db.session.commit()
+
+        response = client.get("/api/auth/protected", headers=bearer(tokens["access_token"]))
+        assert response.status_code == 404
+
+    def test_mark_deleted_skips_deleted_users(self, app, redis_client):
+        with app.app_context():
+            ids = add_users(3)
+            assert mark_deleted(redis_client, ids[:2], batch_size=1) == 2
+            assert mark_deleted(redis_client, ids + ["unknown"]) == 1
+
+
+class TestPurge:
+    """Test soft-deleted rows are removed in batches once old enough"""
+
+    @pytest.fixture
+    def deletes(self, app):
+        """Number of DELETE statements sent during the test"""
+        with app.app_context():
+            engine = db.engine
+        count = [0]
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            count[0] += statement.startswith("DELETE")
+
+        event.listen(engine, "before_cursor_execute", record)
+        yield count
+        event.remove(engine, "before_cursor_execute", record)
+
+    def remaining(self):
+        return set(db.session.scalars(select(User.id)))
+
+    def test_purge_in_batches(self, app, deletes):
+        with app.app_context():
+            active = add_users(2)
+            add_users(5, deleted_ago=timedelta(minutes=1))
+
+            assert purge_deleted(batch_size=2) == 5
+            assert deletes[0] == 3
+            assert self.remaining() == set(active)
+
+    def test_purge_honours_delay(self, app):
+        with app.app_context():
+            recent = add_users(2, deleted_ago=timedelta(minutes=1))
+            add_users(3, deleted_ago=timedelta(hours=2))
+
+            assert purge_deleted(delay=timedelta(hours=1)) == 3
+            assert self.remaining() == set(recent)
+
+    def test_max_batches(self, app):
+        with app.app_context():
+            add_users(5, deleted_ago=timedelta(minutes=1))
+            assert purge_deleted(batch_size=2, max_batches=2) == 4
+
+
+class TestDeletionCommands:
+    """Test the delete-accounts and purge-deleted-accounts commands"""
+
+    def test_delete_then_purge(self, app, redis_client):
+        with app.app_context():
+            ids = add_users(3)
+        runner = app.test_cli_runner()
+
+        result = runner.invoke(args=["delete-accounts", "-", "--batch-size", "2"], input="\n".join(ids[:2]) + "\n")
+        assert result.exit_code == 0
+        assert "Deleted 2 of 2 accounts" in result.output
+
+        result = runner.invoke(args=["purge-deleted-accounts", "--delay", "3600"])
+        assert "Purged 0 accounts" in result.output
+        result = runner.invoke(args=["purge-deleted-accounts"])
+        assert "Purged 2 accounts" in result.output
+
+        with app.app_context():
+            assert set(db.session.scalars(select(User.id))) == {ids[2]}
@@ -0,0 +1,184 @@
+import pytest
+import time
+import jwt as pyjwt
+
+import oauth
+from oauth import ProviderKeyCache, parse_max_age
+
+CLIENT_ID = "test-client-id.apps.googleusercontent.com"
+
+
+@pytest.fixture
+def id_claims(stub_provider):
+    """Claims of a valid ID token for the stub provider"""
+    now = int(time.time())
+    return {
+        "iss": stub_provider.issuer,
+        "aud": CLIENT_ID,
+        "sub": "1234567890",
+        "email": "oauth.user@example.com",
+        "given_name": "OAuth",
+        "family_name": "User",
+        "iat": now,
+        "exp": now + 3600,
+    }
+
+
+@pytest.fixture
+def key_cache(stub_provider):
+    """Key cache pointed at the stub provider"""
+    return ProviderKeyCache(f"{stub_provider.url}/.well-known/openid-configuration")
+
+
+class TestParseMaxAge:
+    """Test Cache-Control handling"""
+
+    def test_max_age(self):
+        """Test max-age is read from Cache-Control"""
+        assert parse_max_age({"Cache-Control": "public, max-age=19845"}) == 19845
+
+    def test_age_is_subtracted(self):
+        """Test time already spent in shared caches is subtracted"""
+        headers = {"Cache-Control": "max-age=100", "Age": "40"}
+        assert parse_max_age(headers) == 60
+
+    def test_no_store(self):
+        """Test no-store disables caching"""
+        assert parse_max_age({"Cache-Control": "no-store"}) == 0
+
+    def test_missing_header(self):
+        """Test a default lifetime is used without Cache-Control"""
+        assert parse_max_age({}) == oauth.DEFAULT_MAX_AGE
+
+
+class TestVerifyIdToken:
+    """Test local ID token verification"""
+
+    def test_verify_success(self, stub_provider, key_cache, id_claims):
+        """Test a valid token returns its claims"""
+        token = stub_provider.sign(id_claims, "key-1")
+        claims = key_cache.verify_id_token(token, audience=CLIENT_ID)
+
+        assert claims["email"] == id_claims["email"]
+        assert claims["given_name"] == "OAuth"
+
+    def test_keys_are_cached(self, stub_provider, key_cache, id_claims):
+        """Test discovery and JWKS are fetched once while fresh"""
+        token = stub_provider.sign(id_claims, "key-1")
+        for _ in range(5):
+            key_cache.verify_id_token(token, audience=CLIENT_ID)
+
+        assert stub_provider.hits == {"discovery": 1, "jwks": 1}
+
+    def test_expired_cache_is_refetched(self, stub_provider, key_cache, id_claims):
+        """Test documents are fetched again once max-age runs out"""
+        stub_provider.max_age = 0
+        token = stub_provider.sign(id_claims, "key-1")
+        key_cache.verify_id_token(token, audience=CLIENT_ID)
+        key_cache.verify_id_token(token, audience=CLIENT_ID)
+
+        assert stub_provider.hits["jwks"] == 2
+
+    def test_key_rotation(self, stub_provider, key_cache, id_claims, monkeypatch):
+        """Test an unknown kid triggers one JWKS refresh"""
+        monkeypatch.setattr(oauth, "MIN_REFRESH_INTERVAL", 0)
+        key_cache.verify_id_token(stub_provider.sign(id_claims, "key-1"), CLIENT_ID)
+
+        stub_provider.add_key("key-2")
+        claims = key_cache.verify_id_token(
+            stub_provider.sign(id_claims, "key-2"), CLIENT_ID
+        )
+
+        assert claims["sub"] == id_claims["sub"]
+        assert stub_provider.hits["jwks"] == 2
+
+    def test_unknown_kid_refresh_is_throttled(self, stub_provider, key_cache, id_claims):
+        """Test repeated unknown kids do not hammer the provider"""
+        key_cache.verify_id_token(stub_provider.sign(id_claims, "key-1"), CLIENT_ID)
+        token = pyjwt.encode(
+            id_claims, stub_provider.keys["key-1"], algorithm="RS256",
+            headers={"kid": "missing"},
+        )
+
+        for _ in range(3):
+            with pytest.raises(pyjwt.InvalidTokenError):
+                key_cache.verify_id_token(token, audience=CLIENT_ID)
+
+        assert stub_provider.hits["jwks"] == 1
+
+    def test_wrong_audience(self, stub_provider, key_cache, id_claims):
+        """Test a token issued to another client is rejected"""
+        token = stub_provider.sign(id_claims, "key-1")
+        with pytest.raises(pyjwt.InvalidAudienceError):
+            key_cache.verify_id_token(token, audience="another-client")
+
+    def test_wrong_issuer(self, stub_provider, key_cache, id_claims):
+        """Test a token from another issuer is rejected"""
+        id_claims["iss"] = "https://evil.example.com"
+        token = stub_provider.sign(id_claims, "key-1")
+        with pytest.raises(pyjwt.InvalidIssuerError):
+            key_cache.verify_id_token(token, audience=CLIENT_ID)
+
+    def test_expired_token(self, stub_provider, key_cache, id_claims):
+        """Test an expired token is rejected"""
+        id_claims["iat"] -= 7200
+        id_claims["exp"] = int(time.time()) - 3600
+        token = stub_provider.sign(id_claims, "key-1")
+        with pytest.raises(pyjwt.ExpiredSignatureError):
+            key_cache.verify_id_token(token, audience=CLIENT_ID)
+
+    def test_forged_signature(self, stub_provider, key_cache, id_claims):
+        """Test a token signed by an unpublished key with a known kid is rejected"""
+        forger = stub_provider.add_key("attacker")
+        del stub_provider.keys["attacker"]
+        token = pyjwt.encode(
+            id_claims, forger, algorithm="RS256", headers={"kid": "key-1"}
+        )
+        with pytest.raises(pyjwt.InvalidSignatureError):
+            key_cache.verify_id_token(token, audience=CLIENT_ID)
+
+
+class TestOAuthCallback:
+    """Test the callback hands the frontend a one-time code instead of the tokens"""
+
+    @pytest.fixture
+    def code(self, client, monkeypatch, id_claims):
+        """Code from a successful callback"""
+        import api
+
+        class StubFlow:
+            credentials = type("Credentials", (), {"id_token": "id-token", "token": "access"})
+
+            def fetch_token(self, **kwargs):
+                pass
+
+        class StubKeys:
+            def verify_id_token(self, token, audience):
+                return id_claims
+
+        monkeypatch.setattr(api, "oauth_flow", StubFlow())
+        monkeypatch.setattr(api, "google_keys", StubKeys())
+        with client.session_transaction() as session:
+            session["state"] = "state"
+
+        response = client.get("/api/auth/oauth2callback?state=state&code=provider-code")
+        assert response.status_code == 302
+        location = response.headers["Location"]
+        assert "token" not in location.split("?")[1]
+        return location.split("code=")[1]
+
+    def test_code_is_exchanged_once(self, client, code):
+        response = client.post("/api/auth/oauth/token", json={"code": code})
+        assert response.status_code == 200
+        tokens = response.get_json()
+
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        assert client.get("/api/auth/protected", headers=headers).get_json()["email"] == "oauth.user@example.com"
+        headers = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+        assert client.post("/api/auth/refresh", headers=headers).status_code == 200
+
+        assert client.post("/api/auth/oauth/token", json={"code": code}).status_code == 400
+
+    def test_invalid_code(self, client):
+        assert client.post("/api/auth/oauth/token", json={"code": "guess"}).status_code == 400
+        assert client.post("/api/auth/oauth/token", json={}).status_code == 400
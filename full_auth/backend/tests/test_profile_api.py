@@ -0,0 +1,113 @@
+import pytest
+from sqlalchemy import event
+
+from events import user_changed
+from model import db
+
+
+@pytest.fixture
+def headers(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements sent to the database during the test"""
+    with app.app_context():
+        engine = db.engine
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield captured
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def updates(statements):
+    return [statement for statement in statements if statement.startswith("UPDATE")]
+
+
+class TestUpdateProfile:
+    """Test PATCH /profile writes only what changed, with optimistic locking"""
+
+    def patch(self, client, headers, **body):
+        return client.patch("/api/auth/profile", json=body, headers=headers)
+
+    def test_update_bumps_version(self, client, headers):
+        response = self.patch(client, headers, first_name="New", version=1)
+
+        assert response.status_code == 200
+        assert response.get_json()["version"] == 2
+        profile = client.get("/api/auth/protected", headers=headers).get_json()
+        assert (profile["first_name"], profile["version"]) == ("New", 2)
+
+    def test_stale_version_conflicts(self, client, headers):
+        assert self.patch(client, headers, first_name="First", version=1).status_code == 200
+
+        response = self.patch(client, headers, first_name="Second", version=1)
+        assert response.status_code == 409
+        profile = client.get("/api/auth/protected", headers=headers).get_json()
+        assert profile["first_name"] == "First"
+
+    def test_no_op_patch_issues_no_update(self, client, headers, user_data, statements):
+        """Test sending back the unchanged profile does not write"""
+        profile = {key: user_data[key] for key in ("first_name", "last_name", "username", "email")}
+        response = self.patch(client, headers, **profile, version=1)
+
+        assert response.get_json() == {"message": "No changes to update", "version": 1}
+        assert updates(statements) == []
+
+    def test_only_changed_columns_are_written(self, client, headers, user_data, statements):
+        profile = {key: user_data[key] for key in ("first_name", "username", "email")}
+        response = self.patch(client, headers, **profile, last_name="Changed")
+
+        assert response.status_code == 200
+        [statement] = updates(statements)
+        assigned = statement.split(" SET ")[1].split(" WHERE ")[0]
+        assert "last_name=" in assigned
+        assert "version=" in assigned
+        for column in ("first_name", "username", "email", "password_hash"):
+            assert f"{column}=" not in assigned
+
+    @pytest.mark.parametrize("field", ["username", "email"])
+    def test_username_or_email_clash_conflicts(self, client, headers, field):
+        other = {
+            "first_name": "Other",
+            "last_name": "User",
+            "username": "otheruser",
+            "email": "other@example.com",
+            "password": "StrongPass123",
+        }
+        assert client.post("/api/auth/register", json=other).status_code == 201
+
+        response = self.patch(client, headers, **{field: other[field]})
+        assert response.status_code == 409
+        assert response.get_json()["error"] == "Username or email already exists"
+
+    def test_password_change_needs_current_password(self, client, headers, user_data):
+        wrong = self.patch(client, headers, password="NewStrong123", current_password="nope")
+        assert wrong.status_code == 400
+
+        changed = self.patch(
+            client, headers, password="NewStrong123", current_password=user_data["password"]
+        )
+        assert changed.status_code == 200
+        login = {"login": user_data["username"], "password": "NewStrong123"}
+        assert client.post("/api/auth/login", json=login).status_code == 200
+
+    def test_user_changed_is_emitted(self, app, client, headers, tokens):
+        received = []
+
+        def on_change(sender, **kwargs):
+            received.append(kwargs)
+
+        with user_changed.connected_to(on_change, app):
+            self.patch(client, headers, first_name="New", email="new@example.com")
+
+        [change] = received
+        assert change["changed"] == {"first_name", "email"}
+        assert change["tenant"] == "default"
+        profile = client.get("/api/auth/protected", headers=headers).get_json()
+        assert change["user_id"] == profile["id"]
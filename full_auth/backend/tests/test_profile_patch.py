@@ -0,0 +1,52 @@
+import pytest
+
+import profile_patch
+from profile_patch import PatchError, ProfilePatch
+
+CURRENT = {
+    "first_name": "Test",
+    "last_name": "User",
+    "username": "testuser",
+    "email": "test@example.com",
+}
+
+
+@pytest.fixture(autouse=True)
+def offline_email_check(monkeypatch):
+    """Skip the DNS lookup of the email validator"""
+    monkeypatch.setattr(profile_patch, "validate_email_field", lambda email: None)
+
+
+class TestProfilePatch:
+    """Test parsing and diffing of PATCH /profile bodies"""
+
+    def test_unchanged_profile_is_a_no_op(self):
+        patch = ProfilePatch.from_json({**CURRENT, "id": "abc", "version": 3})
+        assert patch.changes(CURRENT) == {}
+        assert patch.version == 3
+
+    def test_only_changed_columns(self):
+        patch = ProfilePatch.from_json({**CURRENT, "first_name": " New ", "last_name": ""})
+        assert patch.changes(CURRENT) == {"first_name": "New"}
+
+    def test_wrong_type(self):
+        with pytest.raises(PatchError, match="username must be a string"):
+            ProfilePatch.from_json({"username": 42})
+        with pytest.raises(PatchError, match="version must be an integer"):
+            ProfilePatch.from_json({"version": "3"})
+
+    def test_blank_value(self):
+        with pytest.raises(PatchError, match="must not be blank"):
+            ProfilePatch.from_json({"first_name": "   "})
+
+    def test_not_an_object(self):
+        with pytest.raises(PatchError):
+            ProfilePatch.from_json(["first_name"])
+
+    def test_password_needs_current_password(self):
+        with pytest.raises(PatchError, match="Current password is required"):
+            ProfilePatch.from_json({"password": "NewPass123"})
+
+    def test_weak_password(self):
+        with pytest.raises(PatchError, match="at least 8 characters"):
+            ProfilePatch.from_json({"password": "weak", "current_password": "Old12345"})
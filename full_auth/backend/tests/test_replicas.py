@@ -0,0 +1,47 @@
+import pytest
+
+from model import db
+
+
+class TestReplicas:
+    """Test every kind of write pins the client to the primary"""
+
+    @pytest.fixture
+    def replica_app(self, make_app, tmp_path):
+        """App with an empty SQLite replica, so reads served by it find no users"""
+        app = make_app(SQLALCHEMY_REPLICA_URIS=[f"sqlite:///{tmp_path}/replica.db"])
+        with app.app_context():
+            db.metadata.create_all(app.extensions["replica_router"].engines["replica_0"])
+        return app
+
+    def register(self, client, user_data):
+        """Register, then forget the pin the registration set"""
+        response = client.post("/api/auth/register", json=user_data)
+        assert "db_pin" in response.headers["Set-Cookie"]
+        client.delete_cookie("db_pin")
+        return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+    def test_reads_go_to_replica(self, replica_app, user_data):
+        client = replica_app.test_client()
+        headers = self.register(client, user_data)
+        assert client.get("/api/auth/protected", headers=headers).status_code == 404
+
+    def test_profile_update_pins_client_to_primary(self, replica_app, user_data):
+        """Test the bulk UPDATE of PATCH /profile counts as a write"""
+        client = replica_app.test_client()
+        headers = self.register(client, user_data)
+
+        response = client.patch("/api/auth/profile", json={"first_name": "New"}, headers=headers)
+        assert response.status_code == 200
+        assert "db_pin" in response.headers["Set-Cookie"]
+
+        profile = client.get("/api/auth/protected", headers=headers).get_json()
+        assert (profile["first_name"], profile["version"]) == ("New", 2)
+
+    def test_account_deletion_pins_client_to_primary(self, replica_app, user_data):
+        client = replica_app.test_client()
+        headers = self.register(client, user_data)
+
+        response = client.delete("/api/auth/profile", headers=headers)
+        assert response.status_code == 200
+        assert "db_pin" in response.headers["Set-Cookie"]
@@ -1,5 +1,4 @@
 import os
-import re
 from typing import List, Optional, Tuple
 from flask import jsonify
 from email_validator import validate_email, EmailNotValidError
@@ -8,6 +7,7 @@ import secrets
 from datetime import datetime, timedelta
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, Email, To, Content
+from auth_core.validation import is_strong_password
 
 # Initialize SendGrid client
 sg = SendGridAPIClient(api_key=os.getenv("SENDGRID_API_KEY"))
@@ -29,15 +29,7 @@ def validate_email_field(email: str):
 
 
 def validate_password_strength(password: str) -> bool:
-    if len(password) < 8:
-        return False
-    if not re.search(r"[A-Z]", password):
-        return False
-    if not re.search(r"[a-z]", password):
-        return False
-    if not re.search(r"\d", password):
-        return False
-    return True
+    return is_strong_password(password)
 
 
 def generate_verification_link(user_id):
@@ -12,6 +12,55 @@ axios.interceptors.request.use(config => {
     return config;
 })
 
+// Access tokens are short-lived: on a 401, rotate the token pair once and retry
+axios.interceptors.response.use(
+    response => response,
+    async error => {
+        const original = error.config;
+        const refreshToken = localStorage.getItem("refresh_token");
+        if (error.response?.status !== 401 || !refreshToken || original._retried || original.url === '/refresh') {
+            throw error;
+        }
+        original._retried = true;
+
+        try {
+            const tokens = await refresh(refreshToken);
+            original.headers.Authorization = `Bearer ${tokens.access_token}`;
+            return axios(original);
+        } catch {
+            throw error;
+        }
+    }
+)
+
+function storeTokens(data) {
+    if (data.access_token) {
+        localStorage.setItem("token", data.access_token);
+    }
+    if (data.refresh_token) {
+        localStorage.setItem("refresh_token", data.refresh_token);
+    }
+}
+
+function clearTokens() {
+    localStorage.removeItem("token");
+    localStorage.removeItem("refresh_token");
+}
+
+async function refresh(refreshToken) {
+    try {
+        const response = await axios.post('/refresh', null, {
+            headers: { Authorization: `Bearer ${refreshToken}` },
+        });
+        storeTokens(response.data);
+        return response.data;
+    } catch (error) {
+        // Revoked or reused refresh token: the user has to log in again
+        clearTokens();
+        throw error;
+    }
+}
+
 async function register(credentials) {
     try {
         const response = await axios.post('/register', credentials);
@@ -60,6 +109,18 @@ function login_oauth() {
     window.location.href = `${BASE_URL}/login/oauth`;
 }
 
+// The OAuth callback redirects with a one-time code, exchanged here for the tokens
+async function exchange_oauth_code(code) {
+    try {
+        const response = await axios.post('/oauth/token', { code });
+        storeTokens(response.data);
+        return response.data;
+    } catch (error) {
+        console.error(error);
+        throw error;
+    }
+}
+
 async function check_oauth_status() {
     try {
         const response = await axios.get('/oauth2callback')
@@ -106,12 +167,16 @@ async function delete_profile() {
 
 export {
     check_oauth_status,
+    clearTokens,
     delete_profile,
+    exchange_oauth_code,
     login,
     login_oauth,
     logout,
     protected_route,
+    refresh,
     register,
+    storeTokens,
     update_profile,
     verify_token
 };
@@ -1,6 +1,6 @@
 import { createContext, useEffect, useState } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
-import { delete_profile, login, login_oauth, logout, protected_route, register, update_profile } from '../api/authApi';
+import { clearTokens, delete_profile, exchange_oauth_code, login, login_oauth, logout, protected_route, register, storeTokens, update_profile } from '../api/authApi';
 
 // Create a context
 export const AuthContext = createContext();
@@ -16,15 +16,15 @@ const AuthProvider = ({ children }) => {
     // Handle OAuth callback when user returns from Google
     useEffect(() => {
         const handleOAuthCallback = async () => {
-            // Check if this is an OAuth callback with token in URL
+            // Check if this is an OAuth callback with a one-time code in the URL
             const urlParams = new URLSearchParams(location.search);
-            const accessToken = urlParams.get('token') || urlParams.get('access_token');
+            const code = urlParams.get('code');
             
-            if (accessToken && location.pathname.includes('oauth')) {
+            if (code && location.pathname.includes('oauth')) {
                 try {
                     setLoading(true);
-                    setToken(accessToken);
-                    localStorage.setItem('token', accessToken);
+                    const tokens = await exchange_oauth_code(code);
+                    setToken(tokens.access_token);
                     
                     // Get user info
                     const userResponse = await protected_route();
@@ -68,10 +68,10 @@ const AuthProvider = ({ children }) => {
             setLoading(true);
             const res = await login(credentials);
 
-            // Backend returns: { message, access_token }
+            // Backend returns: { message, access_token, refresh_token }
             if (res.access_token) {
                 setToken(res.access_token);
-                localStorage.setItem('token', res.access_token);
+                storeTokens(res);
                 
                 // Get user info using the protected route
                 try {
@@ -102,10 +102,10 @@ const AuthProvider = ({ children }) => {
             setLoading(true);
             const res = await register(credentials);
 
-            // Backend returns: { message, access_token }
+            // Backend returns: { message, access_token, refresh_token }
             if (res.access_token) {
                 setToken(res.access_token);
-                localStorage.setItem('token', res.access_token);
+                storeTokens(res);
                 
                 // Get user info using the protected route
                 try {
@@ -143,7 +143,7 @@ const AuthProvider = ({ children }) => {
             // Clear local state regardless of API call success
             setUser(null);
             setToken(null);
-            localStorage.removeItem('token');
+            clearTokens();
             setLoading(false);
             navigate('/login');
         }
@@ -169,7 +169,8 @@ const AuthProvider = ({ children }) => {
 
     const updateUserProfile = async (data) => {
         const res = await update_profile(data);
-        setUser(prev => ({ ...prev, ...data }));
+        // Keep the new version so the next edit is not rejected as stale
+        setUser(prev => ({ ...prev, ...data, version: res.version }));
         return res;
     };
 
@@ -178,7 +179,7 @@ const AuthProvider = ({ children }) => {
             await delete_profile();
             setUser(null);
             setToken(null);
-            localStorage.removeItem("token");
+            clearTokens();
             navigate('/login');
         } catch (error) {
             console.error("Account deletion failed:", error);
@@ -11,6 +11,7 @@ const ProfilePage = () => {
     e.preventDefault();
     try {
         const res = await updateUserProfile(form);
+        setForm(prev => ({ ...prev, version: res.version }));
         setMessage(res.message || 'Profile updated');
         setEditing(false);
     } catch (err) {
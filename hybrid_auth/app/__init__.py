@@ -0,0 +1,72 @@
+import os
+import sys
+
+# The shared auth_core package lives at the repository root
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from flask import Flask
+from app.hybrid_api import jwt_manager, login_manager, bp_jwt, bp_session, HybridIdentity
+from app.hybrid_model import db, users
+from auth_core.rate_limit import limiter
+from auth_core.metrics import metrics
+from auth_core.tenancy import tenancy
+from auth_core.replicas import replicas
+from auth_core.audit import audit
+from auth_core.identity import identities
+from auth_core.lockout import lockout
+from auth_core.hashing import passwords
+from config import DevelopmentConfig, TestingConfig, ProductionConfig
+
+
+def create_app(config=None):
+    """Serve session cookies (/api/session) and bearer tokens (/api/jwt) over one user table"""
+    app = Flask(__name__, instance_relative_config=True)
+
+    config_map = {
+        "development": DevelopmentConfig,
+        "testing": TestingConfig,
+        "production": ProductionConfig,
+    }
+
+    config_name = config or os.getenv("FLASK_ENV", "development")
+    config_class = config_map.get(config_name.lower(), DevelopmentConfig)
+    app.config.from_object(config_class)
+
+    # Initialize extensions
+    tenancy.init_app(app)
+    jwt_manager.init_app(app)
+    replicas.init_app(app)
+    db.init_app(app)
+    identities.init_app(app, users, identity=HybridIdentity)
+    limiter.init_app(app)
+    lockout.init_app(app)
+    passwords.init_app(app)
+    metrics.init_app(app)
+    audit.init_app(app, engine=lambda: db.engine)
+    login_manager.init_app(app)
+
+    # Register blueprints
+    app.register_blueprint(bp_jwt, url_prefix="/api/jwt")
+    app.register_blueprint(bp_session, url_prefix="/api/session")
+
+    @app.route("/")
+    def check():
+        return f"API is running in {config_name} mode!"
+
+    @app.route("/health")
+    def health_check():
+        try:
+            from sqlalchemy import text
+
+            db.session.execute(text("SELECT 1"))
+            return {"status": "healthy", "database": "connected"}, 200
+        except Exception as e:
+            return {"status": "unhealthy", "error": str(e)}, 500
+
+    # Both mechanisms share the table, so create it up front (it has no migrations yet)
+    with app.app_context():
+        db.create_all()
+
+    return app
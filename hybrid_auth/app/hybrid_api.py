@@ -0,0 +1,285 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import current_user as token_user, get_jwt, jwt_required
+from flask_login import (
+    LoginManager,
+    UserMixin,
+    current_user as session_user,
+    login_required,
+    login_user,
+    logout_user,
+)
+from app.hybrid_model import db, HybridUser, users
+from auth_core.identity import Identity, identities
+from auth_core.rate_limit import limiter
+from auth_core.refresh_tokens import issue_tokens, rotate_tokens, revoke_family
+from auth_core.revocation import RevocationStore
+from auth_core.token_cache import CachingJWTManager
+from auth_core.tenancy import current_tenant, tenant_key
+from auth_core.replicas import replicas
+from auth_core.audit import audit
+from auth_core.lockout import lockout, locked_response
+from auth_core.hashing import passwords
+from auth_core.validation import is_valid_email, password_problem
+from dataclasses import dataclass
+import redis
+
+jwt_manager = CachingJWTManager()
+login_manager = LoginManager()
+
+# Bearer tokens for services, cookies for browsers; both resolve users the same way
+bp_jwt = Blueprint("jwt_auth", __name__)
+bp_session = Blueprint("session_auth", __name__)
+
+
+@dataclass(frozen=True)
+class HybridIdentity(Identity, UserMixin):
+    """Identity usable as Flask-Login's current_user and flask_jwt_extended's"""
+
+
+def get_redis_client():
+    """Get Redis client from current app configuration"""
+    return redis.from_url(current_app.config.get("REDIS_URL"), decode_responses=True)
+
+
+@login_manager.user_loader
+def load_session_user(user_id):
+    return identities.resolve(user_id)
+
+
+@login_manager.unauthorized_handler
+def session_required():
+    return jsonify({"error": "Login required"}), 401
+
+
+@jwt_manager.user_lookup_loader
+def load_token_user(jwt_header, jwt_payload):
+    return identities.resolve(jwt_payload["sub"])
+
+
+@jwt_manager.user_lookup_error_loader
+def token_user_not_found(jwt_header, jwt_payload):
+    return jsonify({"error": "User not found"}), 404
+
+
+@jwt_manager.token_in_blocklist_loader
+def check_if_token_is_revoked(jwt_header, jwt_payload: dict):
+    """Check if a JWT token is in the blocklist"""
+    return RevocationStore(get_redis_client(), current_tenant()).is_revoked(jwt_payload)
+
+
+@jwt_manager.encode_key_loader
+def tenant_signing_key(identity):
+    """Sign tokens with the current tenant's key"""
+    return tenant_key()
+
+
+@jwt_manager.decode_key_loader
+def tenant_verification_key(jwt_header, jwt_payload):
+    """Verify with the key of the tenant the request is for (not the one the token claims)"""
+    return tenant_key()
+
+
+def json_body():
+    """The request's JSON object, or None if there is none"""
+    if not request.is_json:
+        return None
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
+def profile_response(identity):
+    return (
+        jsonify(
+            {
+                "message": f"{identity.username}'s profile retrieved successfully",
+                "data": identity.profile(),
+            }
+        ),
+        200,
+    )
+
+
+@limiter.limit("register")
+def register():
+    """Register a new user (the account works with both login mechanisms)"""
+    user_data = json_body()
+    if not user_data:
+        return jsonify({"error": "Request must be a JSON object"}), 400
+
+    required_fields = ["first_name", "last_name", "username", "email", "password"]
+    user_info = {}
+    for field in required_fields:
+        value = user_data.get(field)
+        if not value or not str(value).strip():
+            return jsonify({"error": f"{field} is required"}), 400
+        user_info[field] = str(value).strip()
+
+    if not is_valid_email(user_info["email"]):
+        return jsonify({"error": "Invalid email format"}), 400
+
+    problem = password_problem(user_info["password"])
+    if problem:
+        return jsonify({"error": problem}), 400
+
+    tenant = current_tenant()
+    taken = users.taken(tenant, user_info["username"], user_info["email"])
+    if taken == "username":
+        return jsonify({"error": "Username already exists"}), 409
+    if taken == "email":
+        return jsonify({"error": "Email already exists"}), 409
+
+    try:
+        new_user = users.add(
+            HybridUser(
+                tenant=tenant,
+                first_name=user_info["first_name"],
+                last_name=user_info["last_name"],
+                username=user_info["username"],
+                email=user_info["email"],
+                password_hash=passwords.hash(user_info["password"]),
+            )
+        )
+        user_id = new_user.id
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Registration failed"}), 500
+
+    audit.record("register", user_id=user_id)
+    return jsonify({"message": "New user created successfully"}), 201
+
+
+bp_jwt.add_url_rule("/register", view_func=register, methods=["POST"])
+bp_session.add_url_rule("/register", view_func=register, methods=["POST"])
+
+
+def authenticate(method):
+    """Check the identifier and password of a login request
+
+    Returns:
+        tuple: (Identity, None) on success, (None, error response) otherwise
+    """
+    data = json_body()
+    if not data:
+        return None, (jsonify({"error": "Request must be a JSON object"}), 400)
+
+    identifier = data.get("identifier")
+    password = data.get("password")
+    if not identifier or not password:
+        return None, (jsonify({"error": "identifier and password are required"}), 400)
+
+    # Refuse locked-out identifiers and IPs before any lookup or hash
+    retry_after = lockout.check(identifier)
+    if retry_after:
+        audit.record("login_locked", identifier=identifier, method=method)
+        return None, locked_response(retry_after)
+
+    user = users.find(current_tenant(), identifier)
+    if user is None:
+        # Answer no sooner than a wrong password would be
+        passwords.pad_unknown_user()
+        lockout.failed(identifier)
+        audit.record("login_failed", identifier=identifier, reason="unknown_user", method=method)
+        return None, (jsonify({"error": "Invalid credentials"}), 401)
+
+    if not passwords.check(user.password_hash, password):
+        lockout.failed(identifier)
+        audit.record("login_failed", user_id=user.id, reason="bad_password", method=method)
+        return None, (jsonify({"error": "Invalid credentials"}), 401)
+
+    lockout.succeeded(identifier)
+    audit.record("login", user_id=user.id, method=method)
+    return HybridIdentity.from_user(user), None
+
+
+@bp_jwt.route("/login", methods=["POST"])
+@limiter.limit("login", identifier_field="identifier")
+@replicas.read_only
+def jwt_login():
+    """Login a service and return an access/refresh token pair"""
+    identity, error = authenticate("jwt")
+    if error:
+        return error
+
+    access_token, refresh_token = issue_tokens(get_redis_client(), identity.id)
+    return (
+        jsonify(
+            {
+                "message": f"User {identity.username} logged in successfully",
+                "access_token": access_token,
+                "refresh_token": refresh_token,
+            }
+        ),
+        200,
+    )
+
+
+@bp_jwt.route("/refresh", methods=["POST"])
+@jwt_required(refresh=True)
+def jwt_refresh():
+    """Exchange a refresh token for a new access/refresh token pair"""
+    tokens = rotate_tokens(get_redis_client(), get_jwt())
+    if tokens is None:
+        audit.record("refresh_rejected", user_id=get_jwt()["sub"])
+        return jsonify({"error": "Refresh token is no longer valid"}), 401
+
+    access_token, refresh_token = tokens
+    return (
+        jsonify(
+            {
+                "message": "Tokens refreshed successfully",
+                "access_token": access_token,
+                "refresh_token": refresh_token,
+            }
+        ),
+        200,
+    )
+
+
+@bp_jwt.route("/logout", methods=["DELETE"])
+@jwt_required()
+def jwt_logout():
+    """Revoke the access token and end its refresh token family"""
+    claims = get_jwt()
+    redis_client = get_redis_client()
+    RevocationStore(redis_client, current_tenant()).revoke(claims)
+    revoke_family(redis_client, claims)
+    jwt_manager.evict(claims)
+    audit.record("logout", user_id=claims["sub"], method="jwt")
+    return jsonify({"message": "Access token revoked"}), 200
+
+
+@bp_jwt.route("/profile", methods=["GET"])
+@jwt_required()
+@replicas.read_only
+def jwt_profile():
+    return profile_response(token_user)
+
+
+@bp_session.route("/login", methods=["POST"])
+@limiter.limit("login", identifier_field="identifier")
+@replicas.read_only
+def session_login():
+    """Login a browser with a session cookie"""
+    identity, error = authenticate("session")
+    if error:
+        return error
+
+    remember = bool((json_body() or {}).get("remember", False))
+    login_user(identity, remember=remember)
+    return jsonify({"message": f"User {identity.username} logged in successfully"}), 200
+
+
+@bp_session.route("/logout", methods=["POST"])
+@login_required
+def session_logout():
+    audit.record("logout", user_id=session_user.id, method="session")
+    logout_user()
+    return jsonify({"message": "Logged out user successfully"}), 200
+
+
+@bp_session.route("/profile", methods=["GET"])
+@replicas.read_only
+@login_required
+def session_profile():
+    return profile_response(session_user)
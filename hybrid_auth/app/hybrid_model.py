@@ -0,0 +1,20 @@
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import UniqueConstraint
+from auth_core.replicas import RoutingSession
+from auth_core.users import UserColumns, UserRepository
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+class HybridUser(UserColumns, db.Model):
+    """One user table for both browser sessions and bearer tokens (columns in UserColumns)"""
+
+    __tablename__ = "users"
+    # Composite unique indexes also serve the per-tenant username/email lookups
+    __table_args__ = (
+        UniqueConstraint("tenant", "username", name="uq_users_tenant_username"),
+        UniqueConstraint("tenant", "email", name="uq_users_tenant_email"),
+    )
+
+
+users = UserRepository(db, HybridUser)
@@ -0,0 +1,73 @@
+import os
+import json
+from datetime import timedelta
+from auth_core.config import CoreConfig, env_list
+
+
+class BaseConfig(CoreConfig):
+    """Base configuration with common settings (shared ones in CoreConfig)"""
+
+    # Session cookies are signed per tenant so they cannot be replayed across products
+    TENANT_SESSION_COOKIES = True
+    # Short-lived access tokens keep blocklist entries short-lived too;
+    # sessions are extended through rotating refresh tokens
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    JWT_ALGORITHM = "HS256"
+    # Verified claims kept per worker so repeat requests skip the signature check (0 disables)
+    JWT_DECODE_CACHE_SIZE = int(os.getenv("JWT_DECODE_CACHE_SIZE", 10000))
+    # Optional explicit signing keys ({"tenant": "secret"}); others are derived from JWT_SECRET_KEY
+    JWT_TENANT_KEYS = json.loads(os.getenv("JWT_TENANT_KEYS", "{}"))
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # Users resolved from cookies and tokens, kept per worker for IDENTITY_CACHE_TTL seconds
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", 10000))
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", 60))
+
+
+class DevelopmentConfig(BaseConfig):
+    """Development configuration"""
+
+    DEBUG = True
+    TESTING = False
+    SQLALCHEMY_DATABASE_URI = os.getenv("DEV_DATABASE_URI", "sqlite:///development.db")
+    SQLALCHEMY_REPLICA_URIS = env_list("DEV_DATABASE_REPLICA_URIS")
+    SECRET_KEY = os.getenv("DEV_SECRET_KEY", "dev-secret-change-in-production")
+    JWT_SECRET_KEY = os.getenv("DEV_JWT_SECRET_KEY", "dev-secret-change-in-production")
+    REDIS_URL = os.getenv("DEV_REDIS_URL", "redis://localhost:6379/1")
+    RATELIMIT_STORAGE_URL = os.getenv("DEV_RATELIMIT_STORAGE_URL", "memory://")
+
+
+class ProductionConfig(BaseConfig):
+    """Production configuration"""
+
+    DEBUG = False
+    TESTING = False
+    SQLALCHEMY_DATABASE_URI = os.getenv("PROD_DATABASE_URI", "sqlite:///production.db")
+    # Comma-separated read replicas of PROD_DATABASE_URI for read-only endpoints
+    SQLALCHEMY_REPLICA_URIS = env_list("PROD_DATABASE_REPLICA_URIS")
+    SECRET_KEY = os.getenv("PROD_SECRET_KEY")
+    JWT_SECRET_KEY = os.getenv("PROD_JWT_SECRET_KEY")
+    REDIS_URL = os.getenv("PROD_REDIS_URL", "redis://localhost:6379/0")
+    # Counters must be shared by all workers in production
+    RATELIMIT_STORAGE_URL = os.getenv("PROD_RATELIMIT_STORAGE_URL", REDIS_URL)
+
+    # Validation for production
+    def __init__(self):
+        if not os.getenv("PROD_SECRET_KEY") or not os.getenv("PROD_JWT_SECRET_KEY"):
+            raise ValueError("PROD_SECRET_KEY and PROD_JWT_SECRET_KEY must be set in production")
+
+
+class TestingConfig(BaseConfig):
+    """Testing configuration"""
+
+    DEBUG = False
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SECRET_KEY = "test-session-secret-key-123"
+    JWT_SECRET_KEY = "test-jwt-secret-key-123"
+    REDIS_URL = "redis://localhost:6379/2"
+    TENANTS = ["default", "acme", "globex"]
+    RATELIMIT_STORAGE_URL = "memory://"
+    AUDIT_ENABLED = False
+    LOGIN_TIMING_PADDING = False
+    WTF_CSRF_ENABLED = False
@@ -0,0 +1,142 @@
+import os
+import sys
+import click
+from flask.cli import with_appcontext
+from app import create_app
+from app.hybrid_model import db
+
+# Create app instance
+app = create_app()
+
+
+@click.command()
+@click.option("--count", "-n", default=1000, help="Number of users in the pool")
+@click.option("--prefix", default="loadtest", help="Username prefix of pool users")
+@click.option("--password", default="LoadTest123!", help="Password shared by pool users")
+@click.option(
+    "--hash-method",
+    default="pbkdf2:sha256:1",
+    help="Werkzeug hash method (the fast default keeps logins cheap; use scrypt to match production)",
+)
+@click.option("--batch-size", default=5000, help="Rows per INSERT statement")
+@click.option("--tenant", default="default", help="Tenant the pool users belong to")
+@with_appcontext
+def seed_users(count, prefix, password, hash_method, batch_size, tenant):
+    """Bulk-create a pool of load-test users (skips users that already exist)."""
+    from sqlalchemy import insert, select
+    from werkzeug.security import generate_password_hash
+    from app.hybrid_model import HybridUser
+    from auth_core.validation import generate_uuid
+
+    existing = set(
+        db.session.scalars(
+            select(HybridUser.username).where(
+                HybridUser.tenant == tenant, HybridUser.username.like(f"{prefix}%")
+            )
+        )
+    )
+
+    # All pool users share one password, so it only needs hashing once
+    password_hash = generate_password_hash(password, method=hash_method)
+    rows = [
+        {
+            "id": generate_uuid(),
+            "tenant": tenant,
+            "first_name": "Load",
+            "last_name": f"Test {i}",
+            "username": f"{prefix}{i:06d}",
+            "email": f"{prefix}{i:06d}@loadtest.local",
+            "password_hash": password_hash,
+        }
+        for i in range(count)
+        if f"{prefix}{i:06d}" not in existing
+    ]
+
+    try:
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(insert(HybridUser), rows[start : start + batch_size])
+        db.session.commit()
+        click.echo(f"✅ Seeded {len(rows)} users ({count - len(rows)} already existed).")
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"❌ Error seeding users: {e}")
+
+
+@click.command()
+@click.option("--host", default="0.0.0.0", help="Interface to bind")
+@click.option(
+    "--port",
+    default=lambda: int(os.getenv("PORT", 8000)),
+    type=int,
+    help="Port to bind",
+)
+@click.option(
+    "--workers",
+    "-w",
+    default=lambda: int(os.getenv("WEB_CONCURRENCY", 0)) or None,
+    type=int,
+    help="Worker processes (default: 2 x CPUs + 1)",
+)
+@click.option(
+    "--threads",
+    "-t",
+    default=lambda: int(os.getenv("WEB_THREADS", 4)),
+    type=int,
+    help="Threads per worker",
+)
+@click.option(
+    "--timeout", default=30, type=int, help="Seconds before a silent worker is restarted"
+)
+@click.option(
+    "--graceful-timeout",
+    default=30,
+    type=int,
+    help="Seconds to finish in-flight requests on reload/stop",
+)
+@click.option(
+    "--max-requests",
+    default=10000,
+    type=int,
+    help="Requests before a worker is recycled (0 disables)",
+)
+@click.option("--pidfile", default=None, help="Write the master PID here (for kill -HUP)")
+def serve(
+    host, port, workers, threads, timeout, graceful_timeout, max_requests, pidfile
+):
+    """Run the app with the production Gunicorn server."""
+    from auth_core.server import serve as run_server, default_workers
+
+    workers = workers or default_workers()
+    click.echo(f"🚀 Serving on {host}:{port} with {workers} workers x {threads} threads")
+    run_server(
+        app,
+        bind=f"{host}:{port}",
+        workers=workers,
+        threads=threads,
+        timeout=timeout,
+        graceful_timeout=graceful_timeout,
+        max_requests=max_requests,
+        pidfile=pidfile,
+    )
+
+
+# Register CLI commands
+app.cli.add_command(seed_users)
+app.cli.add_command(serve)
+
+
+if __name__ == "__main__":
+    # python3 run.py serve [options] starts the production server
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve(sys.argv[2:])
+
+    env = os.getenv("FLASK_ENV", "development")
+
+    click.echo(f"🚀 Starting Flask app in {env} mode...")
+
+    if env == "development":
+        app.run(debug=True, host="0.0.0.0", port=5000)
+    elif env == "testing":
+        app.run(debug=False, host="127.0.0.1", port=5001)
+    else:  # production
+        serve([])
@@ -0,0 +1,47 @@
+import pytest
+import sys
+import os
+
+# Add the app directory and the repository root (for auth_core) to Python path
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(APP_DIR))
+sys.path.insert(0, APP_DIR)
+
+from app import create_app
+from app.hybrid_model import db, HybridUser
+
+
+@pytest.fixture
+def app():
+    """Create test application with in-memory database"""
+    app = create_app(config="testing")
+
+    yield app
+    # Clean up after test
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture(autouse=True)
+def _push_request_context():
+    """Replace pytest-flask's context around each test
+
+    Requests then push their own app context (and g), as they do in production,
+    so Flask-Login cannot reuse a user that an earlier request loaded.
+    """
+
+
+@pytest.fixture
+def client(app):
+    """Test client"""
+    return app.test_client()
+
+
+@pytest.fixture(autouse=True)
+def clean_db(app):
+    """Clean database before each test"""
+    with app.app_context():
+        # Clear all users before each test
+        db.session.query(HybridUser).delete()
+        db.session.commit()
+
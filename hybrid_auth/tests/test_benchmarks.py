@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+PASSWORD = "StrongPass123!"
+
+
+@pytest.fixture
+def logged_in(app):
+    """One user, logged in both with a session cookie and with a bearer token"""
+    app.config["RATELIMIT_ENABLED"] = False
+    client = app.test_client()
+    client.post(
+        "/api/jwt/register",
+        json={
+            "first_name": "Bench",
+            "last_name": "User",
+            "username": "benchuser",
+            "email": "bench@example.com",
+            "password": PASSWORD,
+        },
+    )
+    login = {"identifier": "benchuser", "password": PASSWORD}
+    tokens = client.post("/api/jwt/login", json=login).get_json()
+    client.post("/api/session/login", json=login)
+    return client, {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+@pytest.mark.benchmark(group="hybrid-profile")
+class TestHybridProfileBenchmarks:
+    """Authenticated request cost of each mechanism, same process, same user row"""
+
+    def test_profile_with_cookie(self, logged_in, benchmark):
+        client, _ = logged_in
+        response = benchmark(client.get, "/api/session/profile")
+        assert response.status_code == 200
+
+    def test_profile_with_bearer_token(self, logged_in, benchmark):
+        client, headers = logged_in
+        response = benchmark(client.get, "/api/jwt/profile", headers=headers)
+        assert response.status_code == 200
+
+    def test_profile_with_cookie_uncached(self, app, logged_in, benchmark):
+        app.config["IDENTITY_CACHE_TTL"] = 0
+        client, _ = logged_in
+        response = benchmark(client.get, "/api/session/profile")
+        assert response.status_code == 200
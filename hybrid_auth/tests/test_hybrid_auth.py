@@ -0,0 +1,170 @@
+import pytest
+
+
+@pytest.fixture
+def user_data():
+    """Sample user data"""
+    return {
+        "first_name": "Test",
+        "last_name": "User",
+        "username": "testuser",
+        "email": "test@example.com",
+        "password": "StrongPass123!",
+    }
+
+
+def token_login(client, user_data, **kwargs):
+    response = client.post(
+        "/api/jwt/login",
+        json={"identifier": user_data["username"], "password": user_data["password"]},
+        **kwargs,
+    )
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def session_login(client, user_data, **kwargs):
+    response = client.post(
+        "/api/session/login",
+        json={"identifier": user_data["username"], "password": user_data["password"]},
+        **kwargs,
+    )
+    assert response.status_code == 200
+    return response
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+class TestSharedUsers:
+    """Test both mechanisms work over one user table"""
+
+    def test_register_once_login_both_ways(self, app, client, user_data):
+        """Test an account registered through either prefix works with both"""
+        assert client.post("/api/session/register", json=user_data).status_code == 201
+
+        tokens = token_login(app.test_client(), user_data)
+        session_login(client, user_data)
+
+        by_token = client.get("/api/jwt/profile", headers=bearer(tokens["access_token"]))
+        by_cookie = client.get("/api/session/profile")
+        assert by_token.status_code == by_cookie.status_code == 200
+        assert by_token.get_json()["data"] == by_cookie.get_json()["data"]
+
+    def test_duplicates_span_both_prefixes(self, client, user_data):
+        """Test a username taken through one prefix is taken for the other"""
+        assert client.post("/api/jwt/register", json=user_data).status_code == 201
+        response = client.post("/api/session/register", json=user_data)
+        assert response.status_code == 409
+        assert response.get_json()["error"] == "Username already exists"
+
+    def test_wrong_password_rejected_for_both(self, client, user_data):
+        client.post("/api/jwt/register", json=user_data)
+        wrong = {"identifier": "testuser", "password": "WrongPass123!"}
+        assert client.post("/api/jwt/login", json=wrong).status_code == 401
+        assert client.post("/api/session/login", json=wrong).status_code == 401
+
+    def test_unknown_user_looks_like_wrong_password(self, client, user_data):
+        """Test the response does not tell whether the account exists"""
+        client.post("/api/jwt/register", json=user_data)
+        wrong = {"identifier": "testuser", "password": "WrongPass123!"}
+        unknown = {"identifier": "nobody", "password": "WrongPass123!"}
+        for prefix in ("/api/jwt", "/api/session"):
+            responses = [client.post(f"{prefix}/login", json=data) for data in (wrong, unknown)]
+            assert [r.status_code for r in responses] == [401, 401]
+            assert [r.get_json() for r in responses] == [{"error": "Invalid credentials"}] * 2
+
+    def test_profile_requires_credentials(self, client):
+        """Test each prefix only accepts its own mechanism"""
+        response = client.get("/api/session/profile")
+        assert response.status_code == 401
+        assert response.get_json()["error"] == "Login required"
+        assert client.get("/api/jwt/profile").status_code == 401
+
+
+class TestIdentityCache:
+    """Test cookie and bearer requests resolve users through one cache"""
+
+    @pytest.fixture
+    def lookups(self, monkeypatch):
+        """Count the user loads that reach the database"""
+        from app.hybrid_model import users
+
+        calls = []
+        get = users.get
+
+        def counting_get(user_id, tenant=None):
+            calls.append(user_id)
+            return get(user_id, tenant)
+
+        monkeypatch.setattr(users, "get", counting_get)
+        return calls
+
+    def test_mechanisms_share_entries(self, app, client, user_data, lookups):
+        """Test a user loaded for a cookie is not loaded again for a token"""
+        client.post("/api/jwt/register", json=user_data)
+        tokens = token_login(app.test_client(), user_data)
+        session_login(client, user_data)
+
+        assert client.get("/api/session/profile").status_code == 200
+        assert client.get("/api/jwt/profile", headers=bearer(tokens["access_token"])).status_code == 200
+        assert client.get("/api/session/profile").status_code == 200
+        assert len(lookups) == 1
+
+    def test_entries_expire(self, app, client, user_data, lookups):
+        app.config["IDENTITY_CACHE_TTL"] = 0
+        client.post("/api/jwt/register", json=user_data)
+        session_login(client, user_data)
+
+        client.get("/api/session/profile")
+        client.get("/api/session/profile")
+        assert len(lookups) == 2
+
+    def test_removed_user_not_resolved(self, app, client, user_data):
+        """Test a token of a user that no longer exists is refused"""
+        from app.hybrid_model import db, HybridUser
+        from auth_core.identity import identities
+
+        client.post("/api/jwt/register", json=user_data)
+        tokens = token_login(client, user_data)
+        with app.app_context():
+            user = HybridUser.query.filter_by(username="testuser").one()
+            db.session.delete(user)
+            db.session.commit()
+            identities.evict(user.id)
+
+        response = client.get("/api/jwt/profile", headers=bearer(tokens["access_token"]))
+        assert response.status_code == 404
+
+    def test_tenants_do_not_share_identities(self, app, client, user_data):
+        """Test credentials of one tenant resolve nothing in another"""
+        client.post("/api/jwt/register", json=user_data)
+        tokens = token_login(client, user_data)
+        session_login(client, user_data)
+
+        other = {"X-Tenant-ID": "acme"}
+        assert client.get("/api/session/profile", headers=other).status_code == 401
+        response = client.get(
+            "/api/jwt/profile", headers={**bearer(tokens["access_token"]), **other}
+        )
+        assert response.status_code == 422
+
+
+class TestLogout:
+    def test_token_logout(self, client, user_data):
+        client.post("/api/jwt/register", json=user_data)
+        tokens = token_login(client, user_data)
+
+        assert client.delete("/api/jwt/logout", headers=bearer(tokens["access_token"])).status_code == 200
+        assert client.get("/api/jwt/profile", headers=bearer(tokens["access_token"])).status_code == 401
+
+    def test_session_logout_keeps_tokens(self, client, user_data):
+        """Test ending the browser session does not revoke service tokens"""
+        client.post("/api/jwt/register", json=user_data)
+        tokens = token_login(client, user_data)
+        session_login(client, user_data)
+
+        assert client.post("/api/session/logout").status_code == 200
+        assert client.get("/api/session/profile").status_code == 401
+        assert client.get("/api/jwt/profile", headers=bearer(tokens["access_token"])).status_code == 200
@@ -1,10 +1,29 @@
+import os
+import sys
+
+# The shared auth_core package lives at the repository root
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from app.jwt_api import jwt_manager, bp_jwt
-from app.jwt_model import db
+from app.jwt_model import db, JWTUser, users
+from app.sharding import shards
+from auth_core.rate_limit import limiter
+from auth_core.metrics import metrics
+from auth_core.tenancy import tenancy
+from auth_core.replicas import replicas
+from auth_core.audit import audit
+from auth_core.lockout import lockout
+from auth_core.hashing import passwords
+from auth_core.introspection import introspection
+from auth_core.clients import admin_clients, service_clients
+from auth_core.export import user_export
+from auth_core.listing import user_listing
+from auth_core.identity import identities
 from config import DevelopmentConfig, TestingConfig, ProductionConfig
-import os
 
 # Set up database migration when the schema changes
 migrate = Migrate()
@@ -25,8 +44,22 @@ def create_app(config=None):
     app.config.from_object(config_class)
 
     # Initialize extensions
+    tenancy.init_app(app)
     jwt_manager.init_app(app)
+    replicas.init_app(app)
+    shards.init_app(app)
     db.init_app(app)
+    identities.init_app(app, users)
+    limiter.init_app(app)
+    lockout.init_app(app)
+    passwords.init_app(app)
+    service_clients.init_app(app)
+    admin_clients.init_app(app)
+    user_export.init_app(app)
+    user_listing.init_app(app)
+    introspection.init_app(app)
+    metrics.init_app(app)
+    audit.init_app(app, engine=lambda: db.engine)
 
     if not app.config.get("TESTING"):
         migrate.init_app(app, db)
@@ -51,5 +84,7 @@ def create_app(config=None):
     with app.app_context():
         if app.config.get("TESTING"):
             db.create_all()
+            for engine in app.extensions["user_shards"].engines:
+                JWTUser.__table__.create(engine, checkfirst=True)
 
     return app
@@ -1,21 +1,29 @@
-from flask import Flask, Blueprint, jsonify, request
+from flask import Flask, Blueprint, Response, current_app, jsonify, request, stream_with_context
 from flask_jwt_extended import (
-    create_access_token,
     get_jwt_identity,
     jwt_required,
-    JWTManager,
     get_jwt,
 )
-from app.jwt_model import db, JWTUser
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import or_
+from app.jwt_model import db, JWTUser, users
+from auth_core.rate_limit import limiter
+from auth_core.refresh_tokens import issue_tokens, rotate_tokens, revoke_family
+from auth_core.revocation import RevocationStore
+from auth_core.token_cache import CachingJWTManager
+from auth_core.tenancy import current_tenant, tenant_key
+from auth_core.replicas import replicas
+from auth_core.audit import audit
+from auth_core.lockout import lockout, locked_response
+from auth_core.hashing import passwords
+from auth_core.introspection import introspection
+from auth_core.clients import admin_clients, service_clients
+from auth_core.export import user_export
+from auth_core.listing import user_listing
+from auth_core.identity import identities
+from auth_core.validation import is_valid_email
+import json
 import redis
-import re
-from datetime import timedelta
 
-# After 24 hours since logged in, user's token will be automatically revoked
-ACCESS_EXPIRES = timedelta(hours=24)
-jwt_manager = JWTManager()
+jwt_manager = CachingJWTManager()
 
 bp_jwt = Blueprint("jwt_auth", __name__)
 
@@ -31,13 +39,23 @@ def get_redis_client():
 @jwt_manager.token_in_blocklist_loader
 def check_if_token_is_revoked(jwt_header, jwt_payload: dict):
     """Check if a JWT token is in the blocklist"""
-    jti = jwt_payload["jti"]
-    redis_client = get_redis_client()
-    token_in_redis = redis_client.get(jti)
-    return token_in_redis is not None
+    return RevocationStore(get_redis_client(), current_tenant()).is_revoked(jwt_payload)
+
+
+@jwt_manager.encode_key_loader
+def tenant_signing_key(identity):
+    """Sign tokens with the current tenant's key"""
+    return tenant_key()
+
+
+@jwt_manager.decode_key_loader
+def tenant_verification_key(jwt_header, jwt_payload):
+    """Verify with the key of the tenant the request is for (not the one the token claims)"""
+    return tenant_key()
 
 
 @bp_jwt.route("/register", methods=["POST"])
+@limiter.limit("register")
 def register():
     """Register a new user"""
     try:
@@ -62,19 +80,21 @@ def register():
                 return jsonify({"error": f"{field} is required"}), 400
 
         # Validate email format
-        email_pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-        if not re.match(email_pattern, user_info["email"]):
+        if not is_valid_email(user_info["email"]):
             return jsonify({"error": "Invalid email format"}), 400
 
-        # Check duplicate fields (username or email)
-        if JWTUser.query.filter_by(username=user_info["username"]).first():
+        # Check duplicate fields (username or email) within the tenant
+        tenant = current_tenant()
+        taken = users.taken(tenant, user_info["username"], user_info["email"])
+        if taken == "username":
             return jsonify({"error": "Username already exists"}), 409
-        if JWTUser.query.filter_by(email=user_info["email"]).first():
+        if taken == "email":
             return jsonify({"error": "Email already exists"}), 409
 
         # Create new user
-        password_hash = generate_password_hash(user_info["password"])
+        password_hash = passwords.hash(user_info["password"])
         new_user = JWTUser(
+            tenant=tenant,
             first_name=user_info["first_name"],
             last_name=user_info["last_name"],
             username=user_info["username"],
@@ -82,8 +102,10 @@ def register():
             password_hash=password_hash,
         )
 
-        db.session.add(new_user)
+        users.add(new_user)
+        user_id = new_user.id
         db.session.commit()
+        audit.record("register", user_id=user_id)
 
         return jsonify({"message": "New user created successfully"}), 201
 
@@ -93,8 +115,10 @@ def register():
 
 
 @bp_jwt.route("/login", methods=["POST"])
+@limiter.limit("login", identifier_field="identifier")
+@replicas.read_only
 def login():
-    """Login user and return access token"""
+    """Login user and return an access/refresh token pair"""
     try:
         # Check if request has JSON content type first
         if not request.is_json:
@@ -114,44 +138,91 @@ def login():
             if not value:
                 return jsonify({"error": f"{field} is required"}), 400
 
+        # Refuse locked-out identifiers and IPs before any lookup or hash
+        retry_after = lockout.check(login_info["identifier"])
+        if retry_after:
+            audit.record("login_locked", identifier=login_info["identifier"])
+            return locked_response(retry_after)
+
         # Check if the user exists
-        existing_user = JWTUser.query.filter(
-            or_(
-                JWTUser.username == login_info["identifier"],
-                JWTUser.email == login_info["identifier"],
-            )
-        ).first()
+        existing_user = users.find(current_tenant(), login_info["identifier"])
 
         if existing_user is None:
-            return jsonify({"error": "Invalid username or email"}), 401
+            # Answer no sooner than a wrong password would be
+            passwords.pad_unknown_user()
+            lockout.failed(login_info["identifier"])
+            audit.record(
+                "login_failed", identifier=login_info["identifier"], reason="unknown_user"
+            )
+            return jsonify({"error": "Invalid credentials"}), 401
 
         # Check password
-        if check_password_hash(existing_user.password_hash, login_info["password"]):
-            access_token = create_access_token(identity=existing_user.id)
+        password_matches = passwords.check(
+            existing_user.password_hash, login_info["password"]
+        )
+
+        if password_matches:
+            lockout.succeeded(login_info["identifier"])
+            access_token, refresh_token = issue_tokens(
+                get_redis_client(), existing_user.id
+            )
+            audit.record("login", user_id=existing_user.id)
             return (
                 jsonify(
                     {
                         "message": f"User {login_info['identifier']} logged in successfully",
                         "access_token": access_token,
+                        "refresh_token": refresh_token,
                     }
                 ),
                 200,
             )
         else:
+            lockout.failed(login_info["identifier"])
+            audit.record("login_failed", user_id=existing_user.id, reason="bad_password")
             return jsonify({"error": "Invalid credentials"}), 401
 
     except Exception as e:
         return jsonify({"error": "Internal server error"}), 500
 
 
+@bp_jwt.route("/refresh", methods=["POST"])
+@jwt_required(refresh=True)
+def refresh():
+    """Exchange a refresh token for a new access/refresh token pair"""
+    try:
+        tokens = rotate_tokens(get_redis_client(), get_jwt())
+        if tokens is None:
+            audit.record("refresh_rejected", user_id=get_jwt_identity())
+            return jsonify({"error": "Refresh token is no longer valid"}), 401
+
+        access_token, refresh_token = tokens
+        return (
+            jsonify(
+                {
+                    "message": "Tokens refreshed successfully",
+                    "access_token": access_token,
+                    "refresh_token": refresh_token,
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        return jsonify({"error": "Token refresh failed"}), 500
+
+
 @bp_jwt.route("/logout", methods=["DELETE"])
 @jwt_required()
 def logout():
-    """Logout user by adding token to blocklist"""
+    """Logout user by adding token to blocklist and ending its refresh token family"""
     try:
-        jti = get_jwt()["jti"]
+        claims = get_jwt()
         redis_client = get_redis_client()
-        redis_client.set(jti, "", ex=ACCESS_EXPIRES)
+        # Kept only until the token would have expired anyway
+        RevocationStore(redis_client, current_tenant()).revoke(claims)
+        revoke_family(redis_client, claims)
+        jwt_manager.evict(claims)
+        audit.record("logout", user_id=claims["sub"])
         return jsonify({"message": "Access token revoked"}), 200
     except Exception as e:
         return jsonify({"error": "Logout failed"}), 500
@@ -159,21 +230,16 @@ def logout():
 
 @bp_jwt.route("/profile", methods=["GET"])
 @jwt_required()
+@replicas.read_only
 def get_profile():
     """Get current user's profile"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = db.session.get(JWTUser, current_user_id)
+        current_user = identities.resolve(get_jwt_identity())
 
         if not current_user:
             return jsonify({"error": "User not found"}), 404
 
-        user_profile = {
-            "first_name": current_user.first_name,
-            "last_name": current_user.last_name,
-            "username": current_user.username,
-            "email": current_user.email,
-        }
+        user_profile = current_user.profile()
 
         return (
             jsonify(
@@ -187,3 +253,115 @@ def get_profile():
 
     except Exception as e:
         return jsonify({"error": "Failed to retrieve profile"}), 500
+
+
+@bp_jwt.route("/introspect", methods=["POST"])
+@service_clients.required
+def introspect():
+    """Report whether tokens are active (RFC 7662), for other services
+
+    A form-encoded "token" (as in the RFC) returns one result object. Several
+    "token" fields, or a JSON body with "tokens", return {"results": [...]} in
+    request order. With "cacheable" set, the response may be cached by the
+    caller until the first active token expires (INTROSPECTION_CACHE_SECONDS at most).
+    """
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must contain a JSON object"}), 400
+        batch = "tokens" in data
+        tokens = data.get("tokens") if batch else [data.get("token")]
+        cacheable = data.get("cacheable", False) is True
+    else:
+        tokens = request.form.getlist("token")
+        batch = len(tokens) != 1
+        cacheable = request.form.get("cacheable", "").lower() == "true"
+    cacheable = cacheable or request.args.get("cacheable", "").lower() == "true"
+
+    if not isinstance(tokens, list) or not tokens:
+        return jsonify({"error": "token is required"}), 400
+    if not all(isinstance(token, str) and token for token in tokens):
+        return jsonify({"error": "Tokens must be non-empty strings"}), 400
+    if len(tokens) > current_app.config["INTROSPECTION_MAX_TOKENS"]:
+        return jsonify({"error": "Too many tokens in one request"}), 400
+
+    try:
+        results, expires_in = introspection.introspect(get_redis_client(), tokens)
+    except Exception as e:
+        return jsonify({"error": "Introspection failed"}), 500
+
+    response = jsonify({"results": results} if batch else results[0])
+    return introspection.cache_control(response, cacheable, expires_in)
+
+
+def batch_results(user_ids):
+    """Profiles of the users found, in request order, and the IDs not found"""
+    found = identities.resolve_many(user_ids)
+    results = [{"id": user_id, **found[user_id].profile()} for user_id in user_ids if user_id in found]
+    missing = [user_id for user_id in user_ids if user_id not in found]
+    return results, missing
+
+
+@bp_jwt.route("/users:batchGet", methods=["GET", "POST"])
+@service_clients.required
+@replicas.read_only
+def batch_get_users():
+    """Profiles of many users of the tenant at once, for internal services
+
+    IDs come from repeated "ids" query parameters or a JSON body {"ids": [...]}
+    (up to USER_BATCH_MAX_IDS). Cached users are served from the identity
+    cache and the rest are loaded with one IN query per shard. Batches larger
+    than USER_BATCH_CHUNK are streamed chunk by chunk, so the response starts
+    before every user is loaded.
+    """
+    if request.method == "POST":
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must contain a JSON object"}), 400
+        user_ids = data.get("ids")
+    else:
+        user_ids = request.args.getlist("ids")
+
+    if not isinstance(user_ids, list) or not user_ids:
+        return jsonify({"error": "ids is required"}), 400
+    if not all(isinstance(user_id, str) and user_id for user_id in user_ids):
+        return jsonify({"error": "ids must be non-empty strings"}), 400
+    if len(user_ids) > current_app.config["USER_BATCH_MAX_IDS"]:
+        return jsonify({"error": "Too many ids in one request"}), 400
+
+    # Duplicates are answered once
+    user_ids = list(dict.fromkeys(user_ids))
+    chunk_size = current_app.config["USER_BATCH_CHUNK"]
+    if len(user_ids) <= chunk_size:
+        results, missing = batch_results(user_ids)
+        return jsonify({"users": results, "missing": missing}), 200
+
+    def generate():
+        missing = []
+        separator = ""
+        yield '{"users":['
+        for start in range(0, len(user_ids), chunk_size):
+            results, chunk_missing = batch_results(user_ids[start : start + chunk_size])
+            missing.extend(chunk_missing)
+            for result in results:
+                yield separator + json.dumps(result)
+                separator = ","
+        yield '],"missing":' + json.dumps(missing) + "}"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+@bp_jwt.route("/admin/users:export", methods=["GET"])
+@admin_clients.required
+@replicas.read_only
+def export_users():
+    """Stream every user of the tenant (without password hashes) for analytics"""
+    return user_export.response(users)
+
+
+@bp_jwt.route("/admin/users", methods=["GET"])
+@admin_clients.required
+@replicas.read_only
+def list_users():
+    """Browse and search the tenant's users, a keyset-paginated page at a time"""
+    return user_listing.response(users)
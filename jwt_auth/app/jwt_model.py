@@ -1,38 +1,183 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Integer, String
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from typing import List
-import uuid
+from sqlalchemy import String, UniqueConstraint, delete, select
+from sqlalchemy.orm import Mapped, mapped_column
+from auth_core.users import UserColumns, UserRepository
+from auth_core.validation import generate_uuid
+from app.sharding import ShardedSession, current_shards
+from itertools import islice
+import heapq
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": ShardedSession})
 
 
-def generate_uuid():
-    """Generate a new UUID for each record"""
-    return str(uuid.uuid4())
+class JWTUser(UserColumns, db.Model):
+    """Table to store user's personal information (columns in UserColumns)"""
+
+    __tablename__ = "jwt_users"
+    # Rows live on the shard their id hashes to (see app.sharding)
+    __sharded__ = True
+    # Composite unique indexes also serve the per-tenant username/email lookups
+    __table_args__ = (
+        UniqueConstraint("tenant", "username", name="uq_jwt_users_tenant_username"),
+        UniqueConstraint("tenant", "email", name="uq_jwt_users_tenant_email"),
+    )
 
 
-class JWTUser(db.Model):
-    """Table to store user's personal information
+class JWTUserIndex(db.Model):
+    """Username/email -> user ID directory, kept on the primary
+
+    Lets a login find the shard of a user with one primary-key lookup, and its
+    primary key enforces unique usernames and emails per tenant across shards.
 
     Args:
-        db (object): an instance of SQLAlchemy
-        id (str): a 32-character string converted from UUID (must be string to be compatible with JWT)
-        first_name (str): user's first name
-        last_name (str): user's last name
-        username (str): username that must be unique
-        email (str): valid email address
-        password_hash (str): user's password that has been hashed for security
+        tenant (str): product the account belongs to
+        value (str): the username or email
+        kind (str): "username" or "email"
+        user_id (str): ID of the user (its shard is derived from it)
     """
 
-    __tablename__ = "jwt_users"
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
-    first_name: Mapped[str] = mapped_column(String, nullable=False)
-    last_name: Mapped[str] = mapped_column(String, nullable=False)
-    username: Mapped[str] = mapped_column(String, unique=True, nullable=False)
-    email: Mapped[str] = mapped_column(String, unique=True, nullable=False)
-    password_hash: Mapped[str] = mapped_column(String, nullable=False)
-
-    # String representation of an user object
-    def __repr__(self):
-        return f"User {self.first_name} {self.last_name}: \n ID: {self.id} \n username: {self.username} \n email: {self.email}"
+    __tablename__ = "jwt_user_index"
+    tenant: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[str] = mapped_column(String, primary_key=True)
+    kind: Mapped[str] = mapped_column(String, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String, nullable=False)
+
+
+def index_entries(user):
+    return [
+        JWTUserIndex(tenant=user.tenant, value=user.username, kind="username", user_id=user.id),
+        JWTUserIndex(tenant=user.tenant, value=user.email, kind="email", user_id=user.id),
+    ]
+
+
+class ShardedUserRepository(UserRepository):
+    """UserRepository for users spread over shards
+
+    Usernames and emails are resolved to user IDs through the (cached) index on
+    the primary, then users are loaded from the shard their ID hashes to.
+    """
+
+    def add(self, user):
+        """Add a new user to the session together with its index entries"""
+        if user.id is None:
+            user.id = generate_uuid()
+        self.db.session.add_all(index_entries(user))
+        self.db.session.add(user)
+        return user
+
+    def get(self, user_id, tenant=None):
+        """Load a user by ID from its shard"""
+        shards = current_shards()
+        user = self.db.session.get(
+            self.model,
+            user_id,
+            bind_arguments=shards.bind_arguments(shards.shard_for(user_id)),
+        )
+        if user is not None and tenant is not None and user.tenant != tenant:
+            return None
+        return user
+
+    def get_many(self, user_ids, tenant):
+        """Load users by ID with one IN query per shard that holds any of them"""
+        shards = current_shards()
+        by_shard = {}
+        for user_id in dict.fromkeys(user_ids):
+            by_shard.setdefault(shards.shard_for(user_id), []).append(user_id)
+
+        found = []
+        for shard, shard_ids in by_shard.items():
+            for start in range(0, len(shard_ids), self.IN_CHUNK):
+                found.extend(
+                    self.db.session.scalars(
+                        select(self.model).where(
+                            self.model.tenant == tenant,
+                            self.model.id.in_(shard_ids[start : start + self.IN_CHUNK]),
+                        ),
+                        bind_arguments=shards.bind_arguments(shard),
+                    )
+                )
+        return found
+
+    def stream(self, tenant, columns, chunk_size=1000):
+        """Rows of a tenant's users, chunk by chunk, one shard after another"""
+        shards = current_shards()
+        statement = (
+            select(*columns)
+            .where(self.model.tenant == tenant)
+            .execution_options(yield_per=chunk_size)
+        )
+        for shard in range(shards.count):
+            yield from self.db.session.execute(
+                statement, bind_arguments=shards.bind_arguments(shard)
+            ).partitions()
+
+    def page(self, tenant, columns, order_by="username", limit=50, **filters):
+        """One page of a tenant's users, merged from the first rows of every shard
+
+        Each shard returns its own next ``limit`` rows through its index, so a
+        page costs one bounded query per shard however deep it is.
+        """
+        shards = current_shards()
+        statement = self._page_select(tenant, columns, order_by, limit=limit, **filters)
+        pages = [
+            self.db.session.execute(statement, bind_arguments=shards.bind_arguments(shard)).all()
+            for shard in range(shards.count)
+        ]
+        merged = heapq.merge(*pages, key=lambda row: row._mapping[order_by])
+        return list(islice(merged, limit))
+
+    def _lookup_user_id(self, tenant, identifier, kinds):
+        # The index is authoritative: users loaded without it are added by the
+        # backfill-user-index command, never searched for shard by shard
+        return self.db.session.scalars(
+            select(JWTUserIndex.user_id).where(
+                JWTUserIndex.tenant == tenant,
+                JWTUserIndex.value == identifier,
+                JWTUserIndex.kind.in_(kinds),
+            )
+        ).first()
+
+    def find(self, tenant, identifier, kinds=("username", "email")):
+        lookups = current_shards().lookups
+        key = (tenant, tuple(kinds), identifier)
+
+        user_id = lookups.get(key)
+        if user_id is not None:
+            user = self.get(user_id, tenant)
+            if user is not None:
+                return user
+            lookups.evict(key)
+
+        user_id = self._lookup_user_id(tenant, identifier, kinds)
+        if user_id is None:
+            return None
+        user = self.get(user_id)
+        if user is not None:
+            lookups.put(key, user_id)
+        return user
+
+    def taken(self, tenant, username, email):
+        """Which of username/email already belongs to an account of the tenant
+
+        The index and the user row are committed to different databases, so a
+        registration whose shard commit failed leaves index entries without a
+        user. Those are deleted here (in the caller's transaction), otherwise
+        the name would look free but its INSERT would hit the index key forever.
+        """
+        for kind, value in (("username", username), ("email", email)):
+            user_id = self._lookup_user_id(tenant, value, (kind,))
+            if user_id is None:
+                continue
+            if self.get(user_id) is not None:
+                return kind
+            self.db.session.execute(
+                delete(JWTUserIndex).where(
+                    JWTUserIndex.tenant == tenant,
+                    JWTUserIndex.value == value,
+                    JWTUserIndex.kind == kind,
+                )
+            )
+        return None
+
+
+users = ShardedUserRepository(db, JWTUser)
@@ -0,0 +1,215 @@
+from flask import current_app, has_app_context
+from sqlalchemy import create_engine, delete, insert, select
+from auth_core.cache import LRUCache
+from auth_core.replicas import RoutingSession
+import hashlib
+
+
+def jump_hash(key, buckets):
+    """Jump consistent hash: adding a shard only moves 1/N of the keys to it"""
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_for(user_id, shard_count):
+    """Shard a user ID lives on"""
+    key = int.from_bytes(hashlib.blake2b(user_id.encode(), digest_size=8).digest(), "big")
+    return jump_hash(key, shard_count)
+
+
+class ShardSet:
+    """The user shards of an app: shard 0 is the primary database, the rest are
+    SQLALCHEMY_SHARD_URIS in order"""
+
+    def __init__(self, engines, lookup_cache_size):
+        self.engines = list(engines)
+        # (tenant, kinds, identifier) -> user ID. User IDs never change, even when
+        # rebalancing moves a user to another shard, so entries stay valid until
+        # the identifier itself changes.
+        self.lookups = LRUCache(lookup_cache_size)
+
+    @property
+    def count(self):
+        return len(self.engines) + 1
+
+    @property
+    def sharded(self):
+        return bool(self.engines)
+
+    def shard_for(self, user_id):
+        return shard_for(user_id, self.count) if self.engines else 0
+
+    def bind_arguments(self, shard):
+        """Session bind arguments for a shard (the default bind for the primary)"""
+        return {"bind": self.engines[shard - 1]} if shard else {}
+
+    def dispose(self):
+        for engine in self.engines:
+            engine.dispose(close=False)
+
+
+def current_shards():
+    return current_app.extensions["user_shards"]
+
+
+class ShardedSession(RoutingSession):
+    """Session that flushes sharded rows to the database of their shard
+
+    Models opt in with ``__sharded__ = True`` and must have their ``id`` set
+    before they are flushed. Everything else is written to the primary.
+    """
+
+    @property
+    def connection_callable(self):
+        # Only per-instance routing disables bulk ORM statements, so keep
+        # unsharded deployments on the regular path
+        if has_app_context() and current_shards().sharded:
+            return self._connection_for_instance
+        return None
+
+    def _connection_for_instance(self, mapper, instance):
+        if not getattr(type(instance), "__sharded__", False):
+            return self.connection(bind_arguments={"mapper": mapper})
+        if instance.id is None:
+            raise ValueError(f"{type(instance).__name__} needs an id before it is flushed")
+        shards = current_shards()
+        return self.connection(
+            bind_arguments=shards.bind_arguments(shards.shard_for(instance.id))
+            or {"mapper": mapper}
+        )
+
+
+class ShardRouter:
+    """Spreads user rows over the primary and SQLALCHEMY_SHARD_URIS by hashed user ID
+
+    Shards can only be appended: after adding one, run the rebalance command to
+    move the users that now hash to it. Without shards every user lives on the
+    primary.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("SQLALCHEMY_SHARD_URIS", [])
+        app.config.setdefault("USER_LOOKUP_CACHE_SIZE", 100000)
+
+        engines = [
+            create_engine(uri, pool_pre_ping=True)
+            for uri in app.config["SQLALCHEMY_SHARD_URIS"]
+        ]
+        app.extensions["user_shards"] = ShardSet(
+            engines, app.config["USER_LOOKUP_CACHE_SIZE"]
+        )
+
+
+def rebalance(table, engines, batch_size=1000):
+    """Move every row of ``table`` to the shard its ``id`` hashes to
+
+    Rows are copied before they are deleted from their old shard, so an
+    interrupted run leaves duplicates rather than missing users; running it
+    again finishes the move.
+
+    Args:
+        table (Table): the sharded table
+        engines (list): engine of every shard, primary first
+        batch_size (int): rows moved per transaction
+
+    Returns:
+        dict: number of rows moved off each shard
+    """
+    for engine in engines:
+        table.create(engine, checkfirst=True)
+
+    moved = {}
+    for source_index, source in enumerate(engines):
+        moved[source_index] = 0
+        last_id = ""
+        while True:
+            with source.connect() as connection:
+                rows = connection.execute(
+                    select(table)
+                    .where(table.c.id > last_id)
+                    .order_by(table.c.id)
+                    .limit(batch_size)
+                ).mappings().all()
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+
+            by_target = {}
+            for row in rows:
+                target = shard_for(row["id"], len(engines))
+                if target != source_index:
+                    by_target.setdefault(target, []).append(dict(row))
+
+            for target, batch in by_target.items():
+                ids = [row["id"] for row in batch]
+                with engines[target].begin() as connection:
+                    present = set(
+                        connection.scalars(select(table.c.id).where(table.c.id.in_(ids)))
+                    )
+                    missing = [row for row in batch if row["id"] not in present]
+                    if missing:
+                        connection.execute(insert(table), missing)
+                with source.begin() as connection:
+                    connection.execute(delete(table).where(table.c.id.in_(ids)))
+                moved[source_index] += len(batch)
+    return moved
+
+
+def backfill_index(table, index_table, engines, batch_size=1000):
+    """Add the missing username/email entries of every user to the index
+
+    Logins and sign-up checks trust the index alone, so users written without
+    it (bulk loads, restores) must be backfilled before they can log in.
+    Entries that already exist are left alone, so it can be re-run.
+
+    Args:
+        table (Table): the sharded users table
+        index_table (Table): the index, on the primary
+        engines (list): engine of every shard, primary first
+        batch_size (int): users read per query
+
+    Returns:
+        int: number of index entries added
+    """
+    index_table.create(engines[0], checkfirst=True)
+
+    added = 0
+    for engine in engines:
+        last_id = ""
+        while True:
+            with engine.connect() as connection:
+                rows = connection.execute(
+                    select(table.c.id, table.c.tenant, table.c.username, table.c.email)
+                    .where(table.c.id > last_id)
+                    .order_by(table.c.id)
+                    .limit(batch_size)
+                ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            entries = [
+                {"tenant": row.tenant, "value": getattr(row, kind), "kind": kind, "user_id": row.id}
+                for row in rows
+                for kind in ("username", "email")
+            ]
+            with engines[0].begin() as connection:
+                present = set(
+                    connection.execute(
+                        select(index_table.c.user_id, index_table.c.kind).where(
+                            index_table.c.user_id.in_([row.id for row in rows])
+                        )
+                    ).tuples()
+                )
+                missing = [entry for entry in entries if (entry["user_id"], entry["kind"]) not in present]
+                if missing:
+                    connection.execute(insert(index_table), missing)
+            added += len(missing)
+    return added
+
+
+shards = ShardRouter()
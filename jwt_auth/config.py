@@ -1,15 +1,36 @@
 import os
+import json
 from datetime import timedelta
+from auth_core.config import CoreConfig, env_list
 
 
-class BaseConfig:
-    """Base configuration with common settings"""
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_RECORD_QUERIES = True
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+class BaseConfig(CoreConfig):
+    """Base configuration with common settings (shared ones in CoreConfig)"""
+    # Short-lived access tokens keep blocklist entries short-lived too;
+    # sessions are extended through rotating refresh tokens
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     JWT_ALGORITHM = "HS256"
+    # Verified claims kept per worker so repeat requests skip the signature check (0 disables)
+    JWT_DECODE_CACHE_SIZE = int(os.getenv("JWT_DECODE_CACHE_SIZE", 10000))
+    # Optional explicit signing keys ({"tenant": "secret"}); others are derived from JWT_SECRET_KEY
+    JWT_TENANT_KEYS = json.loads(os.getenv("JWT_TENANT_KEYS", "{}"))
     # Default Redis URL
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # Extra databases users are spread over by hashed ID (the primary is shard 0)
+    SQLALCHEMY_SHARD_URIS = []
+    USER_LOOKUP_CACHE_SIZE = 100000
+    # Internal services allowed to call /introspect and /users:batchGet with
+    # HTTP Basic auth ({"client id": "secret"})
+    SERVICE_CLIENTS = json.loads(os.getenv("SERVICE_CLIENTS", "{}"))
+    INTROSPECTION_MAX_TOKENS = 100
+    INTROSPECTION_CACHE_SECONDS = 30
+    USER_BATCH_MAX_IDS = 1000
+    # Batches above this size are loaded and streamed in chunks of it
+    USER_BATCH_CHUNK = 100
+    # Users resolved from tokens and batch lookups, kept per worker for IDENTITY_CACHE_TTL seconds
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", 10000))
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", 60))
 
 
 class DevelopmentConfig(BaseConfig):
@@ -17,8 +38,11 @@ class DevelopmentConfig(BaseConfig):
     DEBUG = True
     TESTING = False
     SQLALCHEMY_DATABASE_URI = os.getenv("DEV_DATABASE_URI", "sqlite:///development.db")
+    SQLALCHEMY_REPLICA_URIS = env_list("DEV_DATABASE_REPLICA_URIS")
+    SQLALCHEMY_SHARD_URIS = env_list("DEV_DATABASE_SHARD_URIS")
     JWT_SECRET_KEY = os.getenv("DEV_JWT_SECRET_KEY", "dev-secret-change-in-production")
     REDIS_URL = os.getenv("DEV_REDIS_URL", "redis://localhost:6379/1")
+    RATELIMIT_STORAGE_URL = os.getenv("DEV_RATELIMIT_STORAGE_URL", "memory://")
 
 
 class ProductionConfig(BaseConfig):
@@ -26,8 +50,13 @@ class ProductionConfig(BaseConfig):
     DEBUG = False
     TESTING = False
     SQLALCHEMY_DATABASE_URI = os.getenv("PROD_DATABASE_URI", "sqlite:///production.db")
+    # Comma-separated read replicas of PROD_DATABASE_URI for read-only endpoints
+    SQLALCHEMY_REPLICA_URIS = env_list("PROD_DATABASE_REPLICA_URIS")
+    SQLALCHEMY_SHARD_URIS = env_list("PROD_DATABASE_SHARD_URIS")
     JWT_SECRET_KEY = os.getenv("PROD_JWT_SECRET_KEY")
     REDIS_URL = os.getenv("PROD_REDIS_URL", "redis://localhost:6379/0")
+    # Counters must be shared by all workers in production
+    RATELIMIT_STORAGE_URL = os.getenv("PROD_RATELIMIT_STORAGE_URL", REDIS_URL)
     
     # Validation for production
     def __init__(self):
@@ -42,4 +71,10 @@ class TestingConfig(BaseConfig):
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     JWT_SECRET_KEY = "test-jwt-secret-key-123"
     REDIS_URL = "redis://localhost:6379/2"
+    TENANTS = ["default", "acme", "globex"]
+    RATELIMIT_STORAGE_URL = "memory://"
+    AUDIT_ENABLED = False
+    LOGIN_TIMING_PADDING = False
+    SERVICE_CLIENTS = {"gateway": "gateway-secret"}
+    ADMIN_CLIENTS = {"ops": "ops-secret"}
     WTF_CSRF_ENABLED = False
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""Add user index
+
+Revision ID: 3d1c5a9e2f40
+Revises: 07fef4bb7b50
+Create Date: 2026-10-19 14:05:12.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d1c5a9e2f40'
+down_revision = '07fef4bb7b50'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('jwt_user_index',
+    sa.Column('tenant', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('tenant', 'value', 'kind')
+    )
+    # Index the users that already live on the primary
+    for kind in ('username', 'email'):
+        op.execute(
+            f"INSERT INTO jwt_user_index (tenant, value, kind, user_id) "
+            f"SELECT tenant, {kind}, '{kind}', id FROM jwt_users"
+        )
+
+
+def downgrade():
+    op.drop_table('jwt_user_index')
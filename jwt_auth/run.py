@@ -1,4 +1,5 @@
 import os
+import sys
 import click
 from flask.cli import with_appcontext
 from flask_migrate import init, migrate, upgrade, downgrade
@@ -96,6 +97,259 @@ def show_db_info():
         click.echo(f"❌ Database connection failed: {e}")
 
 
+@click.command()
+@click.option("--count", "-n", default=1000, help="Number of users in the pool")
+@click.option("--prefix", default="loadtest", help="Username prefix of pool users")
+@click.option("--password", default="LoadTest123!", help="Password shared by pool users")
+@click.option(
+    "--hash-method",
+    default="pbkdf2:sha256:1",
+    help="Werkzeug hash method (the fast default keeps logins cheap; use scrypt to match production)",
+)
+@click.option("--batch-size", default=5000, help="Rows per INSERT statement")
+@click.option("--tenant", default="default", help="Tenant the pool users belong to")
+@with_appcontext
+def seed_users(count, prefix, password, hash_method, batch_size, tenant):
+    """Bulk-create a pool of load-test users (skips users that already exist)."""
+    from sqlalchemy import insert, select
+    from werkzeug.security import generate_password_hash
+    from flask import current_app
+    from app.jwt_model import JWTUser, JWTUserIndex
+    from auth_core.validation import generate_uuid
+
+    shards = current_app.extensions["user_shards"]
+    existing = set()
+    for shard in range(shards.count):
+        existing.update(
+            db.session.scalars(
+                select(JWTUser.username).where(
+                    JWTUser.tenant == tenant, JWTUser.username.like(f"{prefix}%")
+                ),
+                bind_arguments=shards.bind_arguments(shard),
+            )
+        )
+
+    # All pool users share one password, so it only needs hashing once
+    password_hash = generate_password_hash(password, method=hash_method)
+    rows = [
+        {
+            "id": generate_uuid(),
+            "tenant": tenant,
+            "first_name": "Load",
+            "last_name": f"Test {i}",
+            "username": f"{prefix}{i:06d}",
+            "email": f"{prefix}{i:06d}@loadtest.local",
+            "password_hash": password_hash,
+        }
+        for i in range(count)
+        if f"{prefix}{i:06d}" not in existing
+    ]
+
+    index_rows = [
+        {"tenant": tenant, "value": row[kind], "kind": kind, "user_id": row["id"]}
+        for row in rows
+        for kind in ("username", "email")
+    ]
+    rows_by_shard = {}
+    for row in rows:
+        rows_by_shard.setdefault(shards.shard_for(row["id"]), []).append(row)
+
+    try:
+        for start in range(0, len(index_rows), batch_size):
+            db.session.execute(
+                insert(JWTUserIndex.__table__), index_rows[start : start + batch_size]
+            )
+        for shard, shard_rows in rows_by_shard.items():
+            for start in range(0, len(shard_rows), batch_size):
+                db.session.execute(
+                    insert(JWTUser.__table__),
+                    shard_rows[start : start + batch_size],
+                    bind_arguments=shards.bind_arguments(shard),
+                )
+        db.session.commit()
+        click.echo(f"✅ Seeded {len(rows)} users ({count - len(rows)} already existed).")
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"❌ Error seeding users: {e}")
+
+
+@click.command()
+@click.option("--tenant", "tenants", multiple=True, help="Tenant to report (default: all)")
+@with_appcontext
+def revocation_report(tenants):
+    """Show how much Redis memory the token blocklist uses."""
+    from flask import current_app
+    from app.jwt_api import get_redis_client
+    from auth_core.revocation import RevocationStore
+
+    for tenant in tenants or current_app.config["TENANTS"]:
+        try:
+            report = RevocationStore(get_redis_client(), tenant).memory_report()
+        except Exception as e:
+            click.echo(f"❌ Error reading the blocklist: {e}")
+            return
+
+        click.echo(f"[{tenant}]")
+        click.echo(f"Revoked tokens: {report['entries']}")
+        click.echo(f"Buckets: {report['buckets']}")
+        click.echo(f"Memory: {report['memory_bytes']} bytes")
+        click.echo(f"Bytes per token: {report['bytes_per_entry']}")
+        for encoding, count in sorted(report["encodings"].items()):
+            click.echo(f"  {encoding}: {count} buckets")
+
+
+@click.command()
+@click.option("--batch-size", default=1000, help="Users moved per transaction")
+@with_appcontext
+def rebalance_shards(batch_size):
+    """Move users to the shard their ID hashes to (run after adding a shard)."""
+    from flask import current_app
+    from app.jwt_model import JWTUser
+    from app.sharding import rebalance
+
+    shards = current_app.extensions["user_shards"]
+    engines = [db.engine, *shards.engines]
+    click.echo(f"Rebalancing users over {len(engines)} shards...")
+    try:
+        moved = rebalance(JWTUser.__table__, engines, batch_size=batch_size)
+    except Exception as e:
+        click.echo(f"❌ Error rebalancing shards: {e}")
+        return
+
+    for shard, count in moved.items():
+        click.echo(f"Shard {shard}: moved {count} users")
+    click.echo(f"✅ Moved {sum(moved.values())} users.")
+
+
+@click.command()
+@click.option("--batch-size", default=1000, help="Users read per query")
+@with_appcontext
+def backfill_user_index(batch_size):
+    """Add users missing from the username/email index (e.g. bulk-loaded ones)."""
+    from flask import current_app
+    from app.jwt_model import JWTUser, JWTUserIndex
+    from app.sharding import backfill_index
+
+    shards = current_app.extensions["user_shards"]
+    try:
+        added = backfill_index(
+            JWTUser.__table__, JWTUserIndex.__table__, [db.engine, *shards.engines], batch_size=batch_size
+        )
+    except Exception as e:
+        click.echo(f"❌ Error backfilling the user index: {e}")
+        return
+
+    click.echo(f"✅ Added {added} index entries.")
+
+
+@click.command()
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(["csv", "jsonl", "columnar"]),
+    default="csv",
+    help="Output format (columnar: one JSON row group per chunk)",
+)
+@click.option("--tenant", default="default", help="Tenant whose users are exported")
+@click.option("--output", "-o", type=click.File("w"), default="-", help="Output file (default: stdout)")
+@click.option("--chunk-size", default=None, type=int, help="Rows fetched and written at a time")
+@with_appcontext
+def export_users(fmt, tenant, output, chunk_size):
+    """Stream the users table to a file for analytics (without password hashes)."""
+    from auth_core.export import user_export
+    from app.jwt_model import users
+
+    try:
+        rows, elapsed = user_export.write(users, tenant, fmt, output, chunk_size=chunk_size)
+    except Exception as e:
+        click.echo(f"❌ Error exporting users: {e}", err=True)
+        return
+
+    click.echo(
+        f"✅ Exported {rows} users in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f}/s).",
+        err=True,
+    )
+
+
+@click.command()
+@with_appcontext
+def create_search_indexes():
+    """Create trigram indexes for substring user search (PostgreSQL only)."""
+    from flask import current_app
+    from app.jwt_model import JWTUser
+    from auth_core.listing import create_trigram_indexes
+
+    engines = [db.engine, *current_app.extensions["user_shards"].engines]
+    try:
+        created = [create_trigram_indexes(engine, JWTUser.__table__) for engine in engines]
+    except Exception as e:
+        click.echo(f"❌ Error creating search indexes: {e}")
+        return
+
+    if all(created):
+        click.echo("✅ Created trigram indexes; set USER_SEARCH_CONTAINS=true to enable ?q= search.")
+    else:
+        click.echo("❌ Trigram indexes need PostgreSQL on every shard; nothing created on the others.")
+
+
+@click.command()
+@click.option("--host", default="0.0.0.0", help="Interface to bind")
+@click.option(
+    "--port",
+    default=lambda: int(os.getenv("PORT", 8000)),
+    type=int,
+    help="Port to bind",
+)
+@click.option(
+    "--workers",
+    "-w",
+    default=lambda: int(os.getenv("WEB_CONCURRENCY", 0)) or None,
+    type=int,
+    help="Worker processes (default: 2 x CPUs + 1)",
+)
+@click.option(
+    "--threads",
+    "-t",
+    default=lambda: int(os.getenv("WEB_THREADS", 4)),
+    type=int,
+    help="Threads per worker",
+)
+@click.option(
+    "--timeout", default=30, type=int, help="Seconds before a silent worker is restarted"
+)
+@click.option(
+    "--graceful-timeout",
+    default=30,
+    type=int,
+    help="Seconds to finish in-flight requests on reload/stop",
+)
+@click.option(
+    "--max-requests",
+    default=10000,
+    type=int,
+    help="Requests before a worker is recycled (0 disables)",
+)
+@click.option("--pidfile", default=None, help="Write the master PID here (for kill -HUP)")
+def serve(
+    host, port, workers, threads, timeout, graceful_timeout, max_requests, pidfile
+):
+    """Run the app with the production Gunicorn server."""
+    from auth_core.server import serve as run_server, default_workers
+
+    workers = workers or default_workers()
+    click.echo(f"🚀 Serving on {host}:{port} with {workers} workers x {threads} threads")
+    run_server(
+        app,
+        bind=f"{host}:{port}",
+        workers=workers,
+        threads=threads,
+        timeout=timeout,
+        graceful_timeout=graceful_timeout,
+        max_requests=max_requests,
+        pidfile=pidfile,
+    )
+
+
 # Register CLI commands
 app.cli.add_command(init_db)
 app.cli.add_command(migrate_db)
@@ -103,9 +357,20 @@ app.cli.add_command(upgrade_db)
 app.cli.add_command(downgrade_db)
 app.cli.add_command(reset_db)
 app.cli.add_command(show_db_info)
+app.cli.add_command(seed_users)
+app.cli.add_command(revocation_report)
+app.cli.add_command(rebalance_shards)
+app.cli.add_command(backfill_user_index)
+app.cli.add_command(export_users)
+app.cli.add_command(create_search_indexes)
+app.cli.add_command(serve)
 
 
 if __name__ == "__main__":
+    # python3 run.py serve [options] starts the production server
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve(sys.argv[2:])
+
     env = os.getenv("FLASK_ENV", "development")
 
     click.echo(f"🚀 Starting Flask app in {env} mode...")
@@ -115,4 +380,4 @@ if __name__ == "__main__":
     elif env == "testing":
         app.run(debug=False, host="127.0.0.1", port=5001)
     else:  # production
-        app.run(debug=False, host="0.0.0.0", port=int(os.getenv("PORT", 8000)))
+        serve([])
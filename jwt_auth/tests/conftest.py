@@ -2,11 +2,13 @@ import pytest
 import sys
 import os
 
-# Add the parent directory to Python path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add the app directory and the repository root (for auth_core) to Python path
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(APP_DIR))
+sys.path.insert(0, APP_DIR)
 
 from app import create_app
-from app.jwt_model import db, JWTUser
+from app.jwt_model import db, JWTUser, JWTUserIndex
 
 
 @pytest.fixture
@@ -33,4 +35,5 @@ def clean_db(app):
     with app.app_context():
         # Clear all users before each test
         db.session.query(JWTUser).delete()
+        db.session.query(JWTUserIndex).delete()
         db.session.commit()
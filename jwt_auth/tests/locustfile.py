@@ -1,6 +1,22 @@
+import os
 import random
 import string
-from locust import HttpUser, task, between
+from itertools import count
+from locust import HttpUser, task, constant_throughput
+
+# The benchmark harness sets LOCUST_SEED so runs generate the same user data
+if os.getenv("LOCUST_SEED"):
+    random.seed(int(os.getenv("LOCUST_SEED")))
+
+# Pre-seeded users created with `flask --app run seed-users` (must match its options)
+USER_POOL_SIZE = int(os.getenv("LOCUST_USER_POOL_SIZE", 1000))
+USER_PREFIX = os.getenv("LOCUST_USER_PREFIX", "loadtest")
+USER_PASSWORD = os.getenv("LOCUST_USER_PASSWORD", "LoadTest123!")
+
+# Tasks per second for each simulated user: total arrival rate = users x this rate
+TASKS_PER_SECOND = float(os.getenv("LOCUST_TASKS_PER_SECOND", 0.5))
+
+_next_pool_index = count()
 
 
 def generate_unique_user_data():
@@ -15,47 +31,37 @@ def generate_unique_user_data():
     }
 
 
-class JWTAuthUser(HttpUser):
-    """Test JWT-based authentication performance"""
+def pool_credentials(environment):
+    """Credentials of the next pool user, interleaved across distributed workers"""
+    worker_index = max(getattr(environment.runner, "worker_index", 0), 0)
+    worker_count = int(os.getenv("LOCUST_WORKER_COUNT", 1))
+    index = (next(_next_pool_index) * worker_count + worker_index) % USER_POOL_SIZE
+    username = f"{USER_PREFIX}{index:06d}"
+    return {"identifier": f"{username}@loadtest.local", "password": USER_PASSWORD}
 
-    wait_time = between(1, 3)  # Wait 1-3 seconds between requests
+
+class PooledJWTUser(HttpUser):
+    """Simulated client logged in as a pre-seeded user (no registration hashing)"""
+
+    abstract = True
+    wait_time = constant_throughput(TASKS_PER_SECOND)
 
     def on_start(self):
-        """Called when a user starts - registers and logs in"""
-        self.user_data = generate_unique_user_data()
+        self.credentials = pool_credentials(self.environment)
         self.access_token = None
-        self.register_user()
-        self.login_user()
-
-    def register_user(self):
-        """Register a new user"""
-        with self.client.post(
-            "/api/jwt/register",
-            json=self.user_data,
-            name="JWT Register",
-            catch_response=True,
-        ) as response:
-            if response.status_code == 201:
-                response.success()
-            else:
-                response.failure(f"Registration failed: {response.status_code}")
+        self.refresh_token = None
 
     def login_user(self):
         """Login via JWT and store token"""
-        login_data = {
-            "identifier": self.user_data["email"],
-            "password": self.user_data["password"],
-        }
-
         with self.client.post(
             "/api/jwt/login",
-            json=login_data,
+            json=self.credentials,
             name="JWT Login",
             catch_response=True,
         ) as response:
             if response.status_code == 200:
-                data = response.json()
-                self.access_token = data.get("access_token")
+                self.access_token = response.json().get("access_token")
+                self.refresh_token = response.json().get("refresh_token")
                 if self.access_token:
                     response.success()
                 else:
@@ -63,14 +69,29 @@ class JWTAuthUser(HttpUser):
             else:
                 response.failure(f"Login failed: {response.status_code}")
 
-    @task(5)
-    def get_profile(self):
-        """Get profile using JWT token - most frequent operation"""
-        if not self.access_token:
+    def refresh_tokens(self):
+        """Rotate the token pair, falling back to a full login"""
+        if not self.refresh_token:
+            self.login_user()
             return
+        headers = {"Authorization": f"Bearer {self.refresh_token}"}
+        with self.client.post(
+            "/api/jwt/refresh",
+            headers=headers,
+            name="JWT Refresh",
+            catch_response=True,
+        ) as response:
+            if response.status_code == 200:
+                self.access_token = response.json().get("access_token")
+                self.refresh_token = response.json().get("refresh_token")
+                response.success()
+            else:
+                response.failure(f"Refresh failed: {response.status_code}")
+                self.refresh_token = None
 
+    def get_profile(self):
+        """Get profile using the current JWT token"""
         headers = {"Authorization": f"Bearer {self.access_token}"}
-
         with self.client.get(
             "/api/jwt/profile",
             headers=headers,
@@ -80,19 +101,17 @@ class JWTAuthUser(HttpUser):
             if response.status_code == 200:
                 response.success()
             elif response.status_code == 401:
-                # Token might be expired or invalid, try to re-login
-                response.failure("Token expired or invalid")
-                self.login_user()
+                # Short-lived access tokens expire: rotate instead of logging in again
+                if response.json().get("msg") == "Token has expired":
+                    response.success()
+                else:
+                    response.failure("Token invalid")
+                self.access_token = None
             else:
                 response.failure(f"Profile access failed: {response.status_code}")
 
-    @task(1)
-    def logout_and_login_cycle(self):
-        """Occasionally logout and login again to test full cycle"""
-        if not self.access_token:
-            return
-
-        # Logout
+    def logout_user(self):
+        """Revoke the current JWT token"""
         headers = {"Authorization": f"Bearer {self.access_token}"}
         with self.client.delete(
             "/api/jwt/logout",
@@ -102,62 +121,72 @@ class JWTAuthUser(HttpUser):
         ) as response:
             if response.status_code == 200:
                 response.success()
-                self.access_token = None
             else:
                 response.failure(f"Logout failed: {response.status_code}")
+        self.access_token = None
+        self.refresh_token = None
 
-        # Login again
-        self.login_user()
-
-    def on_stop(self):
-        """Called when user stops - cleanup"""
-        if self.access_token:
-            headers = {"Authorization": f"Bearer {self.access_token}"}
-            self.client.delete("/api/jwt/logout", headers=headers, name="JWT Logout")
 
+class ProfileReader(PooledJWTUser):
+    """Steady state: log in once, then only read the profile"""
 
-class JWTStressTest(HttpUser):
-    """Stress test with rapid requests"""
+    def on_start(self):
+        super().on_start()
+        self.login_user()
 
-    wait_time = between(0.1, 0.5)  # Very short wait time for stress testing
+    @task
+    def read_profile(self):
+        if not self.access_token:
+            self.refresh_tokens()
+            return
+        self.get_profile()
 
-    def on_start(self):
-        """Quick setup for stress testing"""
-        self.user_data = generate_unique_user_data()
-        self.access_token = None
 
-        self.client.post("/api/jwt/register", json=self.user_data, name="JWT Register")
+class LoginStorm(PooledJWTUser):
+    """Every task is a fresh login (password hash + token issue)"""
 
-        login_data = {
-            "identifier": self.user_data["email"],
-            "password": self.user_data["password"],
-        }
-        response = self.client.post("/api/jwt/login", json=login_data, name="JWT Login")
+    @task
+    def login(self):
+        self.login_user()
 
-        if response.status_code == 200:
-            self.access_token = response.json().get("access_token")
 
-    @task(10)
-    def rapid_profile_access(self):
-        """Rapid profile access for stress testing"""
-        if not self.access_token:
-            return
+class LogoutChurn(PooledJWTUser):
+    """Short sessions: login, one profile read, logout (blocklist writes)"""
 
-        headers = {"Authorization": f"Bearer {self.access_token}"}
-        self.client.get("/api/jwt/profile", headers=headers, name="JWT Get Profile")
+    @task
+    def session_cycle(self):
+        self.login_user()
+        if self.access_token:
+            self.get_profile()
+            self.logout_user()
 
 
-# Normal load testing
-class LoadTest(JWTAuthUser):
-    """Normal load testing - recommended for general performance testing"""
+class MixedTraffic(PooledJWTUser):
+    """Realistic mix dominated by authenticated reads"""
 
-    weight = 1
+    def on_start(self):
+        super().on_start()
+        self.login_user()
 
+    @task(16)
+    def read_profile(self):
+        if not self.access_token:
+            self.refresh_tokens()
+            return
+        self.get_profile()
 
-class StressTest(JWTStressTest):
-    """Stress testing - uncomment to enable"""
+    @task(2)
+    def relogin(self):
+        if self.access_token:
+            self.logout_user()
+        self.login_user()
 
-    weight = 1
+    @task(1)
+    def register(self):
+        """Occasional new sign-up"""
+        self.client.post(
+            "/api/jwt/register", json=generate_unique_user_data(), name="JWT Register"
+        )
 
 
 if __name__ == "__main__":
@@ -165,29 +194,31 @@ if __name__ == "__main__":
         """
     JWT AUTHENTICATION PERFORMANCE TESTING
     ======================================
-    
-    Available Test Modes:
-    
-    1. LoadTest (Active): 
-       - Normal user behavior simulation
-       - 1-3 second wait between requests
-       - Mix of profile access and login/logout cycles
-       - JWT token management
-    
-    2. StressTest (Disabled): 
-       - High-frequency requests
-       - 0.1-0.5 second wait between requests
-       - Rapid profile access with JWT tokens
-       - Uncomment StressTest class above to enable
-    
+
+    Seed the user pool first (no per-user registration during the test):
+    flask --app run seed-users --count 1000
+
+    Scenarios (pass one or more class names, default runs all of them):
+
+    1. ProfileReader:  login once, then steady-state profile reads
+                       (refreshing the token pair when the access token expires)
+    2. LoginStorm:     repeated logins (password hash + token issue)
+    3. LogoutChurn:    login -> profile -> logout cycles (blocklist writes)
+    4. MixedTraffic:   mostly profile reads with re-logins and sign-ups
+
+    Each simulated user runs LOCUST_TASKS_PER_SECOND tasks per second
+    (default 0.5), so the arrival rate is users x that rate.
+    LOCUST_USER_POOL_SIZE / LOCUST_USER_PREFIX / LOCUST_USER_PASSWORD must
+    match the seed-users options.
+
     Run Commands:
-    
+
     Basic Test:
-    locust -f jwt_locustfile.py --host=http://127.0.0.1:5000
-    
-    Headless Test (10 users, 2 spawn rate, 30 seconds):
-    locust -f jwt_locustfile.py --host=http://127.0.0.1:5000 --users 10 --spawn-rate 2 --run-time 30s --headless
-    
+    locust -f locustfile.py --host=http://127.0.0.1:5000
+
+    Headless profile reads (500 users at 2 req/s each, 2 minutes):
+    LOCUST_TASKS_PER_SECOND=2 locust -f locustfile.py ProfileReader --host=http://127.0.0.1:5000 --users 500 --spawn-rate 50 --run-time 2m --headless
+
     Then open: http://localhost:8089 (for web UI)
     """
     )
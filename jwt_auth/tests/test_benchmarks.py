@@ -0,0 +1,259 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from flask_jwt_extended import create_access_token, decode_token
+from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import or_
+from app.jwt_api import check_if_token_is_revoked, get_redis_client
+from auth_core.introspection import introspection
+from auth_core.export import export_columns, user_export
+from app.jwt_model import db, JWTUser, users
+
+PASSWORD = "StrongPass123!"
+
+
+@pytest.fixture
+def stored_user(app):
+    """A user persisted in the test database"""
+    user = JWTUser(
+        first_name="Bench",
+        last_name="User",
+        username="benchuser",
+        email="bench@example.com",
+        password_hash=generate_password_hash(PASSWORD),
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def insert_users(count):
+    """Bulk-insert count users (export0000000, ...) without hashing passwords"""
+    from sqlalchemy import insert
+
+    db.session.execute(
+        insert(JWTUser),
+        [
+            {
+                "id": f"export-{i:07d}",
+                "first_name": "Export",
+                "last_name": f"User {i}",
+                "username": f"export{i:07d}",
+                "email": f"export{i:07d}@example.com",
+                "password_hash": "not-a-real-hash",
+            }
+            for i in range(count)
+        ],
+    )
+    db.session.commit()
+
+
+@pytest.fixture
+def no_cache(app, monkeypatch):
+    """Verify every token from scratch, bypassing the decode cache"""
+    monkeypatch.setitem(app.extensions, "jwt_decode_cache", None)
+
+
+@pytest.fixture
+def redis_available(app):
+    """Skip benchmarks that need a running Redis server"""
+    try:
+        get_redis_client().ping()
+    except Exception:
+        pytest.skip("Redis server is not available")
+
+
+@pytest.mark.benchmark(group="hash")
+class TestHashBenchmarks:
+    """Password hashing cost (dominates register and login)"""
+
+    def test_generate_password_hash(self, benchmark):
+        benchmark.pedantic(generate_password_hash, args=(PASSWORD,), rounds=5)
+
+    def test_check_password_hash(self, benchmark):
+        password_hash = generate_password_hash(PASSWORD)
+        assert benchmark.pedantic(
+            check_password_hash, args=(password_hash, PASSWORD), rounds=5
+        )
+
+
+@pytest.mark.benchmark(group="token")
+class TestTokenBenchmarks:
+    """JWT encode/decode cost paid on login and on every authenticated request"""
+
+    def test_encode_access_token(self, app, benchmark):
+        benchmark(create_access_token, identity="5b6f9d2e-bench-user")
+
+    def test_decode_access_token(self, app, no_cache, benchmark):
+        token = create_access_token(identity="5b6f9d2e-bench-user")
+        claims = benchmark(decode_token, token)
+        assert claims["sub"] == "5b6f9d2e-bench-user"
+
+
+@pytest.mark.benchmark(group="decode-cache")
+class TestDecodeCacheBenchmarks:
+    """Per-request token verification with and without the decode cache"""
+
+    def test_decode_uncached(self, app, no_cache, benchmark):
+        token = create_access_token(identity="5b6f9d2e-bench-user")
+        assert benchmark(decode_token, token)["sub"] == "5b6f9d2e-bench-user"
+
+    def test_decode_cached(self, app, benchmark):
+        token = create_access_token(identity="5b6f9d2e-bench-user")
+        assert benchmark(decode_token, token)["sub"] == "5b6f9d2e-bench-user"
+
+    def test_profile_uncached(self, app, stored_user, redis_available, no_cache, benchmark):
+        headers = {"Authorization": f"Bearer {create_access_token(identity=stored_user.id)}"}
+        client = app.test_client()
+        assert benchmark(client.get, "/api/jwt/profile", headers=headers).status_code == 200
+
+    def test_profile_cached(self, app, stored_user, redis_available, benchmark):
+        headers = {"Authorization": f"Bearer {create_access_token(identity=stored_user.id)}"}
+        client = app.test_client()
+        assert benchmark(client.get, "/api/jwt/profile", headers=headers).status_code == 200
+
+
+@pytest.mark.benchmark(group="blocklist")
+class TestBlocklistBenchmarks:
+    """Revocation lookup paid on every authenticated request"""
+
+    def test_blocklist_check(self, app, redis_available, benchmark):
+        claims = decode_token(create_access_token(identity="5b6f9d2e-bench-user"))
+        assert benchmark(check_if_token_is_revoked, {}, claims) is False
+
+
+@pytest.mark.benchmark(group="introspection")
+class TestIntrospectionBenchmarks:
+    """100 tokens checked one request at a time vs in one pipelined batch"""
+
+    @pytest.fixture
+    def tokens(self, app):
+        return [create_access_token(identity=f"user-{i}") for i in range(100)]
+
+    def test_introspect_one_by_one(self, tokens, redis_available, benchmark):
+        client = get_redis_client()
+        benchmark(lambda: [introspection.introspect(client, [token]) for token in tokens])
+
+    def test_introspect_batch(self, tokens, redis_available, benchmark):
+        client = get_redis_client()
+        results, _ = benchmark(introspection.introspect, client, tokens)
+        assert all(result["active"] for result in results)
+
+
+@pytest.mark.benchmark(group="export")
+class TestExportBenchmarks:
+    """Export throughput per format (rows/s in extra_info)"""
+
+    ROWS = 20000
+
+    @pytest.fixture
+    def exported_users(self, app):
+        insert_users(self.ROWS)
+
+    @pytest.mark.parametrize("fmt", ["csv", "jsonl", "columnar"])
+    def test_export(self, app, exported_users, fmt, benchmark):
+        class Discard:
+            def write(self, piece):
+                pass
+
+        rows, _ = benchmark.pedantic(
+            user_export.write, args=(users, "default", fmt, Discard()), rounds=3
+        )
+        assert rows == self.ROWS
+        # No timings are collected under --benchmark-disable
+        if benchmark.enabled:
+            benchmark.extra_info["rows_per_second"] = round(self.ROWS / benchmark.stats.stats.mean)
+
+
+@pytest.mark.benchmark(group="user-list")
+class TestUserListingBenchmarks:
+    """Keyset pages cost the same at the start and deep into the table"""
+
+    ROWS = 20000
+
+    @pytest.fixture
+    def listed_users(self, app):
+        insert_users(self.ROWS)
+
+    def page(self, after):
+        return users.page("default", export_columns(JWTUser), after=after, limit=50)
+
+    def test_first_page(self, app, listed_users, benchmark):
+        assert len(benchmark(self.page, None)) == 50
+
+    def test_deep_page(self, app, listed_users, benchmark):
+        assert len(benchmark(self.page, f"export{self.ROWS - 100:07d}")) == 50
+
+
+@pytest.mark.benchmark(group="user-load")
+class TestUserLoadBenchmarks:
+    """User row loads behind /profile and /login"""
+
+    def test_load_user_by_id(self, app, stored_user, benchmark):
+        user_id = stored_user.id
+
+        def load():
+            # Start from an empty identity map so every round hits the database
+            db.session.expunge_all()
+            return db.session.get(JWTUser, user_id)
+
+        assert benchmark(load).id == user_id
+
+    def test_load_user_by_identifier(self, app, stored_user, benchmark):
+        user_id = stored_user.id
+
+        def load():
+            db.session.expunge_all()
+            return JWTUser.query.filter(
+                or_(
+                    JWTUser.username == "bench@example.com",
+                    JWTUser.email == "bench@example.com",
+                )
+            ).first()
+
+        assert benchmark(load).id == user_id
+
+
+@pytest.mark.benchmark(group="login-timing")
+class TestLoginTimingBenchmarks:
+    """Failed-login latency for existing and unknown identifiers (should match)"""
+
+    @pytest.fixture
+    def login_client(self, app):
+        from auth_core.hashing import PasswordHasher
+
+        app.config["RATELIMIT_ENABLED"] = False
+        app.config["LOCKOUT_ENABLED"] = False
+        app.extensions["password_hasher"] = PasswordHasher()
+        client = app.test_client()
+        client.post(
+            "/api/jwt/register",
+            json={
+                "first_name": "Bench",
+                "last_name": "User",
+                "username": "benchuser",
+                "email": "bench@example.com",
+                "password": PASSWORD,
+            },
+        )
+        return client
+
+    def test_wrong_password(self, login_client, benchmark):
+        login = {"identifier": "benchuser", "password": "WrongPass123!"}
+        response = benchmark.pedantic(
+            login_client.post, args=("/api/jwt/login",), kwargs={"json": login}, rounds=20
+        )
+        assert response.status_code == 401
+
+    def test_unknown_identifier(self, login_client, benchmark):
+        # Let the worker see real checks first, as a running server would have
+        for _ in range(5):
+            login_client.post(
+                "/api/jwt/login", json={"identifier": "benchuser", "password": "x"}
+            )
+        login = {"identifier": "nobody", "password": "WrongPass123!"}
+        response = benchmark.pedantic(
+            login_client.post, args=("/api/jwt/login",), kwargs={"json": login}, rounds=20
+        )
+        assert response.status_code == 401
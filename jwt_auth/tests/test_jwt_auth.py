@@ -1,4 +1,5 @@
 import pytest
+import base64
 import json
 
 
@@ -129,7 +130,7 @@ class TestLogin:
         response = client.post("/api/jwt/login", json=login_data)
 
         assert response.status_code == 401
-        assert "Invalid username or email" in response.get_json()["error"]
+        assert response.get_json()["error"] == "Invalid credentials"
 
     def test_login_missing_fields(self, client):
         """Test login with missing required fields"""
@@ -299,5 +300,1314 @@ class TestWorkflow:
             assert logout_response.status_code == 200
 
 
+class TestRefresh:
+    """Test refresh token rotation"""
+
+    def login(self, client, user_data):
+        """Helper to register, login and return the token pair"""
+        client.post("/api/jwt/register", json=user_data)
+        login_data = {
+            "identifier": user_data["email"],
+            "password": user_data["password"],
+        }
+        return client.post("/api/jwt/login", json=login_data).get_json()
+
+    def refresh(self, client, refresh_token):
+        headers = {"Authorization": f"Bearer {refresh_token}"}
+        return client.post("/api/jwt/refresh", headers=headers)
+
+    def test_login_returns_refresh_token(self, client, user_data):
+        """Test login issues a short-lived access token and a refresh token"""
+        from flask_jwt_extended import decode_token
+
+        tokens = self.login(client, user_data)
+        access = decode_token(tokens["access_token"])
+        refresh = decode_token(tokens["refresh_token"])
+
+        assert refresh["type"] == "refresh"
+        assert access["fam"] == refresh["fam"]
+        assert access["exp"] - access["iat"] == 15 * 60
+
+    def test_refresh_rotates_tokens(self, client, user_data):
+        """Test refreshing returns a working pair and invalidates the old refresh token"""
+        tokens = self.login(client, user_data)
+
+        response = self.refresh(client, tokens["refresh_token"])
+        assert response.status_code == 200
+        rotated = response.get_json()
+        assert rotated["refresh_token"] != tokens["refresh_token"]
+
+        headers = {"Authorization": f"Bearer {rotated['access_token']}"}
+        assert client.get("/api/jwt/profile", headers=headers).status_code == 200
+
+        response = self.refresh(client, rotated["refresh_token"])
+        assert response.status_code == 200
+
+    def test_refresh_reuse_revokes_family(self, client, user_data):
+        """Test replaying a rotated refresh token revokes the whole family"""
+        tokens = self.login(client, user_data)
+        rotated = self.refresh(client, tokens["refresh_token"]).get_json()
+
+        # Replaying the old token is treated as theft
+        assert self.refresh(client, tokens["refresh_token"]).status_code == 401
+        # The legitimate holder has to log in again as well
+        assert self.refresh(client, rotated["refresh_token"]).status_code == 401
+
+    def test_rotated_token_keeps_family_expiry(self, client, user_data):
+        """Test refreshing does not extend the session beyond the original expiry"""
+        from flask_jwt_extended import decode_token
+
+        tokens = self.login(client, user_data)
+        rotated = self.refresh(client, tokens["refresh_token"]).get_json()
+
+        original = decode_token(tokens["refresh_token"])["exp"]
+        assert decode_token(rotated["refresh_token"])["exp"] <= original
+
+    def test_logout_revokes_refresh_token(self, client, user_data):
+        """Test logout ends the session's refresh token family"""
+        tokens = self.login(client, user_data)
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+        assert client.delete("/api/jwt/logout", headers=headers).status_code == 200
+        assert self.refresh(client, tokens["refresh_token"]).status_code == 401
+
+    def test_access_token_cannot_refresh(self, client, user_data):
+        """Test an access token is rejected by the refresh endpoint"""
+        tokens = self.login(client, user_data)
+        assert self.refresh(client, tokens["access_token"]).status_code == 422
+
+
+class TestRevocationStore:
+    """Test the expiry-bucketed token blocklist"""
+
+    @pytest.fixture
+    def store(self, app):
+        from app.jwt_api import get_redis_client
+        from auth_core.revocation import RevocationStore
+
+        redis_client = get_redis_client()
+        for key in redis_client.scan_iter(match="rv:*"):
+            redis_client.delete(key)
+        return RevocationStore(redis_client, "default")
+
+    def claims(self, expires_in):
+        import time
+        import uuid
+
+        return {"jti": str(uuid.uuid4()), "exp": int(time.time()) + expires_in}
+
+    def test_revoke_and_check(self, store):
+        """Test a revoked token is reported and others are not"""
+        revoked, other = self.claims(600), self.claims(600)
+
+        assert store.revoke(revoked) is True
+        assert store.is_revoked(revoked)
+        assert not store.is_revoked(other)
+
+    def test_expired_token_is_not_stored(self, store):
+        """Test revoking an already expired token writes nothing"""
+        assert store.revoke(self.claims(-5)) is False
+        assert store.memory_report()["entries"] == 0
+
+    def test_entry_expires_with_token(self, store):
+        """Test the bucket TTL ends within a minute after the token's exp"""
+        claims = self.claims(15 * 60)
+        store.revoke(claims)
+
+        key = next(store.client.scan_iter(match="rv:*"))
+        assert 15 * 60 - 1 <= store.client.ttl(key) <= 16 * 60
+
+    def test_jti_stored_as_binary(self, store):
+        """Test members are the 16-byte binary JTI"""
+        import uuid
+
+        claims = self.claims(600)
+        store.revoke(claims)
+
+        key = next(store.client.scan_iter(match="rv:*"))
+        assert store.client.sismember(key, uuid.UUID(claims["jti"]).bytes)
+
+    def test_memory_report_counts_entries(self, store):
+        """Test the report sums entries across buckets"""
+        for expires_in in (60, 600, 600, 3600):
+            store.revoke(self.claims(expires_in))
+
+        report = store.memory_report()
+        assert report["entries"] == 4
+        assert 3 <= report["buckets"] <= 4
+
+    def test_logout_uses_store(self, app, client, user_data, store):
+        """Test logout revokes the access token through the store"""
+        client.post("/api/jwt/register", json=user_data)
+        login_data = {"identifier": user_data["email"], "password": user_data["password"]}
+        token = client.post("/api/jwt/login", json=login_data).get_json()["access_token"]
+
+        client.delete("/api/jwt/logout", headers={"Authorization": f"Bearer {token}"})
+        assert store.memory_report()["entries"] == 1
+
+
+class TestDecodeCache:
+    """Test the verified-token decode cache"""
+
+    def login(self, client, user_data):
+        client.post("/api/jwt/register", json=user_data)
+        login_data = {"identifier": user_data["email"], "password": user_data["password"]}
+        token = client.post("/api/jwt/login", json=login_data).get_json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_repeat_requests_hit_cache(self, app, client, user_data):
+        """Test the second request with the same token skips decoding"""
+        cache = app.extensions["jwt_decode_cache"].for_tenant("default")
+        headers = self.login(client, user_data)
+
+        assert client.get("/api/jwt/profile", headers=headers).status_code == 200
+        hits = cache.hits
+        assert client.get("/api/jwt/profile", headers=headers).status_code == 200
+        assert cache.hits == hits + 1
+
+    def test_expired_entry_is_dropped(self):
+        """Test a cached token past its exp falls back to a full decode"""
+        import time
+        from auth_core.token_cache import DecodeCache
+
+        cache = DecodeCache(maxsize=10)
+        cache.put(b"key", {"jti": "1", "exp": time.time() - 1})
+
+        assert cache.get(b"key") is None
+        assert not cache.entries and not cache.digests
+
+    def test_expired_token_is_rejected(self, app, client):
+        """Test an expired token is refused with the regular expiry error"""
+        from datetime import timedelta
+        from flask_jwt_extended import create_access_token
+
+        token = create_access_token(identity="someone", expires_delta=timedelta(seconds=-1))
+        response = client.get("/api/jwt/profile", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+        assert response.get_json()["msg"] == "Token has expired"
+
+    def test_logout_evicts_token(self, app, client, user_data):
+        """Test logout removes the token from the cache and it stays blocked"""
+        cache = app.extensions["jwt_decode_cache"].for_tenant("default")
+        headers = self.login(client, user_data)
+        client.get("/api/jwt/profile", headers=headers)
+
+        client.delete("/api/jwt/logout", headers=headers)
+        assert not cache.digests
+        assert client.get("/api/jwt/profile", headers=headers).status_code == 401
+
+    def test_cache_is_bounded(self):
+        """Test the least recently used entries are evicted"""
+        import time
+        from auth_core.token_cache import DecodeCache
+
+        cache = DecodeCache(maxsize=2)
+        exp = time.time() + 60
+        for i in range(3):
+            cache.put(f"key{i}".encode(), {"jti": str(i), "exp": exp})
+
+        assert len(cache.entries) == 2
+        assert cache.get(b"key0") is None
+        assert cache.get(b"key2")["jti"] == "2"
+
+    def test_cache_can_be_disabled(self, monkeypatch):
+        """Test JWT_DECODE_CACHE_SIZE=0 turns the cache off"""
+        from config import TestingConfig
+        from app import create_app
+
+        monkeypatch.setattr(TestingConfig, "JWT_DECODE_CACHE_SIZE", 0)
+        assert create_app(config="testing").extensions["jwt_decode_cache"] is None
+
+
+class TestTenancy:
+    """Test tenant isolation"""
+
+    def register(self, client, user_data, tenant):
+        return client.post(
+            "/api/jwt/register", json=user_data, headers={"X-Tenant-ID": tenant}
+        )
+
+    def login(self, client, user_data, tenant):
+        self.register(client, user_data, tenant)
+        login_data = {"identifier": user_data["email"], "password": user_data["password"]}
+        response = client.post(
+            "/api/jwt/login", json=login_data, headers={"X-Tenant-ID": tenant}
+        )
+        return response.get_json()["access_token"]
+
+    def test_same_user_in_two_tenants(self, client, user_data):
+        """Test usernames and emails are only unique within a tenant"""
+        assert self.register(client, user_data, "acme").status_code == 201
+        assert self.register(client, user_data, "globex").status_code == 201
+        assert self.register(client, user_data, "acme").status_code == 409
+
+    def test_login_is_scoped_to_tenant(self, client, user_data):
+        """Test a user cannot log in through another tenant"""
+        self.register(client, user_data, "acme")
+        login_data = {"identifier": user_data["email"], "password": user_data["password"]}
+
+        response = client.post(
+            "/api/jwt/login", json=login_data, headers={"X-Tenant-ID": "globex"}
+        )
+        assert response.status_code == 401
+
+    def test_token_rejected_by_other_tenant(self, client, user_data):
+        """Test a token signed for one tenant fails verification for another"""
+        token = self.login(client, user_data, "acme")
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.get("/api/jwt/profile", headers={**headers, "X-Tenant-ID": "acme"})
+        assert response.status_code == 200
+        response = client.get("/api/jwt/profile", headers={**headers, "X-Tenant-ID": "globex"})
+        assert response.status_code == 422
+
+    def test_unknown_tenant_rejected(self, client, user_data):
+        """Test requests for unconfigured tenants are refused"""
+        response = self.register(client, user_data, "initech")
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "Unknown tenant"
+
+    def test_keyring(self):
+        """Test the default tenant keeps the global secret and others get their own key"""
+        from auth_core.tenancy import TenantKeyring
+
+        keyring = TenantKeyring("master", {"globex": "globex-secret"})
+        assert keyring.key_for("default") == "master"
+        assert keyring.key_for("globex") == "globex-secret"
+        assert keyring.key_for("acme") not in ("master", "globex-secret")
+        assert keyring.key_for("acme") is keyring.key_for("acme")
+
+    def test_decode_caches_are_partitioned(self, app, client, user_data):
+        """Test each tenant's tokens land in that tenant's cache"""
+        token = self.login(client, user_data, "acme")
+        headers = {"Authorization": f"Bearer {token}", "X-Tenant-ID": "acme"}
+        client.get("/api/jwt/profile", headers=headers)
+
+        caches = app.extensions["jwt_decode_cache"]
+        assert len(caches.for_tenant("acme").entries) == 1
+        assert len(caches.for_tenant("default").entries) == 0
+
+    def test_blocklist_is_partitioned(self, app, client, user_data):
+        """Test revocations are stored under the tenant's prefix"""
+        from app.jwt_api import get_redis_client
+
+        redis_client = get_redis_client()
+        for key in redis_client.scan_iter(match="rv:*"):
+            redis_client.delete(key)
+
+        token = self.login(client, user_data, "acme")
+        headers = {"Authorization": f"Bearer {token}", "X-Tenant-ID": "acme"}
+        client.delete("/api/jwt/logout", headers=headers)
+
+        keys = list(redis_client.scan_iter(match="rv:*"))
+        assert keys and all(key.startswith("rv:acme:") for key in keys)
+        assert client.get("/api/jwt/profile", headers=headers).status_code == 401
+
+
+class TestReplicas:
+    """Test read-replica routing"""
+
+    @pytest.fixture
+    def replica_app(self, tmp_path, monkeypatch):
+        """App with an empty SQLite replica, so reads served by it find no users"""
+        from config import TestingConfig
+        from app import create_app
+        from app.jwt_model import db
+
+        monkeypatch.setattr(
+            TestingConfig, "SQLALCHEMY_REPLICA_URIS", [f"sqlite:///{tmp_path}/replica.db"]
+        )
+        app = create_app(config="testing")
+        with app.app_context():
+            db.metadata.create_all(app.extensions["replica_router"].engines["replica_0"])
+            yield app
+            db.session.remove()
+
+    def login(self, client, user_data):
+        login_data = {"identifier": user_data["email"], "password": user_data["password"]}
+        return client.post("/api/jwt/login", json=login_data)
+
+    def test_write_pins_client_to_primary(self, replica_app, user_data):
+        """Test a client reads its own registration from the primary"""
+        client = replica_app.test_client()
+        response = client.post("/api/jwt/register", json=user_data)
+
+        assert "db_pin" in response.headers["Set-Cookie"]
+        assert self.login(client, user_data).status_code == 200
+
+    def test_reads_go_to_replica(self, replica_app, user_data):
+        """Test an unpinned client's login lookup is served by the (empty) replica"""
+        replica_app.test_client().post("/api/jwt/register", json=user_data)
+
+        assert self.login(replica_app.test_client(), user_data).status_code == 401
+
+    def test_failed_replica_falls_back_to_primary(self, tmp_path, monkeypatch, user_data):
+        """Test an unreachable replica is skipped"""
+        from config import TestingConfig
+        from app import create_app
+
+        monkeypatch.setattr(
+            TestingConfig,
+            "SQLALCHEMY_REPLICA_URIS",
+            [f"sqlite:///{tmp_path}/missing/replica.db"],
+        )
+        app = create_app(config="testing")
+        with app.app_context():
+            app.test_client().post("/api/jwt/register", json=user_data)
+            assert self.login(app.test_client(), user_data).status_code == 200
+            assert app.extensions["replica_router"].down_until
+
+    def test_lagging_replica_falls_back_to_primary(self, replica_app, user_data, monkeypatch):
+        """Test a replica behind the primary by more than the allowed lag is skipped"""
+        from auth_core.replicas import LAG_QUERIES
+
+        monkeypatch.setitem(LAG_QUERIES, "sqlite", "SELECT 60")
+        replica_app.test_client().post("/api/jwt/register", json=user_data)
+
+        assert self.login(replica_app.test_client(), user_data).status_code == 200
+
+
+class TestSharding:
+    """Test spreading users over several databases"""
+
+    @pytest.fixture
+    def sharded_app(self, tmp_path, monkeypatch):
+        """App with two SQLite shards next to the in-memory primary"""
+        from config import TestingConfig
+        from app import create_app
+        from app.jwt_model import db
+
+        monkeypatch.setattr(
+            TestingConfig,
+            "SQLALCHEMY_SHARD_URIS",
+            [f"sqlite:///{tmp_path}/shard1.db", f"sqlite:///{tmp_path}/shard2.db"],
+        )
+        app = create_app(config="testing")
+        with app.app_context():
+            yield app
+            db.session.remove()
+
+    def register_users(self, client, count):
+        users = []
+        for i in range(count):
+            user = {
+                "first_name": "Shard",
+                "last_name": f"User {i}",
+                "username": f"sharduser{i}",
+                "email": f"sharduser{i}@example.com",
+                "password": "StrongPass123!",
+            }
+            assert client.post("/api/jwt/register", json=user).status_code == 201
+            users.append(user)
+        return users
+
+    def test_users_spread_over_shards(self, sharded_app):
+        """Test each user is stored on the shard its ID hashes to and can log in"""
+        from sqlalchemy import select
+        from app.jwt_model import db, JWTUser, JWTUserIndex
+
+        client = sharded_app.test_client()
+        users = self.register_users(client, 8)
+        shards = sharded_app.extensions["user_shards"]
+
+        placed = set()
+        for shard in range(shards.count):
+            ids = db.session.scalars(
+                select(JWTUser.id), bind_arguments=shards.bind_arguments(shard)
+            ).all()
+            assert all(shards.shard_for(user_id) == shard for user_id in ids)
+            placed.update(ids)
+        assert placed == set(db.session.scalars(select(JWTUserIndex.user_id)))
+        assert len(placed) == 8
+
+        for user in users:
+            login_data = {"identifier": user["username"], "password": user["password"]}
+            response = client.post("/api/jwt/login", json=login_data)
+            assert response.status_code == 200
+            headers = {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+            profile = client.get("/api/jwt/profile", headers=headers)
+            assert profile.get_json()["data"]["email"] == user["email"]
+
+    def test_duplicates_rejected_across_shards(self, sharded_app, user_data):
+        """Test the index keeps usernames and emails unique over all shards"""
+        client = sharded_app.test_client()
+        assert client.post("/api/jwt/register", json=user_data).status_code == 201
+
+        duplicate = {**user_data, "email": "other@example.com"}
+        response = client.post("/api/jwt/register", json=duplicate)
+        assert response.status_code == 409
+        assert response.get_json()["error"] == "Username already exists"
+
+    def test_register_over_stale_index_entries(self, sharded_app, user_data):
+        """Test index entries left by a failed shard commit do not block the name"""
+        from app.jwt_model import db, JWTUserIndex
+
+        db.session.add_all(
+            [
+                JWTUserIndex(tenant="default", value=user_data["username"], kind="username", user_id="lost"),
+                JWTUserIndex(tenant="default", value=user_data["email"], kind="email", user_id="lost"),
+            ]
+        )
+        db.session.commit()
+
+        client = sharded_app.test_client()
+        assert client.post("/api/jwt/register", json=user_data).status_code == 201
+        login_data = {"identifier": user_data["email"], "password": user_data["password"]}
+        assert client.post("/api/jwt/login", json=login_data).status_code == 200
+
+        duplicate = {**user_data, "email": "other@example.com"}
+        assert client.post("/api/jwt/register", json=duplicate).status_code == 409
+
+    def test_login_without_index_entry(self, app, client, user_data):
+        """Test users missing from the index (e.g. bulk-loaded) need a backfill"""
+        from werkzeug.security import generate_password_hash
+        from app.jwt_model import db, JWTUser, JWTUserIndex
+        from app.sharding import backfill_index
+
+        db.session.add(
+            JWTUser(
+                first_name=user_data["first_name"],
+                last_name=user_data["last_name"],
+                username=user_data["username"],
+                email=user_data["email"],
+                password_hash=generate_password_hash(user_data["password"]),
+            )
+        )
+        db.session.commit()
+
+        login_data = {"identifier": user_data["email"], "password": user_data["password"]}
+        assert client.post("/api/jwt/login", json=login_data).status_code == 401
+
+        engines = [db.engine, *app.extensions["user_shards"].engines]
+        assert backfill_index(JWTUser.__table__, JWTUserIndex.__table__, engines) == 2
+        assert backfill_index(JWTUser.__table__, JWTUserIndex.__table__, engines) == 0
+
+        assert client.post("/api/jwt/login", json=login_data).status_code == 200
+        assert app.extensions["user_shards"].lookups.entries
+
+    def test_unknown_login_uses_only_the_index(self, app, client):
+        """Test an unknown identifier costs one index query, not one per shard"""
+        from sqlalchemy import event
+        from app.jwt_model import db
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            login_data = {"identifier": "nobody@example.com", "password": "Whatever123!"}
+            assert client.post("/api/jwt/login", json=login_data).status_code == 401
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        assert not any("FROM jwt_users" in statement for statement in statements)
+
+    def test_adding_shard_moves_few_users(self):
+        """Test consistent hashing only moves users onto the new shard"""
+        import uuid
+        from app.sharding import shard_for
+
+        ids = [str(uuid.uuid4()) for _ in range(2000)]
+        moved = [i for i in ids if shard_for(i, 3) != shard_for(i, 4)]
+
+        assert all(shard_for(i, 4) == 3 for i in moved)
+        assert 0.15 < len(moved) / len(ids) < 0.35
+
+    def test_rebalance(self, tmp_path):
+        """Test rebalancing moves every user to its shard and can be re-run"""
+        import uuid
+        from sqlalchemy import create_engine, func, insert, select
+        from app.jwt_model import JWTUser
+        from app.sharding import rebalance, shard_for
+
+        table = JWTUser.__table__
+        engines = [create_engine(f"sqlite:///{tmp_path}/shard{i}.db") for i in range(3)]
+        table.create(engines[0])
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "tenant": "default",
+                "first_name": "Shard",
+                "last_name": f"User {i}",
+                "username": f"sharduser{i}",
+                "email": f"sharduser{i}@example.com",
+                "password_hash": "x",
+            }
+            for i in range(50)
+        ]
+        with engines[0].begin() as connection:
+            connection.execute(insert(table), rows)
+
+        moved = rebalance(table, engines, batch_size=7)
+
+        for index, engine in enumerate(engines):
+            with engine.connect() as connection:
+                ids = connection.scalars(select(table.c.id)).all()
+            assert all(shard_for(user_id, 3) == index for user_id in ids)
+        assert moved[0] == sum(1 for row in rows if shard_for(row["id"], 3) != 0)
+        assert sum(rebalance(table, engines).values()) == 0
+
+
+class TestAudit:
+    """Test the buffered audit event log"""
+
+    @pytest.fixture
+    def audit_app(self, tmp_path, monkeypatch):
+        """App writing audit events to JSONL segments in a temporary folder"""
+        from config import TestingConfig
+        from app import create_app
+        from app.jwt_model import db
+
+        monkeypatch.setattr(TestingConfig, "AUDIT_ENABLED", True, raising=False)
+        monkeypatch.setattr(TestingConfig, "AUDIT_DIR", str(tmp_path), raising=False)
+        # Only explicit flushes write, so the tests see every event at once
+        monkeypatch.setattr(TestingConfig, "AUDIT_FLUSH_INTERVAL", 60)
+        app = create_app(config="testing")
+        with app.app_context():
+            yield app
+            db.session.remove()
+
+    def read_events(self, directory):
+        import gzip
+
+        events = []
+        for path in sorted(directory.iterdir()):
+            opener = gzip.open if path.suffix == ".gz" else open
+            with opener(path, "rt") as f:
+                events.extend(json.loads(line) for line in f)
+        return events
+
+    def test_auth_events_are_written_in_a_batch(self, audit_app, user_data, tmp_path):
+        """Test register, login, failed login and logout events reach the segment file"""
+        from auth_core.audit import audit
+
+        client = audit_app.test_client()
+        client.post("/api/jwt/register", json=user_data)
+        client.post(
+            "/api/jwt/login", json={"identifier": "nobody", "password": "password123"}
+        )
+        client.post(
+            "/api/jwt/login", json={"identifier": "testuser", "password": "wrong"}
+        )
+        response = client.post(
+            "/api/jwt/login", json={"identifier": "testuser", "password": "password123"}
+        )
+        token = response.get_json()["access_token"]
+        client.delete("/api/jwt/logout", headers={"Authorization": f"Bearer {token}"})
+
+        # Nothing is written while handling the requests
+        assert list(tmp_path.iterdir()) == []
+        audit.flush()
+
+        events = self.read_events(tmp_path)
+        assert [e["event"] for e in events] == [
+            "register",
+            "login_failed",
+            "login_failed",
+            "login",
+            "logout",
+        ]
+        assert events[1]["reason"] == "unknown_user"
+        assert events[1]["identifier"] == "nobody"
+        assert events[2]["reason"] == "bad_password"
+        assert {e["tenant"] for e in events} == {"default"}
+        assert len({e["user_id"] for e in events if e["user_id"]}) == 1
+
+    def test_full_segments_are_compressed(self, audit_app, tmp_path):
+        """Test a segment is gzipped and a new one started once it reaches its size"""
+        from auth_core.audit import audit
+
+        audit.record("login", user_id="a")
+        audit_app.extensions["audit"].sink.max_bytes = 1
+        audit.flush()
+        audit.record("login", user_id="b")
+        audit.flush()
+
+        assert sorted(p.suffix for p in tmp_path.iterdir()) == [".gz", ".gz"]
+        assert [e["user_id"] for e in self.read_events(tmp_path)] == ["a", "b"]
+
+    def test_segments_rotated_in_one_millisecond(self, tmp_path, monkeypatch):
+        """Test segments started at the same time do not share a file"""
+        import time
+        from auth_core.audit import JsonlSink
+
+        monkeypatch.setattr(time, "time", lambda: 1700000000.0)
+        sink = JsonlSink(str(tmp_path), max_bytes=1)
+        sink.write([{"user_id": "a"}])
+        sink.write([{"user_id": "b"}])
+
+        assert [e["user_id"] for e in self.read_events(tmp_path)] == ["a", "b"]
+
+    def test_full_buffer_drops_oldest_events(self, audit_app, tmp_path):
+        """Test the ring buffer keeps the newest events when the sink falls behind"""
+        from auth_core.audit import audit
+
+        writer = audit_app.extensions["audit"]
+        writer.capacity = 2
+        for user_id in ("a", "b", "c"):
+            audit.record("login", user_id=user_id)
+        audit.flush()
+
+        assert [e["user_id"] for e in self.read_events(tmp_path)] == ["b", "c"]
+
+    def test_table_sink(self, monkeypatch, user_data):
+        """Test events can be appended to the audit_events table instead"""
+        from config import TestingConfig
+        from app import create_app
+        from auth_core.audit import audit, audit_events
+        from app.jwt_model import db
+        from sqlalchemy import select
+
+        monkeypatch.setattr(TestingConfig, "AUDIT_ENABLED", True, raising=False)
+        monkeypatch.setattr(TestingConfig, "AUDIT_SINK", "table")
+        monkeypatch.setattr(TestingConfig, "AUDIT_FLUSH_INTERVAL", 60)
+        app = create_app(config="testing")
+        with app.app_context():
+            app.test_client().post("/api/jwt/register", json=user_data)
+            audit.flush()
+            rows = db.session.execute(select(audit_events)).all()
+            db.session.remove()
+
+        assert [row.event for row in rows] == ["register"]
+        assert rows[0].tenant == "default"
+
+
+class TestLockout:
+    """Test locking out identifiers and IPs after failed logins"""
+
+    def login(self, client, identifier, password):
+        return client.post(
+            "/api/jwt/login", json={"identifier": identifier, "password": password}
+        )
+
+    def test_identifier_locked_after_failures(self, app, client, user_data, monkeypatch):
+        """Test even the right password is refused, without hashing, once locked"""
+        client.post("/api/jwt/register", json=user_data)
+        for _ in range(5):
+            assert self.login(client, "testuser", "wrong").status_code == 401
+
+        import importlib
+
+        def fail_hash(*args):
+            raise AssertionError("password hashed while locked out")
+
+        module = importlib.import_module("auth_core.hashing")
+        monkeypatch.setattr(module, "check_password_hash", fail_hash)
+        response = self.login(client, "testuser", user_data["password"])
+        assert response.status_code == 429
+        assert "failed login attempts" in response.get_json()["error"]
+        assert int(response.headers["Retry-After"]) == 30
+
+    def test_success_clears_failures(self, client, user_data):
+        """Test a successful login resets the identifier's count"""
+        client.post("/api/jwt/register", json=user_data)
+        for _ in range(2):
+            for _ in range(4):
+                assert self.login(client, "testuser", "wrong").status_code == 401
+            assert self.login(client, "testuser", user_data["password"]).status_code == 200
+
+    def test_unknown_identifiers_count_too(self, client):
+        """Test probing a nonexistent account is locked out like a real one"""
+        for _ in range(5):
+            assert self.login(client, "ghost", "x").status_code == 401
+        assert self.login(client, "ghost", "x").status_code == 429
+        assert self.login(client, "someone-else", "x").status_code == 401
+
+    def test_ip_locked_after_spraying(self, app, client):
+        """Test one IP trying many identifiers is locked out"""
+        app.config["LOCKOUT_THRESHOLDS"] = {"identifier": 5, "ip": 3}
+        for i in range(3):
+            assert self.login(client, f"user{i}", "x").status_code == 401
+        assert self.login(client, "user9", "x").status_code == 429
+
+    def test_lock_doubles_with_each_failure(self):
+        """Test the lock grows exponentially up to the maximum"""
+        from auth_core.lockout import MemoryBackend
+
+        backend = MemoryBackend()
+        locks = [backend.fail(["k"], [3], 30, 100, 900) for _ in range(6)]
+
+        assert locks == [0, 0, 30, 60, 100, 100]
+        assert 99 < backend.check(["k"]) <= 100
+
+    def test_redis_outage_falls_back_to_local_counters(self, app, client, monkeypatch):
+        """Test failures are still counted when the shared store is down"""
+        backend, fallback = app.extensions["login_lockout"]
+
+        def unavailable(*args):
+            raise ConnectionError("redis is down")
+
+        monkeypatch.setattr(backend, "check", unavailable)
+        monkeypatch.setattr(backend, "fail", unavailable)
+        for _ in range(5):
+            assert self.login(client, "ghost", "x").status_code == 401
+        assert self.login(client, "ghost", "x").status_code == 429
+
+
+class TestLoginTiming:
+    """Test unknown identifiers take as long as wrong passwords"""
+
+    @pytest.fixture
+    def padded_app(self, monkeypatch):
+        from config import TestingConfig
+        from app import create_app
+        from app.jwt_model import db
+
+        monkeypatch.setattr(TestingConfig, "LOGIN_TIMING_PADDING", True)
+        app = create_app(config="testing")
+        with app.app_context():
+            yield app
+            db.session.remove()
+
+    def login(self, client, identifier, password):
+        return client.post(
+            "/api/jwt/login", json={"identifier": identifier, "password": password}
+        )
+
+    def test_unknown_user_checks_dummy_hash_until_warm(self, padded_app):
+        """Test the first unknown-user logins verify the precomputed dummy hash"""
+        timer = padded_app.extensions["password_hasher"]
+        response = self.login(padded_app.test_client(), "ghost", "password123")
+
+        assert response.status_code == 401
+        assert len(timer.samples) == 1
+
+    def test_unknown_user_sleeps_instead_of_hashing(self, padded_app, monkeypatch):
+        """Test a warm worker waits a sampled hash duration without hashing"""
+        import importlib
+
+        module = importlib.import_module("auth_core.hashing")
+        timer = padded_app.extensions["password_hasher"]
+        timer.samples.extend([0.05] * timer.warmup)
+
+        def fail_hash(*args):
+            raise AssertionError("password hashed for an unknown user")
+
+        slept = []
+        monkeypatch.setattr(module, "check_password_hash", fail_hash)
+        monkeypatch.setattr(module.time, "sleep", slept.append)
+
+        response = self.login(padded_app.test_client(), "ghost", "password123")
+        assert response.status_code == 401
+        assert slept == [0.05]
+
+    def test_password_checks_are_sampled(self, padded_app, user_data):
+        """Test real password checks feed the padding durations"""
+        client = padded_app.test_client()
+        client.post("/api/jwt/register", json=user_data)
+        self.login(client, "testuser", "wrong")
+        self.login(client, "testuser", user_data["password"])
+
+        assert len(padded_app.extensions["password_hasher"].samples) == 2
+
+
+class TestIntrospection:
+    """Test batched RFC 7662 token introspection"""
+
+    CLIENT = {"Authorization": "Basic " + base64.b64encode(b"gateway:gateway-secret").decode()}
+
+    def login(self, client, user_data):
+        """Helper to register, login and return the token pair"""
+        client.post("/api/jwt/register", json=user_data)
+        login_data = {
+            "identifier": user_data["email"],
+            "password": user_data["password"],
+        }
+        return client.post("/api/jwt/login", json=login_data).get_json()
+
+    def introspect(self, client, tokens, **kwargs):
+        return client.post(
+            "/api/jwt/introspect", json={"tokens": tokens, **kwargs}, headers=self.CLIENT
+        )
+
+    def test_requires_client_credentials(self, client, user_data):
+        """Test only configured clients may introspect"""
+        tokens = self.login(client, user_data)
+        wrong = {"Authorization": "Basic " + base64.b64encode(b"gateway:nope").decode()}
+
+        response = client.post("/api/jwt/introspect", data={"token": tokens["access_token"]})
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"].startswith("Basic")
+        response = client.post(
+            "/api/jwt/introspect", data={"token": tokens["access_token"]}, headers=wrong
+        )
+        assert response.status_code == 401
+
+    def test_single_form_token(self, client, user_data):
+        """Test the RFC form request returns one result object"""
+        tokens = self.login(client, user_data)
+        response = client.post(
+            "/api/jwt/introspect", data={"token": tokens["access_token"]}, headers=self.CLIENT
+        )
+
+        assert response.status_code == 200
+        result = response.get_json()
+        assert result["active"] is True
+        assert result["token_type"] == "access"
+        assert {"sub", "jti", "exp", "iat"} <= result.keys()
+        assert response.headers["Cache-Control"] == "no-store"
+
+    def test_batch_results_in_order(self, client, user_data):
+        """Test revoked, rotated and malformed tokens are inactive"""
+        tokens = self.login(client, user_data)
+        rotated = client.post(
+            "/api/jwt/refresh",
+            headers={"Authorization": f"Bearer {tokens['refresh_token']}"},
+        ).get_json()
+        revoked = client.post(
+            "/api/jwt/login",
+            json={"identifier": user_data["username"], "password": user_data["password"]},
+        ).get_json()["access_token"]
+        client.delete("/api/jwt/logout", headers={"Authorization": f"Bearer {revoked}"})
+
+        response = self.introspect(
+            client,
+            [
+                rotated["access_token"],
+                "not-a-token",
+                revoked,
+                tokens["refresh_token"],
+                rotated["refresh_token"],
+            ],
+        )
+
+        results = response.get_json()["results"]
+        assert [result["active"] for result in results] == [True, False, False, False, True]
+        assert results[1] == {"active": False}
+        assert results[4]["token_type"] == "refresh"
+
+    def test_blocklist_checked_in_one_round_trip(self, client, user_data, monkeypatch):
+        """Test a batch costs a single Redis pipeline"""
+        import redis
+
+        tokens = self.login(client, user_data)
+        executed = []
+        execute = redis.client.Pipeline.execute
+
+        def counting_execute(pipe, *args, **kwargs):
+            executed.append(len(pipe.command_stack))
+            return execute(pipe, *args, **kwargs)
+
+        monkeypatch.setattr(redis.client.Pipeline, "execute", counting_execute)
+        response = self.introspect(
+            client, [tokens["access_token"]] * 10 + [tokens["refresh_token"]]
+        )
+
+        assert response.status_code == 200
+        assert executed == [23]
+
+    def test_tokens_of_other_tenants_are_inactive(self, client, user_data):
+        tokens = self.login(client, user_data)
+        response = client.post(
+            "/api/jwt/introspect",
+            json={"token": tokens["access_token"]},
+            headers={**self.CLIENT, "X-Tenant-ID": "acme"},
+        )
+        assert response.get_json() == {"active": False}
+
+    def test_cacheable_mode(self, client, user_data):
+        """Test gateways may cache results, never past the configured bound"""
+        tokens = self.login(client, user_data)
+        response = self.introspect(client, [tokens["access_token"]], cacheable=True)
+
+        assert response.headers["Cache-Control"] == "private, max-age=30"
+        assert "X-Tenant-ID" in response.headers["Vary"]
+
+    def test_batch_size_limit(self, app, client):
+        app.config["INTROSPECTION_MAX_TOKENS"] = 2
+        response = self.introspect(client, ["a", "b", "c"])
+        assert response.status_code == 400
+        assert self.introspect(client, []).status_code == 400
+
+
+class TestBatchGet:
+    """Test batch user lookups for internal services"""
+
+    CLIENT = TestIntrospection.CLIENT
+
+    def register_users(self, client, count, tenant=None):
+        """Helper to register users and return their IDs in order"""
+        from app.jwt_model import db, JWTUser
+
+        headers = {"X-Tenant-ID": tenant} if tenant else {}
+        for i in range(count):
+            user = {
+                "first_name": "Batch",
+                "last_name": f"User {i}",
+                "username": f"batchuser{i}",
+                "email": f"batchuser{i}@example.com",
+                "password": "StrongPass123!",
+            }
+            assert client.post("/api/jwt/register", json=user, headers=headers).status_code == 201
+        usernames = [f"batchuser{i}" for i in range(count)]
+        by_name = {
+            user.username: user.id
+            for user in db.session.query(JWTUser).filter(
+                JWTUser.tenant == (tenant or "default"), JWTUser.username.in_(usernames)
+            )
+        }
+        return [by_name[username] for username in usernames]
+
+    def batch_get(self, client, ids, **headers):
+        return client.post(
+            "/api/jwt/users:batchGet", json={"ids": ids}, headers={**self.CLIENT, **headers}
+        )
+
+    def test_requires_client_credentials(self, client):
+        response = client.post("/api/jwt/users:batchGet", json={"ids": ["x"]})
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"].startswith("Basic")
+
+    def test_results_in_order_with_missing(self, client):
+        """Test found users keep request order and unknown IDs are listed"""
+        ids = self.register_users(client, 3)
+        response = self.batch_get(client, [ids[2], "unknown", ids[0], ids[2]])
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [user["id"] for user in data["users"]] == [ids[2], ids[0]]
+        assert data["users"][1]["username"] == "batchuser0"
+        assert "password_hash" not in data["users"][0]
+        assert data["missing"] == ["unknown"]
+
+    def test_query_string_ids(self, client):
+        ids = self.register_users(client, 2)
+        response = client.get(
+            "/api/jwt/users:batchGet", query_string={"ids": ids}, headers=self.CLIENT
+        )
+        assert [user["id"] for user in response.get_json()["users"]] == ids
+
+    def test_cached_users_skip_the_database(self, app, client, monkeypatch):
+        """Test a warm identity cache answers without querying"""
+        from app.jwt_model import users
+
+        ids = self.register_users(client, 3)
+        self.batch_get(client, ids[:2])
+
+        loaded = []
+        get_many = users.get_many
+
+        def counting_get_many(user_ids, tenant):
+            loaded.append(list(user_ids))
+            return get_many(user_ids, tenant)
+
+        monkeypatch.setattr(users, "get_many", counting_get_many)
+        response = self.batch_get(client, ids)
+
+        assert len(response.get_json()["users"]) == 3
+        assert loaded == [[ids[2]]]
+
+    def test_large_batches_are_streamed(self, app, client):
+        """Test batches above USER_BATCH_CHUNK stream the same document"""
+        app.config["USER_BATCH_CHUNK"] = 2
+        ids = self.register_users(client, 5)
+        response = self.batch_get(client, ids + ["unknown"])
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        data = json.loads(response.get_data(as_text=True))
+        assert [user["id"] for user in data["users"]] == ids
+        assert data["missing"] == ["unknown"]
+
+    def test_batch_size_limit(self, app, client):
+        app.config["USER_BATCH_MAX_IDS"] = 2
+        assert self.batch_get(client, ["a", "b", "c"]).status_code == 400
+        assert self.batch_get(client, []).status_code == 400
+        assert self.batch_get(client, [1, 2]).status_code == 400
+
+    def test_users_of_other_tenants_are_missing(self, client):
+        ids = self.register_users(client, 1)
+        response = self.batch_get(client, ids, **{"X-Tenant-ID": "acme"})
+        assert response.get_json() == {"users": [], "missing": ids}
+
+
+class TestUserExport:
+    """Test the admin user export endpoint"""
+
+    ADMIN = {"Authorization": "Basic " + base64.b64encode(b"ops:ops-secret").decode()}
+
+    def export(self, client, fmt="csv", **headers):
+        return client.get(
+            "/api/jwt/admin/users:export",
+            query_string={"format": fmt},
+            headers={**self.ADMIN, **headers},
+        )
+
+    def test_requires_admin_credentials(self, client):
+        """Test service credentials are not enough"""
+        response = client.get("/api/jwt/admin/users:export")
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"] == 'Basic realm="admin"'
+        service = client.get("/api/jwt/admin/users:export", headers=TestIntrospection.CLIENT)
+        assert service.status_code == 401
+
+    def test_streams_csv_without_password_hashes(self, client, user_data):
+        import csv
+        import io
+
+        client.post("/api/jwt/register", json=user_data)
+        client.post("/api/jwt/register", json=user_data, headers={"X-Tenant-ID": "acme"})
+        response = self.export(client)
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.headers["Content-Disposition"] == "attachment; filename=jwt_users.csv"
+        records = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        assert [record["username"] for record in records] == [user_data["username"]]
+        assert "password_hash" not in records[0]
+
+    def test_jsonl(self, client, user_data):
+        client.post("/api/jwt/register", json=user_data)
+        response = self.export(client, "jsonl")
+        assert response.mimetype == "application/x-ndjson"
+        assert json.loads(response.get_data(as_text=True))["email"] == user_data["email"]
+
+    def test_unknown_format(self, client):
+        assert self.export(client, "parquet").status_code == 400
+
+    def test_every_shard_is_exported(self, tmp_path, monkeypatch):
+        from config import TestingConfig
+        from app import create_app
+
+        monkeypatch.setattr(
+            TestingConfig,
+            "SQLALCHEMY_SHARD_URIS",
+            [f"sqlite:///{tmp_path}/shard1.db", f"sqlite:///{tmp_path}/shard2.db"],
+        )
+        app = create_app(config="testing")
+        client = app.test_client()
+        for i in range(8):
+            user = {
+                "first_name": "Shard",
+                "last_name": f"User {i}",
+                "username": f"sharduser{i}",
+                "email": f"sharduser{i}@example.com",
+                "password": "StrongPass123!",
+            }
+            assert client.post("/api/jwt/register", json=user).status_code == 201
+
+        response = self.export(client, "columnar")
+        header, *groups = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        usernames = [name for group in groups for name in group["columns"]["username"]]
+        assert sorted(usernames) == [f"sharduser{i}" for i in range(8)]
+
+
+class TestUserListing:
+    """Test the keyset-paginated admin user listing"""
+
+    ADMIN = TestUserExport.ADMIN
+
+    def register_users(self, client, names, **headers):
+        for name in names:
+            user = {
+                "first_name": "List",
+                "last_name": name.title(),
+                "username": name,
+                "email": f"{name}@example.com",
+                "password": "StrongPass123!",
+            }
+            assert client.post("/api/jwt/register", json=user, headers=headers).status_code == 201
+
+    def list_users(self, client, **params):
+        return client.get("/api/jwt/admin/users", query_string=params, headers=self.ADMIN)
+
+    def walk(self, client, **params):
+        """Usernames of every page, following next_cursor"""
+        names, cursor = [], None
+        while True:
+            data = self.list_users(client, **params, **({"cursor": cursor} if cursor else {})).get_json()
+            names.append([user["username"] for user in data["users"]])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return names
+
+    def test_requires_admin_credentials(self, client):
+        assert client.get("/api/jwt/admin/users").status_code == 401
+
+    def test_pages_follow_the_cursor(self, client):
+        self.register_users(client, ["dave", "alice", "erin", "bob", "carol"])
+        assert self.walk(client, limit=2) == [["alice", "bob"], ["carol", "dave"], ["erin"]]
+
+        data = self.list_users(client, limit=1).get_json()
+        assert "password_hash" not in data["users"][0]
+        assert data["users"][0]["email"] == "alice@example.com"
+
+    def test_prefix_search(self, client):
+        self.register_users(client, ["alfred", "alice", "bob"])
+        self.register_users(client, ["alina"], **{"X-Tenant-ID": "acme"})
+        assert self.walk(client, prefix="al", limit=1) == [["alfred"], ["alice"]]
+        assert self.walk(client, sort="email", prefix="bob@") == [["bob"]]
+
+    def test_substring_search_is_opt_in(self, app, client):
+        self.register_users(client, ["alfred", "malice"])
+        assert self.list_users(client, q="lic").status_code == 400
+
+        app.config["USER_SEARCH_CONTAINS"] = True
+        assert self.walk(client, q="LIC") == [["malice"]]
+
+    def test_invalid_parameters(self, client):
+        self.register_users(client, ["alice", "bob"])
+        cursor = self.list_users(client, limit=1).get_json()["next_cursor"]
+
+        assert self.list_users(client, sort="first_name").status_code == 400
+        assert self.list_users(client, limit=0).status_code == 400
+        assert self.list_users(client, limit="many").status_code == 400
+        assert self.list_users(client, cursor="garbage").status_code == 400
+        # A cursor only continues the ordering it came from
+        assert self.list_users(client, sort="email", cursor=cursor).status_code == 400
+
+    def test_pages_merge_shards(self, tmp_path, monkeypatch):
+        from config import TestingConfig
+        from app import create_app
+
+        monkeypatch.setattr(
+            TestingConfig,
+            "SQLALCHEMY_SHARD_URIS",
+            [f"sqlite:///{tmp_path}/shard1.db", f"sqlite:///{tmp_path}/shard2.db"],
+        )
+        app = create_app(config="testing")
+        client = app.test_client()
+        names = [f"user{i}" for i in range(9)]
+        self.register_users(client, reversed(names))
+
+        assert self.walk(client, limit=4) == [names[:4], names[4:8], names[8:]]
+
+
+class TestRateLimit:
+    """Test throttling of login and registration"""
+
+    def test_login_identifier_limit(self, app, client, user_data):
+        """Test repeated attempts against one identifier are rejected with 429"""
+        app.config["RATELIMIT_RULES"] = {"login": {"identifier": (3, 60)}}
+        client.post("/api/jwt/register", json=user_data)
+        login_data = {"identifier": user_data["email"], "password": "wrongpassword"}
+
+        for _ in range(3):
+            response = client.post("/api/jwt/login", json=login_data)
+            assert response.status_code == 401
+
+        response = client.post("/api/jwt/login", json=login_data)
+        assert response.status_code == 429
+        assert "Too many requests" in response.get_json()["error"]
+        assert int(response.headers["Retry-After"]) > 0
+
+    def test_identifier_limit_is_case_insensitive(self, app, client, user_data):
+        """Test changing the identifier's case does not reset the counter"""
+        app.config["RATELIMIT_RULES"] = {"login": {"identifier": (1, 60)}}
+        login_data = {"identifier": "Fake@Example.com", "password": "password123"}
+        client.post("/api/jwt/login", json=login_data)
+
+        login_data["identifier"] = "fake@example.com"
+        response = client.post("/api/jwt/login", json=login_data)
+        assert response.status_code == 429
+
+    def test_login_ip_limit(self, app, client):
+        """Test one IP cannot spray many identifiers"""
+        app.config["RATELIMIT_RULES"] = {"login": {"ip": (2, 60)}}
+        for i in range(2):
+            login_data = {"identifier": f"user{i}@example.com", "password": "x"}
+            assert client.post("/api/jwt/login", json=login_data).status_code == 401
+
+        login_data = {"identifier": "another@example.com", "password": "x"}
+        assert client.post("/api/jwt/login", json=login_data).status_code == 429
+
+    def test_register_ip_limit(self, app, client, user_data):
+        """Test registration is throttled per IP"""
+        app.config["RATELIMIT_RULES"] = {"register": {"ip": (1, 60)}}
+        assert client.post("/api/jwt/register", json=user_data).status_code == 201
+        assert client.post("/api/jwt/register", json=user_data).status_code == 429
+
+    def test_rate_limit_disabled(self, app, client):
+        """Test limits are ignored when disabled"""
+        app.config["RATELIMIT_ENABLED"] = False
+        app.config["RATELIMIT_RULES"] = {"login": {"ip": (1, 60)}}
+        login_data = {"identifier": "fake@example.com", "password": "password123"}
+        for _ in range(3):
+            assert client.post("/api/jwt/login", json=login_data).status_code == 401
+
+    def test_redis_backend(self, app):
+        """Test the Lua sliding window shares counters through Redis"""
+        from auth_core.rate_limit import RedisBackend
+
+        backend = RedisBackend(app.config["REDIS_URL"])
+        backend.reset()
+        rules = [("rl:test:ip:abc:60", 2, 60), ("rl:test:id:def:60", 5, 60)]
+
+        assert backend.hit(rules) == (True, 0)
+        assert backend.hit(rules)[0] is True
+        allowed, retry_after = backend.hit(rules)
+        assert allowed is False
+        assert 0 < retry_after <= 60
+        backend.reset()
+
+
+class TestProductionServer:
+    """Test the Gunicorn launcher configuration"""
+
+    def test_server_options(self, app):
+        """Test workers are preloaded, threaded and recycled with jitter"""
+        from auth_core.server import ProductionServer
+
+        server = ProductionServer(
+            app, {"bind": "127.0.0.1:0", "workers": 3, "threads": 4, "max_requests": 1000}
+        )
+
+        assert server.load() is app
+        assert server.cfg.preload_app is True
+        assert server.cfg.workers == 3
+        assert server.cfg.threads == 4
+        assert server.cfg.worker_class_str == "gthread"
+        assert server.cfg.max_requests == 1000
+
+
+class TestMetrics:
+    """Test the Prometheus metrics endpoint"""
+
+    def test_metrics_endpoint(self, client):
+        """Test /metrics exposes the Prometheus text format"""
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.content_type.startswith("text/plain")
+        assert b"auth_requests_in_flight" in response.data
+
+    def test_route_latency_and_status(self, client, user_data):
+        """Test requests are recorded per route and status code"""
+        client.post("/api/jwt/register", json=user_data)
+        client.post("/api/jwt/login", json={"identifier": "nobody", "password": "x"})
+
+        body = client.get("/metrics").get_data(as_text=True)
+        assert 'auth_request_duration_seconds_count{endpoint="jwt_auth.register",method="POST"}' in body
+        assert 'endpoint="jwt_auth.login",method="POST",status="401"' in body
+
+    def test_dependency_breakdown(self, client, user_data):
+        """Test login time is split into hashing and database time"""
+        client.post("/api/jwt/register", json=user_data)
+        login_data = {"identifier": user_data["email"], "password": user_data["password"]}
+        client.post("/api/jwt/login", json=login_data)
+
+        body = client.get("/metrics").get_data(as_text=True)
+        assert 'auth_dependency_duration_seconds_count{dependency="hash",endpoint="jwt_auth.login"}' in body
+        assert 'auth_dependency_duration_seconds_count{dependency="db",endpoint="jwt_auth.login"}' in body
+
+    def test_failed_query_start_is_discarded(self, app):
+        """Test a statement that raises leaves no start time on its pooled connection"""
+        from sqlalchemy import text
+        from sqlalchemy.exc import OperationalError
+        from app.jwt_model import db
+
+        with db.engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM no_such_table"))
+            connection.execute(text("SELECT 1"))
+            assert connection.info["query_start"] == []
+
+    def test_in_flight_returns_to_zero(self, client):
+        """Test the in-flight gauge is decremented after each request"""
+        client.get("/health")
+        body = client.get("/metrics").get_data(as_text=True)
+        assert "auth_requests_in_flight 0.0" in body
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
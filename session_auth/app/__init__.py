@@ -1,10 +1,27 @@
+import os
+import sys
+
+# The shared auth_core package lives at the repository root
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from app.session_api import login_manager, bp_session
 from app.session_model import db
+from app.compact_session import compact_sessions
+from auth_core.rate_limit import limiter
+from auth_core.metrics import metrics
+from auth_core.tenancy import tenancy
+from auth_core.replicas import replicas
+from auth_core.audit import audit
+from auth_core.lockout import lockout
+from auth_core.hashing import passwords
+from auth_core.clients import admin_clients
+from auth_core.export import user_export
+from auth_core.listing import user_listing
 from config import DevelopmentConfig, TestingConfig, ProductionConfig
-import os
 
 migrate = Migrate()
 
@@ -22,7 +39,18 @@ def create_app(config=None):
     config_class = config_map.get(config_name.lower(), DevelopmentConfig)
     app.config.from_object(config_class)
 
+    tenancy.init_app(app)
+    compact_sessions.init_app(app)
+    replicas.init_app(app)
     db.init_app(app)
+    limiter.init_app(app)
+    lockout.init_app(app)
+    passwords.init_app(app)
+    admin_clients.init_app(app)
+    user_export.init_app(app)
+    user_listing.init_app(app)
+    metrics.init_app(app)
+    audit.init_app(app, engine=lambda: db.engine)
     login_manager.init_app(app)
     login_manager.login_view = "session_auth.login"
     login_manager.login_message = "Please log in to access this page."
@@ -0,0 +1,256 @@
+from base64 import urlsafe_b64encode
+from datetime import datetime, timedelta, timezone
+from flask import current_app, request, session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession
+from flask_login import LoginManager
+from flask_login.config import (
+    COOKIE_DURATION,
+    COOKIE_HTTPONLY,
+    COOKIE_NAME,
+    COOKIE_SAMESITE,
+    COOKIE_SECURE,
+)
+from flask_login.signals import user_loaded_from_cookie
+from flask_login.utils import _create_identifier, _get_remote_addr, decode_cookie
+from functools import wraps
+from itsdangerous import BadSignature
+from itsdangerous.signer import HMACAlgorithm
+from auth_core.tenancy import TenantSessionInterface
+import hashlib
+import hmac
+
+# Flask-Login's session keys and their short aliases in the cookie. Anything
+# else the app stores in the session is kept under its own name.
+KEY_ALIASES = {
+    "_user_id": "_u",
+    "_fresh": "_f",
+    "_id": "_i",
+    "_remember": "_r",
+    "_remember_seconds": "_s",
+    "_permanent": "_p",
+}
+KEY_NAMES = {alias: key for key, alias in KEY_ALIASES.items()}
+
+# Bytes of HMAC-SHA256 kept in signatures (128 bits, 22 base64 characters)
+SIGNATURE_BYTES = 16
+
+
+class TruncatedHMACAlgorithm(HMACAlgorithm):
+    """HMAC-SHA256 truncated to SIGNATURE_BYTES"""
+
+    default_digest_method = staticmethod(hashlib.sha256)
+
+    def get_signature(self, key, value):
+        return super().get_signature(key, value)[:SIGNATURE_BYTES]
+
+
+class CompactJSONSerializer:
+    """Flask's tagged JSON with Flask-Login's keys shortened"""
+
+    def __init__(self):
+        self.tagged = TaggedJSONSerializer()
+
+    def dumps(self, value):
+        return self.tagged.dumps({KEY_ALIASES.get(k, k): v for k, v in value.items()})
+
+    def loads(self, value):
+        return {KEY_NAMES.get(k, k): v for k, v in self.tagged.loads(value).items()}
+
+
+def compact_identifier():
+    """Session protection identifier: 72 bits of the hash Flask-Login uses (not 512)"""
+    if not current_app.config.get("SESSION_COOKIE_COMPACT", True):
+        return _create_identifier()
+    user_agent = request.headers.get("User-Agent")
+    base = f"{_get_remote_addr()}|{user_agent}"
+    return hashlib.blake2b(base.encode(), digest_size=9).hexdigest()
+
+
+def _loading(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.load()
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class LazySecureCookieSession(SecureCookieSession):
+    """Session whose cookie is only verified and decoded when it is first used
+
+    Requests that never touch the session (health checks, metrics, public
+    endpoints) skip the HMAC verification and JSON parsing entirely.
+    """
+
+    def __init__(self, initial=None, loader=None):
+        super().__init__(initial)
+        self.loader = loader
+
+    @property
+    def loaded(self):
+        return self.loader is None
+
+    def load(self):
+        if self.loader is not None:
+            loader, self.loader = self.loader, None
+            data, outdated = loader()
+            # Fill in the stored data without marking the session as modified
+            dict.update(self, data)
+            if outdated:
+                self.modified = True
+
+    __getitem__ = _loading(SecureCookieSession.__getitem__)
+    __setitem__ = _loading(SecureCookieSession.__setitem__)
+    __delitem__ = _loading(SecureCookieSession.__delitem__)
+    __contains__ = _loading(SecureCookieSession.__contains__)
+    __iter__ = _loading(SecureCookieSession.__iter__)
+    __len__ = _loading(SecureCookieSession.__len__)
+    __eq__ = _loading(SecureCookieSession.__eq__)
+    __repr__ = _loading(SecureCookieSession.__repr__)
+    get = _loading(SecureCookieSession.get)
+    keys = _loading(SecureCookieSession.keys)
+    values = _loading(SecureCookieSession.values)
+    items = _loading(SecureCookieSession.items)
+    copy = _loading(SecureCookieSession.copy)
+    setdefault = _loading(SecureCookieSession.setdefault)
+    pop = _loading(SecureCookieSession.pop)
+    popitem = _loading(SecureCookieSession.popitem)
+    update = _loading(SecureCookieSession.update)
+    clear = _loading(SecureCookieSession.clear)
+
+
+class CompactSessionInterface(TenantSessionInterface):
+    """Tenant-salted session cookies with short keys and signatures, opened lazily
+
+    Cookies in the previous (TenantSessionInterface) format are still accepted
+    and rewritten in the compact format the first time they are used.
+    """
+
+    session_class = LazySecureCookieSession
+    serializer = CompactJSONSerializer()
+    digest_method = staticmethod(hashlib.sha256)
+
+    def __init__(self):
+        self.legacy = TenantSessionInterface()
+
+    def get_signing_serializer(self, app):
+        serializer = super().get_signing_serializer(app)
+        if serializer is not None:
+            serializer.signer_kwargs["algorithm"] = TruncatedHMACAlgorithm()
+        return serializer
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return self.session_class()
+
+        max_age = int(app.permanent_session_lifetime.total_seconds())
+
+        def load():
+            try:
+                return self.get_signing_serializer(app).loads(cookie, max_age=max_age), False
+            except BadSignature:
+                pass
+            try:
+                legacy = self.legacy.get_signing_serializer(app)
+                return legacy.loads(cookie, max_age=max_age), True
+            except BadSignature:
+                return {}, False
+
+        return self.session_class(loader=load)
+
+    def save_session(self, app, session, response):
+        # Nothing read or changed it, so the cookie the client has is still current
+        if not session.loaded:
+            return
+        super().save_session(app, session, response)
+
+
+def _remember_digest(user_id):
+    key = current_app.config["SECRET_KEY"].encode()
+    mac = hmac.new(key, f"remember:{user_id}".encode(), hashlib.sha256).digest()
+    return urlsafe_b64encode(mac[:SIGNATURE_BYTES]).rstrip(b"=").decode()
+
+
+def encode_remember_cookie(user_id):
+    """``<user id>.<22-character signature>`` instead of a 128-character hex digest"""
+    return f"{user_id}.{_remember_digest(user_id)}"
+
+
+def decode_remember_cookie(cookie):
+    user_id, _, digest = cookie.rpartition(".")
+    if user_id and hmac.compare_digest(digest, _remember_digest(user_id)):
+        return user_id
+    return None
+
+
+class CompactLoginManager(LoginManager):
+    """LoginManager with short session identifiers and remember cookies
+
+    Follows SESSION_COOKIE_COMPACT; remember cookies in Flask-Login's own format
+    are accepted either way. The remember cookie bookkeeping after each request
+    is skipped when the view never opened the session, so it does not force the
+    cookie to be verified.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session_identifier_generator = compact_identifier
+
+    def _update_remember_cookie(self, response):
+        lazy = getattr(session, "loaded", True) is False
+        if lazy and not current_app.config.get("REMEMBER_COOKIE_REFRESH_EACH_REQUEST"):
+            return response
+        return super()._update_remember_cookie(response)
+
+    def _load_user_from_remember_cookie(self, cookie):
+        user_id = decode_remember_cookie(cookie) or decode_cookie(cookie)
+        if user_id is None:
+            return None
+        session["_user_id"] = user_id
+        session["_fresh"] = False
+        user = self._user_callback(user_id) if self._user_callback else None
+        if user is not None:
+            user_loaded_from_cookie.send(current_app._get_current_object(), user=user)
+        return user
+
+    def _set_cookie(self, response):
+        config = current_app.config
+        if not config.get("SESSION_COOKIE_COMPACT", True):
+            return super()._set_cookie(response)
+
+        if "_remember_seconds" in session:
+            duration = timedelta(seconds=session["_remember_seconds"])
+        else:
+            duration = config.get("REMEMBER_COOKIE_DURATION", COOKIE_DURATION)
+        if isinstance(duration, int):
+            duration = timedelta(seconds=duration)
+
+        response.set_cookie(
+            config.get("REMEMBER_COOKIE_NAME", COOKIE_NAME),
+            value=encode_remember_cookie(str(session["_user_id"])),
+            expires=datetime.now(timezone.utc) + duration,
+            domain=config.get("REMEMBER_COOKIE_DOMAIN"),
+            path=config.get("REMEMBER_COOKIE_PATH", "/"),
+            secure=config.get("REMEMBER_COOKIE_SECURE", COOKIE_SECURE),
+            httponly=config.get("REMEMBER_COOKIE_HTTPONLY", COOKIE_HTTPONLY),
+            samesite=config.get("REMEMBER_COOKIE_SAMESITE", COOKIE_SAMESITE),
+        )
+
+
+class CompactSessions:
+    """Installs CompactSessionInterface (SESSION_COOKIE_COMPACT = False keeps the old format)
+
+    Must be initialized after Tenancy, whose session interface it extends.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("SESSION_COOKIE_COMPACT", True)
+        if app.config["SESSION_COOKIE_COMPACT"]:
+            app.session_interface = CompactSessionInterface()
+
+
+compact_sessions = CompactSessions()
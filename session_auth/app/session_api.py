@@ -1,24 +1,34 @@
 from flask import Flask, Blueprint, jsonify, request
 from flask_login import (
-    LoginManager,
     login_required,
     current_user,
     login_user,
     logout_user,
 )
-from app.session_model import db, SessionUser, is_valid_email
-from sqlalchemy import or_
+from app.session_model import db, SessionUser, users
+from app.compact_session import CompactLoginManager
+from auth_core.rate_limit import limiter
+from auth_core.tenancy import current_tenant
+from auth_core.replicas import replicas
+from auth_core.audit import audit
+from auth_core.lockout import lockout, locked_response
+from auth_core.hashing import passwords
+from auth_core.validation import is_valid_email
+from auth_core.clients import admin_clients
+from auth_core.export import user_export
+from auth_core.listing import user_listing
 
 bp_session = Blueprint("session_auth", __name__)
-login_manager = LoginManager()
+login_manager = CompactLoginManager()
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    return SessionUser.query.get(user_id)
+    return users.get(user_id, current_tenant())
 
 
 @bp_session.route("/register", methods=["POST"])
+@limiter.limit("register")
 def register():
     # Validate JSON request
     if not request.is_json:
@@ -47,14 +57,17 @@ def register():
     if not is_valid:
         return jsonify({"error": message}), 400
 
-    # Check for duplicates
-    if SessionUser.query.filter_by(username=user_info["username"]).first():
+    # Check for duplicates within the tenant
+    tenant = current_tenant()
+    taken = users.taken(tenant, user_info["username"], user_info["email"])
+    if taken == "username":
         return jsonify({"error": "Username already exists"}), 409
-    if SessionUser.query.filter_by(email=user_info["email"]).first():
+    if taken == "email":
         return jsonify({"error": "Email already exists"}), 409
 
     try:
         new_user = SessionUser(
+            tenant=tenant,
             first_name=user_info["first_name"],
             last_name=user_info["last_name"],
             username=user_info["username"],
@@ -62,8 +75,9 @@ def register():
             password_hash=SessionUser.set_password(user_info["password"]),
         )
 
-        db.session.add(new_user)
+        users.add(new_user)
         db.session.commit()
+        audit.record("register", user_id=new_user.id)
         return jsonify({"message": "New user created successfully"}), 201
 
     except Exception as e:
@@ -72,6 +86,8 @@ def register():
 
 
 @bp_session.route("/login", methods=["POST"])
+@limiter.limit("login", identifier_field="identifier")
+@replicas.read_only
 def login():
     # Validate JSON request
     if not request.is_json:
@@ -88,31 +104,42 @@ def login():
     if not identifier or not password:
         return jsonify({"error": "identifier and password are required"}), 400
 
-    existing_user = SessionUser.query.filter(
-        or_(
-            SessionUser.username == identifier,
-            SessionUser.email == identifier,
-        )
-    ).first()
+    # Refuse locked-out identifiers and IPs before any lookup or hash
+    retry_after = lockout.check(identifier)
+    if retry_after:
+        audit.record("login_locked", identifier=identifier)
+        return locked_response(retry_after)
+
+    existing_user = users.find(current_tenant(), identifier)
 
     if not existing_user:
-        return jsonify({"error": "Invalid username or email"}), 401
+        # Answer no sooner than a wrong password would be
+        passwords.pad_unknown_user()
+        lockout.failed(identifier)
+        audit.record("login_failed", identifier=identifier, reason="unknown_user")
+        return jsonify({"error": "Invalid credentials"}), 401
 
     if not SessionUser.check_password(existing_user.password_hash, password):
+        lockout.failed(identifier)
+        audit.record("login_failed", user_id=existing_user.id, reason="bad_password")
         return jsonify({"error": "Invalid credentials"}), 401
 
+    lockout.succeeded(identifier)
     login_user(existing_user, remember=remember)
+    audit.record("login", user_id=existing_user.id, remember=bool(remember))
     return jsonify({"message": f"User {identifier} logged in successfully"}), 200
 
 
 @bp_session.route("/logout", methods=["POST"])
 @login_required
 def logout():
+    audit.record("logout", user_id=current_user.id)
     logout_user()
     return jsonify({"message": "Logged out user successfully"}), 200
 
 
 @bp_session.route("/profile", methods=["GET"])
+@replicas.read_only
 @login_required
 def get_profile():
     authenticated_user = current_user
@@ -131,3 +158,19 @@ def get_profile():
         ),
         200,
     )
+
+
+@bp_session.route("/admin/users:export", methods=["GET"])
+@admin_clients.required
+@replicas.read_only
+def export_users():
+    """Stream every user of the tenant (without password hashes) for analytics"""
+    return user_export.response(users)
+
+
+@bp_session.route("/admin/users", methods=["GET"])
+@admin_clients.required
+@replicas.read_only
+def list_users():
+    """Browse and search the tenant's users, a keyset-paginated page at a time"""
+    return user_listing.response(users)
@@ -1,12 +1,13 @@
 import os
 from datetime import timedelta
+from auth_core.config import CoreConfig, env_list
 
 
-class BaseConfig:
-    """Base configuration with common settings"""
+class BaseConfig(CoreConfig):
+    """Base configuration with common settings (shared ones in CoreConfig)"""
 
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_RECORD_QUERIES = True
+    # Session cookies are signed per tenant so they cannot be replayed across products
+    TENANT_SESSION_COOKIES = True
 
 
 class DevelopmentConfig(BaseConfig):
@@ -15,7 +16,9 @@ class DevelopmentConfig(BaseConfig):
     DEBUG = True
     TESTING = False
     SQLALCHEMY_DATABASE_URI = os.getenv("DEV_DATABASE_URI", "sqlite:///development.db")
+    SQLALCHEMY_REPLICA_URIS = env_list("DEV_DATABASE_REPLICA_URIS")
     SECRET_KEY = os.getenv("DEV_SECRET_KEY", "dev-secret-change-in-production")
+    RATELIMIT_STORAGE_URL = os.getenv("DEV_RATELIMIT_STORAGE_URL", "memory://")
 
 
 class ProductionConfig(BaseConfig):
@@ -24,7 +27,11 @@ class ProductionConfig(BaseConfig):
     DEBUG = False
     TESTING = False
     SQLALCHEMY_DATABASE_URI = os.getenv("PROD_DATABASE_URI", "sqlite:///production.db")
+    # Comma-separated read replicas of PROD_DATABASE_URI for read-only endpoints
+    SQLALCHEMY_REPLICA_URIS = env_list("PROD_DATABASE_REPLICA_URIS")
     SECRET_KEY = os.getenv("PROD_SECRET_KEY")
+    # Use a redis:// URL so counters are shared by all workers
+    RATELIMIT_STORAGE_URL = os.getenv("PROD_RATELIMIT_STORAGE_URL", "memory://")
 
     # Validation for production
     def __init__(self):
@@ -39,4 +46,9 @@ class TestingConfig(BaseConfig):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     SECRET_KEY = "test-jwt-secret-key-123"
+    TENANTS = ["default", "acme", "globex"]
+    RATELIMIT_STORAGE_URL = "memory://"
+    AUDIT_ENABLED = False
+    LOGIN_TIMING_PADDING = False
+    ADMIN_CLIENTS = {"ops": "ops-secret"}
     WTF_CSRF_ENABLED = False
@@ -0,0 +1,48 @@
+"""Add tenant to users
+
+Revision ID: e6823bdd2674
+Revises: 5f0e003730fa
+Create Date: 2026-10-19 10:31:05.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6823bdd2674'
+down_revision = '5f0e003730fa'
+branch_labels = None
+depends_on = None
+
+# The initial migration left its unique constraints unnamed; SQLite batch mode
+# reflects them under this convention, other databases report their own names
+naming_convention = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def single_column_uniques(table):
+    inspector = sa.inspect(op.get_bind())
+    return {
+        constraint["column_names"][0]: constraint["name"]
+        for constraint in inspector.get_unique_constraints(table)
+        if len(constraint["column_names"]) == 1 and constraint["name"]
+    }
+
+
+def upgrade():
+    existing = single_column_uniques('session_users')
+    with op.batch_alter_table('session_users', naming_convention=naming_convention) as batch_op:
+        batch_op.add_column(sa.Column('tenant', sa.String(), server_default='default', nullable=False))
+        for column in ('username', 'email'):
+            batch_op.drop_constraint(existing.get(column, f'uq_session_users_{column}'), type_='unique')
+        batch_op.create_unique_constraint('uq_session_users_tenant_username', ['tenant', 'username'])
+        batch_op.create_unique_constraint('uq_session_users_tenant_email', ['tenant', 'email'])
+
+
+def downgrade():
+    with op.batch_alter_table('session_users', naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('uq_session_users_tenant_email', type_='unique')
+        batch_op.drop_constraint('uq_session_users_tenant_username', type_='unique')
+        batch_op.create_unique_constraint('uq_session_users_username', ['username'])
+        batch_op.create_unique_constraint('uq_session_users_email', ['email'])
+        batch_op.drop_column('tenant')
@@ -1,4 +1,5 @@
 import os
+import sys
 import click
 from flask.cli import with_appcontext
 from flask_migrate import init, migrate, upgrade, downgrade
@@ -96,6 +97,165 @@ def show_db_info():
         click.echo(f"❌ Database connection failed: {e}")
 
 
+@click.command()
+@click.option("--count", "-n", default=1000, help="Number of users in the pool")
+@click.option("--prefix", default="loadtest", help="Username prefix of pool users")
+@click.option("--password", default="LoadTest123!", help="Password shared by pool users")
+@click.option(
+    "--hash-method",
+    default="pbkdf2:sha256:1",
+    help="Werkzeug hash method (the fast default keeps logins cheap; use scrypt to match production)",
+)
+@click.option("--batch-size", default=5000, help="Rows per INSERT statement")
+@click.option("--tenant", default="default", help="Tenant the pool users belong to")
+@with_appcontext
+def seed_users(count, prefix, password, hash_method, batch_size, tenant):
+    """Bulk-create a pool of load-test users (skips users that already exist)."""
+    from sqlalchemy import insert, select
+    from werkzeug.security import generate_password_hash
+    from app.session_model import SessionUser
+    from auth_core.validation import generate_uuid
+
+    existing = set(
+        db.session.scalars(
+            select(SessionUser.username).where(
+                SessionUser.tenant == tenant, SessionUser.username.like(f"{prefix}%")
+            )
+        )
+    )
+
+    # All pool users share one password, so it only needs hashing once
+    password_hash = generate_password_hash(password, method=hash_method)
+    rows = [
+        {
+            "id": generate_uuid(),
+            "tenant": tenant,
+            "first_name": "Load",
+            "last_name": f"Test {i}",
+            "username": f"{prefix}{i:06d}",
+            "email": f"{prefix}{i:06d}@loadtest.local",
+            "password_hash": password_hash,
+        }
+        for i in range(count)
+        if f"{prefix}{i:06d}" not in existing
+    ]
+
+    try:
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(insert(SessionUser), rows[start : start + batch_size])
+        db.session.commit()
+        click.echo(f"✅ Seeded {len(rows)} users ({count - len(rows)} already existed).")
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"❌ Error seeding users: {e}")
+
+
+@click.command()
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(["csv", "jsonl", "columnar"]),
+    default="csv",
+    help="Output format (columnar: one JSON row group per chunk)",
+)
+@click.option("--tenant", default="default", help="Tenant whose users are exported")
+@click.option("--output", "-o", type=click.File("w"), default="-", help="Output file (default: stdout)")
+@click.option("--chunk-size", default=None, type=int, help="Rows fetched and written at a time")
+@with_appcontext
+def export_users(fmt, tenant, output, chunk_size):
+    """Stream the users table to a file for analytics (without password hashes)."""
+    from auth_core.export import user_export
+    from app.session_model import users
+
+    try:
+        rows, elapsed = user_export.write(users, tenant, fmt, output, chunk_size=chunk_size)
+    except Exception as e:
+        click.echo(f"❌ Error exporting users: {e}", err=True)
+        return
+
+    click.echo(
+        f"✅ Exported {rows} users in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f}/s).",
+        err=True,
+    )
+
+
+@click.command()
+@with_appcontext
+def create_search_indexes():
+    """Create trigram indexes for substring user search (PostgreSQL only)."""
+    from app.session_model import SessionUser
+    from auth_core.listing import create_trigram_indexes
+
+    try:
+        created = create_trigram_indexes(db.engine, SessionUser.__table__)
+    except Exception as e:
+        click.echo(f"❌ Error creating search indexes: {e}")
+        return
+
+    if created:
+        click.echo("✅ Created trigram indexes; set USER_SEARCH_CONTAINS=true to enable ?q= search.")
+    else:
+        click.echo("❌ Trigram indexes need PostgreSQL; nothing created.")
+
+
+@click.command()
+@click.option("--host", default="0.0.0.0", help="Interface to bind")
+@click.option(
+    "--port",
+    default=lambda: int(os.getenv("PORT", 8000)),
+    type=int,
+    help="Port to bind",
+)
+@click.option(
+    "--workers",
+    "-w",
+    default=lambda: int(os.getenv("WEB_CONCURRENCY", 0)) or None,
+    type=int,
+    help="Worker processes (default: 2 x CPUs + 1)",
+)
+@click.option(
+    "--threads",
+    "-t",
+    default=lambda: int(os.getenv("WEB_THREADS", 4)),
+    type=int,
+    help="Threads per worker",
+)
+@click.option(
+    "--timeout", default=30, type=int, help="Seconds before a silent worker is restarted"
+)
+@click.option(
+    "--graceful-timeout",
+    default=30,
+    type=int,
+    help="Seconds to finish in-flight requests on reload/stop",
+)
+@click.option(
+    "--max-requests",
+    default=10000,
+    type=int,
+    help="Requests before a worker is recycled (0 disables)",
+)
+@click.option("--pidfile", default=None, help="Write the master PID here (for kill -HUP)")
+def serve(
+    host, port, workers, threads, timeout, graceful_timeout, max_requests, pidfile
+):
+    """Run the app with the production Gunicorn server."""
+    from auth_core.server import serve as run_server, default_workers
+
+    workers = workers or default_workers()
+    click.echo(f"🚀 Serving on {host}:{port} with {workers} workers x {threads} threads")
+    run_server(
+        app,
+        bind=f"{host}:{port}",
+        workers=workers,
+        threads=threads,
+        timeout=timeout,
+        graceful_timeout=graceful_timeout,
+        max_requests=max_requests,
+        pidfile=pidfile,
+    )
+
+
 # Register CLI commands
 app.cli.add_command(init_db)
 app.cli.add_command(migrate_db)
@@ -103,9 +263,17 @@ app.cli.add_command(upgrade_db)
 app.cli.add_command(downgrade_db)
 app.cli.add_command(reset_db)
 app.cli.add_command(show_db_info)
+app.cli.add_command(seed_users)
+app.cli.add_command(export_users)
+app.cli.add_command(create_search_indexes)
+app.cli.add_command(serve)
 
 
 if __name__ == "__main__":
+    # python3 run.py serve [options] starts the production server
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve(sys.argv[2:])
+
     env = os.getenv("FLASK_ENV", "development")
 
     click.echo(f"🚀 Starting Flask app in {env} mode...")
@@ -115,4 +283,4 @@ if __name__ == "__main__":
     elif env == "testing":
         app.run(debug=False, host="127.0.0.1", port=5001)
     else:  # production
-        app.run(debug=False, host="0.0.0.0", port=int(os.getenv("PORT", 8000)))
+        serve([])
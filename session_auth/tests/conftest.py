@@ -2,8 +2,10 @@ import pytest
 import sys
 import os
 
-# Add the parent directory to Python path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add the app directory and the repository root (for auth_core) to Python path
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(APP_DIR))
+sys.path.insert(0, APP_DIR)
 
 from app import create_app
 from app.session_model import db, SessionUser
@@ -1,6 +1,22 @@
+import os
 import random
 import string
-from locust import HttpUser, task, between
+from itertools import count
+from locust import HttpUser, task, constant_throughput
+
+# The benchmark harness sets LOCUST_SEED so runs generate the same user data
+if os.getenv("LOCUST_SEED"):
+    random.seed(int(os.getenv("LOCUST_SEED")))
+
+# Pre-seeded users created with `flask --app run seed-users` (must match its options)
+USER_POOL_SIZE = int(os.getenv("LOCUST_USER_POOL_SIZE", 1000))
+USER_PREFIX = os.getenv("LOCUST_USER_PREFIX", "loadtest")
+USER_PASSWORD = os.getenv("LOCUST_USER_PASSWORD", "LoadTest123!")
+
+# Tasks per second for each simulated user: total arrival rate = users x this rate
+TASKS_PER_SECOND = float(os.getenv("LOCUST_TASKS_PER_SECOND", 0.5))
+
+_next_pool_index = count()
 
 
 def generate_unique_user_data():
@@ -15,67 +31,57 @@ def generate_unique_user_data():
     }
 
 
-class SessionAuthUser(HttpUser):
-    """Test session-based authentication performance"""
+def pool_credentials(environment):
+    """Credentials of the next pool user, interleaved across distributed workers"""
+    worker_index = max(getattr(environment.runner, "worker_index", 0), 0)
+    worker_count = int(os.getenv("LOCUST_WORKER_COUNT", 1))
+    index = (next(_next_pool_index) * worker_count + worker_index) % USER_POOL_SIZE
+    username = f"{USER_PREFIX}{index:06d}"
+    return {"identifier": f"{username}@loadtest.local", "password": USER_PASSWORD}
 
-    wait_time = between(1, 3)  # Wait 1-3 seconds between requests
 
-    def on_start(self):
-        """Called when a user starts - registers and logs in"""
-        self.user_data = generate_unique_user_data()
-        self.register_user()
-        self.login_user()
+class PooledSessionUser(HttpUser):
+    """Simulated client logged in as a pre-seeded user (no registration hashing)"""
 
-    def register_user(self):
-        """Register a new user"""
-        with self.client.post(
-            "/api/session/register",
-            json=self.user_data,
-            name="Session Register",
-            catch_response=True,
-        ) as response:
-            if response.status_code == 201:
-                response.success()
-            else:
-                response.failure(f"Registration failed: {response.status_code}")
+    abstract = True
+    wait_time = constant_throughput(TASKS_PER_SECOND)
+
+    def on_start(self):
+        self.credentials = pool_credentials(self.environment)
+        self.logged_in = False
 
     def login_user(self):
         """Login via session cookies"""
-        login_data = {
-            "identifier": self.user_data["email"],
-            "password": self.user_data["password"],
-        }
-
         with self.client.post(
             "/api/session/login",
-            json=login_data,
+            json=self.credentials,
             name="Session Login",
             catch_response=True,
         ) as response:
             if response.status_code == 200:
                 response.success()
+                self.logged_in = True
             else:
                 response.failure(f"Login failed: {response.status_code}")
 
-    @task(5)
     def get_profile(self):
-        """Get profile using session cookie - most frequent operation"""
+        """Get profile using the session cookie"""
         with self.client.get(
             "/api/session/profile",
             name="Session Get Profile",
             catch_response=True,
+            allow_redirects=False,
         ) as response:
             if response.status_code == 200:
                 response.success()
             elif response.status_code in [401, 302]:
-                self.login_user()
+                response.failure("Session expired or invalid")
+                self.logged_in = False
             else:
                 response.failure(f"Profile access failed: {response.status_code}")
 
-    @task(1)
-    def logout_and_login_cycle(self):
-        """Occasionally logout and login again to test full cycle"""
-        # Logout
+    def logout_user(self):
+        """End the server-side login"""
         with self.client.post(
             "/api/session/logout",
             name="Session Logout",
@@ -85,51 +91,71 @@ class SessionAuthUser(HttpUser):
                 response.success()
             else:
                 response.failure(f"Logout failed: {response.status_code}")
+        self.logged_in = False
 
-        # Login again
-        self.login_user()
 
-    def on_stop(self):
-        """Called when user stops - cleanup"""
-        self.client.post("/api/session/logout", name="Session Logout")
+class ProfileReader(PooledSessionUser):
+    """Steady state: log in once, then only read the profile"""
 
+    def on_start(self):
+        super().on_start()
+        self.login_user()
 
-class SessionStressTest(HttpUser):
-    """Stress test with rapid requests"""
+    @task
+    def read_profile(self):
+        if not self.logged_in:
+            self.login_user()
+            return
+        self.get_profile()
 
-    wait_time = between(0.1, 0.5)  # Very short wait time for stress testing
 
-    def on_start(self):
-        """Quick setup for stress testing"""
-        self.user_data = generate_unique_user_data()
+class LoginStorm(PooledSessionUser):
+    """Every task is a fresh login (password hash + session cookie issue)"""
 
-        self.client.post(
-            "/api/session/register", json=self.user_data, name="Session Register"
-        )
+    @task
+    def login(self):
+        self.login_user()
 
-        login_data = {
-            "identifier": self.user_data["email"],
-            "password": self.user_data["password"],
-        }
-        self.client.post("/api/session/login", json=login_data, name="Session Login")
 
-    @task(10)
-    def rapid_profile_access(self):
-        """Rapid profile access for stress testing"""
-        self.client.get("/api/session/profile", name="Session Get Profile")
+class LogoutChurn(PooledSessionUser):
+    """Short sessions: login, one profile read, logout"""
 
+    @task
+    def session_cycle(self):
+        self.login_user()
+        if self.logged_in:
+            self.get_profile()
+            self.logout_user()
 
-# Normal load testing
-class LoadTest(SessionAuthUser):
-    """Normal load testing - recommended for general performance testing"""
 
-    weight = 1
+class MixedTraffic(PooledSessionUser):
+    """Realistic mix dominated by authenticated reads"""
 
+    def on_start(self):
+        super().on_start()
+        self.login_user()
 
-class StressTest(SessionStressTest):
-    """Stress testing - uncomment to enable"""
+    @task(16)
+    def read_profile(self):
+        if not self.logged_in:
+            self.login_user()
+            return
+        self.get_profile()
+
+    @task(2)
+    def relogin(self):
+        if self.logged_in:
+            self.logout_user()
+        self.login_user()
 
-    weight = 1
+    @task(1)
+    def register(self):
+        """Occasional new sign-up"""
+        self.client.post(
+            "/api/session/register",
+            json=generate_unique_user_data(),
+            name="Session Register",
+        )
 
 
 if __name__ == "__main__":
@@ -137,28 +163,30 @@ if __name__ == "__main__":
         """
     SESSION AUTHENTICATION PERFORMANCE TESTING
     =========================================
-    
-    Available Test Modes:
-    
-    1. LoadTest (Active): 
-       - Normal user behavior simulation
-       - 1-3 second wait between requests
-       - Mix of profile access and login/logout cycles
-    
-    2. StressTest (Disabled): 
-       - High-frequency requests
-       - 0.1-0.5 second wait between requests
-       - Rapid profile access
-       - Uncomment StressTest class above to enable
-    
+
+    Seed the user pool first (no per-user registration during the test):
+    flask --app run seed-users --count 1000
+
+    Scenarios (pass one or more class names, default runs all of them):
+
+    1. ProfileReader:  login once, then steady-state profile reads
+    2. LoginStorm:     repeated logins (password hash + session cookie issue)
+    3. LogoutChurn:    login -> profile -> logout cycles
+    4. MixedTraffic:   mostly profile reads with re-logins and sign-ups
+
+    Each simulated user runs LOCUST_TASKS_PER_SECOND tasks per second
+    (default 0.5), so the arrival rate is users x that rate.
+    LOCUST_USER_POOL_SIZE / LOCUST_USER_PREFIX / LOCUST_USER_PASSWORD must
+    match the seed-users options.
+
     Run Commands:
-    
+
     Basic Test:
     locust -f locustfile.py --host=http://127.0.0.1:5000
-    
-    Headless Test (10 users, 2 spawn rate, 30 seconds):
-    locust -f locustfile.py --host=http://127.0.0.1:5000 --users 10 --spawn-rate 2 --run-time 30s --headless
-    
+
+    Headless profile reads (500 users at 2 req/s each, 2 minutes):
+    LOCUST_TASKS_PER_SECOND=2 locust -f locustfile.py ProfileReader --host=http://127.0.0.1:5000 --users 500 --spawn-rate 50 --run-time 2m --headless
+
     Then open: http://localhost:8089 (for web UI)
     """
     )
@@ -0,0 +1,111 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from sqlalchemy import or_
+from app.session_api import load_user
+from app.session_model import db, SessionUser
+from auth_core.tenancy import TenantSessionInterface
+
+PASSWORD = "StrongPass123!"
+
+
+@pytest.fixture
+def stored_user(app):
+    """A user persisted in the test database"""
+    user = SessionUser(
+        first_name="Bench",
+        last_name="User",
+        username="benchuser",
+        email="bench@example.com",
+        password_hash=SessionUser.set_password(PASSWORD),
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.mark.benchmark(group="hash")
+class TestHashBenchmarks:
+    """Password hashing cost (dominates register and login)"""
+
+    def test_generate_password_hash(self, benchmark):
+        benchmark.pedantic(SessionUser.set_password, args=(PASSWORD,), rounds=5)
+
+    def test_check_password_hash(self, benchmark):
+        password_hash = SessionUser.set_password(PASSWORD)
+        assert benchmark.pedantic(
+            SessionUser.check_password, args=(password_hash, PASSWORD), rounds=5
+        )
+
+
+@pytest.mark.benchmark(group="session-cookie")
+class TestSessionCookieBenchmarks:
+    """Signed session cookie cost paid on login and on every authenticated request"""
+
+    def session_data(self, user_id):
+        return {"_user_id": user_id, "_fresh": True, "_id": "a" * 128}
+
+    def test_encode_session_cookie(self, app, benchmark):
+        serializer = app.session_interface.get_signing_serializer(app)
+        benchmark(serializer.dumps, self.session_data("5b6f9d2e-bench-user"))
+
+    def test_decode_session_cookie(self, app, benchmark):
+        serializer = app.session_interface.get_signing_serializer(app)
+        cookie = serializer.dumps(self.session_data("5b6f9d2e-bench-user"))
+        benchmark.extra_info["cookie_bytes"] = len(cookie)
+        assert benchmark(serializer.loads, cookie)["_user_id"] == "5b6f9d2e-bench-user"
+
+    def test_decode_legacy_session_cookie(self, app, benchmark):
+        serializer = TenantSessionInterface().get_signing_serializer(app)
+        cookie = serializer.dumps(self.session_data("5b6f9d2e-bench-user"))
+        benchmark.extra_info["cookie_bytes"] = len(cookie)
+        assert benchmark(serializer.loads, cookie)["_user_id"] == "5b6f9d2e-bench-user"
+
+
+@pytest.mark.benchmark(group="session-open")
+class TestSessionOpenBenchmarks:
+    """Per-request session cost of a request that never reads the session"""
+
+    def open_session(self, app, interface, benchmark):
+        cookie = interface.get_signing_serializer(app).dumps(
+            {"_user_id": "5b6f9d2e-bench-user", "_fresh": True, "_id": "a" * 18}
+        )
+        headers = {"Cookie": f"{app.config['SESSION_COOKIE_NAME']}={cookie}"}
+        with app.test_request_context("/health", headers=headers) as ctx:
+            benchmark(interface.open_session, app, ctx.request)
+
+    def test_open_session_lazy(self, app, benchmark):
+        self.open_session(app, app.session_interface, benchmark)
+
+    def test_open_session_eager(self, app, benchmark):
+        self.open_session(app, TenantSessionInterface(), benchmark)
+
+
+@pytest.mark.benchmark(group="user-load")
+class TestUserLoadBenchmarks:
+    """User row loads behind /profile and /login"""
+
+    def test_load_user_by_id(self, app, stored_user, benchmark):
+        user_id = stored_user.id
+
+        def load():
+            # Start from an empty identity map so every round hits the database
+            db.session.expunge_all()
+            return load_user(user_id)
+
+        assert benchmark(load).id == user_id
+
+    def test_load_user_by_identifier(self, app, stored_user, benchmark):
+        user_id = stored_user.id
+
+        def load():
+            db.session.expunge_all()
+            return SessionUser.query.filter(
+                or_(
+                    SessionUser.username == "bench@example.com",
+                    SessionUser.email == "bench@example.com",
+                )
+            ).first()
+
+        assert benchmark(load).id == user_id
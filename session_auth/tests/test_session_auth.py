@@ -1,4 +1,7 @@
 import pytest
+import base64
+import csv
+import io
 import json
 
 
@@ -127,7 +130,7 @@ class TestLogin:
         response = client.post("/api/session/login", json=login_data)
 
         assert response.status_code == 401
-        assert "Invalid username or email" in response.get_json()["error"]
+        assert response.get_json()["error"] == "Invalid credentials"
 
     def test_login_missing_fields(self, client):
         """Test login with missing required fields"""
@@ -247,5 +250,400 @@ class TestWorkflow:
             assert logout_response.status_code == 200
 
 
+class TestTenancy:
+    """Test tenant isolation"""
+
+    def register(self, client, user_data, tenant):
+        return client.post(
+            "/api/session/register", json=user_data, headers={"X-Tenant-ID": tenant}
+        )
+
+    def login(self, client, user_data, tenant):
+        login_data = {"identifier": user_data["email"], "password": user_data["password"]}
+        return client.post(
+            "/api/session/login", json=login_data, headers={"X-Tenant-ID": tenant}
+        )
+
+    def test_same_user_in_two_tenants(self, client, user_data):
+        """Test usernames and emails are only unique within a tenant"""
+        assert self.register(client, user_data, "acme").status_code == 201
+        assert self.register(client, user_data, "globex").status_code == 201
+        assert self.register(client, user_data, "acme").status_code == 409
+
+    def test_login_is_scoped_to_tenant(self, client, user_data):
+        """Test a user cannot log in through another tenant"""
+        self.register(client, user_data, "acme")
+        assert self.login(client, user_data, "globex").status_code == 401
+        assert self.login(client, user_data, "acme").status_code == 200
+
+    def test_session_rejected_by_other_tenant(self, client, user_data):
+        """Test a session cookie issued for one tenant is not accepted by another"""
+        self.register(client, user_data, "acme")
+        self.login(client, user_data, "acme")
+
+        from flask import g
+
+        response = client.get("/api/session/profile", headers={"X-Tenant-ID": "acme"})
+        assert response.status_code == 200
+
+        # The test app context outlives requests, so drop Flask-Login's cached user
+        g.pop("_login_user", None)
+        response = client.get("/api/session/profile", headers={"X-Tenant-ID": "globex"})
+        assert response.status_code == 302
+
+    def test_unknown_tenant_rejected(self, client, user_data):
+        """Test requests for unconfigured tenants are refused"""
+        response = self.register(client, user_data, "initech")
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "Unknown tenant"
+
+
+class TestReplicas:
+    """Test read-replica routing"""
+
+    @pytest.fixture
+    def replica_app(self, tmp_path, monkeypatch):
+        """App with an empty SQLite replica, so reads served by it find no users"""
+        from config import TestingConfig
+        from app import create_app
+        from app.session_model import db
+
+        monkeypatch.setattr(
+            TestingConfig, "SQLALCHEMY_REPLICA_URIS", [f"sqlite:///{tmp_path}/replica.db"]
+        )
+        app = create_app(config="testing")
+        with app.app_context():
+            db.metadata.create_all(app.extensions["replica_router"].engines["replica_0"])
+            yield app
+            db.session.remove()
+
+    def login(self, client, user_data):
+        login_data = {"identifier": user_data["email"], "password": user_data["password"]}
+        return client.post("/api/session/login", json=login_data)
+
+    def test_write_pins_client_to_primary(self, replica_app, user_data):
+        """Test a client reads its own registration from the primary"""
+        client = replica_app.test_client()
+        response = client.post("/api/session/register", json=user_data)
+
+        assert "db_pin" in response.headers["Set-Cookie"]
+        assert self.login(client, user_data).status_code == 200
+        assert client.get("/api/session/profile").status_code == 200
+
+    def test_reads_go_to_replica(self, replica_app, user_data):
+        """Test an unpinned client's login lookup is served by the (empty) replica"""
+        replica_app.test_client().post("/api/session/register", json=user_data)
+
+        assert self.login(replica_app.test_client(), user_data).status_code == 401
+
+    def test_session_user_loaded_from_replica(self, replica_app, user_data):
+        """Test the user behind a session is loaded from the replica once unpinned"""
+        from flask import g
+
+        client = replica_app.test_client()
+        client.post("/api/session/register", json=user_data)
+        self.login(client, user_data)
+        client.delete_cookie("db_pin")
+
+        g.pop("_login_user", None)
+        assert client.get("/api/session/profile").status_code == 302
+
+    def test_failed_replica_falls_back_to_primary(self, tmp_path, monkeypatch, user_data):
+        """Test an unreachable replica is skipped"""
+        from config import TestingConfig
+        from app import create_app
+
+        monkeypatch.setattr(
+            TestingConfig,
+            "SQLALCHEMY_REPLICA_URIS",
+            [f"sqlite:///{tmp_path}/missing/replica.db"],
+        )
+        app = create_app(config="testing")
+        with app.app_context():
+            app.test_client().post("/api/session/register", json=user_data)
+            assert self.login(app.test_client(), user_data).status_code == 200
+            assert app.extensions["replica_router"].down_until
+
+
+class TestCompactSession:
+    """Test the compact, lazily verified session cookies"""
+
+    def login(self, client, user_data, remember=False):
+        client.post("/api/session/register", json=user_data)
+        login_data = {
+            "identifier": user_data["username"],
+            "password": user_data["password"],
+            "remember": remember,
+        }
+        return client.post("/api/session/login", json=login_data)
+
+    def test_cookies_are_compact(self, client, user_data):
+        """Test login cookies use short keys, identifiers and signatures"""
+        response = self.login(client, user_data, remember=True)
+        cookies = dict(
+            header.split(";")[0].split("=", 1)
+            for header in response.headers.getlist("Set-Cookie")
+        )
+
+        assert len(cookies["session"]) < 160
+        user_id, _, signature = cookies["remember_token"].rpartition(".")
+        assert len(user_id) == 36 and len(signature) == 22
+        assert client.get("/api/session/profile").status_code == 200
+
+    def test_remember_cookie_restores_session(self, client, user_data):
+        """Test the compact remember cookie logs the user back in"""
+        from flask import g
+
+        self.login(client, user_data, remember=True)
+        client.delete_cookie("session")
+        g.pop("_login_user", None)
+
+        assert client.get("/api/session/profile").status_code == 200
+
+    def test_legacy_cookie_accepted(self, app, client, user_data):
+        """Test sessions issued before the compact format stay valid and get rewritten"""
+        from flask import g
+        from app.session_model import SessionUser
+        from auth_core.tenancy import TenantSessionInterface
+
+        client.post("/api/session/register", json=user_data)
+        user = SessionUser.query.filter_by(username=user_data["username"]).first()
+        legacy = TenantSessionInterface().get_signing_serializer(app)
+        client.set_cookie("session", legacy.dumps({"_user_id": user.id, "_fresh": True}))
+        g.pop("_login_user", None)
+
+        response = client.get("/api/session/profile")
+        assert response.status_code == 200
+        rewritten = client.get_cookie("session").value
+        assert app.session_interface.get_signing_serializer(app).loads(rewritten)
+
+    def test_untouched_session_not_verified(self, client, user_data, monkeypatch):
+        """Test requests that never read the session skip its signature check"""
+        from flask import g
+        from app.compact_session import TruncatedHMACAlgorithm
+
+        self.login(client, user_data)
+        g.pop("_login_user", None)
+
+        verified = []
+        get_signature = TruncatedHMACAlgorithm.get_signature
+        monkeypatch.setattr(
+            TruncatedHMACAlgorithm,
+            "get_signature",
+            lambda self, key, value: verified.append(value) or get_signature(self, key, value),
+        )
+
+        response = client.get("/health")
+        assert not verified
+        assert "Cookie" not in response.headers.get("Vary", "")
+
+        assert client.get("/api/session/profile").status_code == 200
+        assert verified
+
+
+class TestAudit:
+    """Test the buffered audit event log"""
+
+    @pytest.fixture
+    def audit_app(self, tmp_path, monkeypatch):
+        """App writing audit events to JSONL segments in a temporary folder"""
+        from config import TestingConfig
+        from app import create_app
+        from app.session_model import db
+
+        monkeypatch.setattr(TestingConfig, "AUDIT_ENABLED", True, raising=False)
+        monkeypatch.setattr(TestingConfig, "AUDIT_DIR", str(tmp_path), raising=False)
+        # Only explicit flushes write, so the tests see every event at once
+        monkeypatch.setattr(TestingConfig, "AUDIT_FLUSH_INTERVAL", 60)
+        app = create_app(config="testing")
+        with app.app_context():
+            yield app
+            db.session.remove()
+
+    def read_events(self, directory):
+        events = []
+        for path in sorted(directory.iterdir()):
+            with open(path) as f:
+                events.extend(json.loads(line) for line in f)
+        return events
+
+    def test_auth_events_are_written_in_a_batch(self, audit_app, user_data, tmp_path):
+        """Test register, login, failed login and logout events reach the segment file"""
+        from auth_core.audit import audit
+
+        client = audit_app.test_client()
+        client.post("/api/session/register", json=user_data)
+        client.post(
+            "/api/session/login", json={"identifier": "testuser", "password": "wrong"}
+        )
+        client.post(
+            "/api/session/login",
+            json={"identifier": "testuser", "password": user_data["password"]},
+        )
+        client.post("/api/session/logout")
+
+        # Nothing is written while handling the requests
+        assert list(tmp_path.iterdir()) == []
+        audit.flush()
+
+        events = self.read_events(tmp_path)
+        assert [e["event"] for e in events] == [
+            "register",
+            "login_failed",
+            "login",
+            "logout",
+        ]
+        assert events[1]["reason"] == "bad_password"
+        assert events[2]["remember"] is False
+        assert len({e["user_id"] for e in events}) == 1
+
+    def test_disabled_in_tests(self, app):
+        """Test recording is a no-op when AUDIT_ENABLED is off"""
+        from auth_core.audit import audit
+
+        assert app.extensions["audit"] is None
+        audit.record("login", user_id=1)
+
+
+class TestLockout:
+    """Test locking out identifiers and IPs after failed logins"""
+
+    def login(self, client, identifier, password):
+        return client.post(
+            "/api/session/login", json={"identifier": identifier, "password": password}
+        )
+
+    def test_identifier_locked_after_failures(self, client, user_data):
+        """Test even the right password is refused once the identifier is locked"""
+        client.post("/api/session/register", json=user_data)
+        for _ in range(5):
+            assert self.login(client, "testuser", "wrong").status_code == 401
+
+        response = self.login(client, "testuser", user_data["password"])
+        assert response.status_code == 429
+        assert "failed login attempts" in response.get_json()["error"]
+        assert int(response.headers["Retry-After"]) == 30
+
+    def test_success_clears_failures(self, client, user_data):
+        """Test a successful login resets the identifier's count"""
+        client.post("/api/session/register", json=user_data)
+        for _ in range(2):
+            for _ in range(4):
+                assert self.login(client, "testuser", "wrong").status_code == 401
+            assert self.login(client, "testuser", user_data["password"]).status_code == 200
+
+
+class TestUserExport:
+    """Test the admin user export endpoint"""
+
+    ADMIN = {"Authorization": "Basic " + base64.b64encode(b"ops:ops-secret").decode()}
+
+    def test_requires_admin_credentials(self, client):
+        response = client.get("/api/session/admin/users:export")
+        assert response.status_code == 401
+
+    def test_streams_users_without_password_hashes(self, client, user_data):
+        client.post("/api/session/register", json=user_data)
+        response = client.get("/api/session/admin/users:export", headers=self.ADMIN)
+
+        assert response.status_code == 200
+        assert response.headers["Content-Disposition"] == "attachment; filename=session_users.csv"
+        records = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        assert [record["email"] for record in records] == [user_data["email"]]
+        assert "password_hash" not in records[0]
+
+
+class TestUserListing:
+    """Test the keyset-paginated admin user listing"""
+
+    def test_pages_follow_the_cursor(self, client):
+        for name in ["carol", "alice", "bob"]:
+            user = {
+                "first_name": "List",
+                "last_name": name.title(),
+                "username": name,
+                "email": f"{name}@example.com",
+                "password": "StrongPass123!",
+            }
+            client.post("/api/session/register", json=user)
+
+        headers = TestUserExport.ADMIN
+        first = client.get("/api/session/admin/users?limit=2", headers=headers).get_json()
+        assert [user["username"] for user in first["users"]] == ["alice", "bob"]
+        second = client.get(
+            "/api/session/admin/users",
+            query_string={"limit": 2, "cursor": first["next_cursor"]},
+            headers=headers,
+        ).get_json()
+        assert second["next_cursor"] is None
+        assert [user["username"] for user in second["users"]] == ["carol"]
+
+    def test_prefix_search(self, client, user_data):
+        client.post("/api/session/register", json=user_data)
+        response = client.get(
+            "/api/session/admin/users?prefix=test@&sort=email", headers=TestUserExport.ADMIN
+        )
+        assert [user["email"] for user in response.get_json()["users"]] == [user_data["email"]]
+
+
+class TestRateLimit:
+    """Test throttling of login and registration"""
+
+    def test_login_identifier_limit(self, app, client, user_data):
+        """Test repeated attempts against one identifier are rejected with 429"""
+        app.config["RATELIMIT_RULES"] = {"login": {"identifier": (3, 60)}}
+        client.post("/api/session/register", json=user_data)
+        login_data = {"identifier": user_data["email"], "password": "WrongPass123"}
+
+        for _ in range(3):
+            response = client.post("/api/session/login", json=login_data)
+            assert response.status_code == 401
+
+        response = client.post("/api/session/login", json=login_data)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+
+    def test_register_ip_limit(self, app, client, user_data):
+        """Test registration is throttled per IP"""
+        app.config["RATELIMIT_RULES"] = {"register": {"ip": (1, 60)}}
+        assert client.post("/api/session/register", json=user_data).status_code == 201
+        assert client.post("/api/session/register", json=user_data).status_code == 429
+
+
+class TestProductionServer:
+    """Test the Gunicorn launcher configuration"""
+
+    def test_server_options(self, app):
+        """Test workers are preloaded, threaded and recycled with jitter"""
+        from auth_core.server import ProductionServer
+
+        server = ProductionServer(
+            app, {"bind": "127.0.0.1:0", "workers": 3, "threads": 4, "max_requests": 1000}
+        )
+
+        assert server.load() is app
+        assert server.cfg.preload_app is True
+        assert server.cfg.workers == 3
+        assert server.cfg.threads == 4
+        assert server.cfg.worker_class_str == "gthread"
+        assert server.cfg.max_requests == 1000
+
+
+class TestMetrics:
+    """Test the Prometheus metrics endpoint"""
+
+    def test_login_breakdown(self, client, user_data):
+        """Test login latency, status and hash time are exported per route"""
+        client.post("/api/session/register", json=user_data)
+        login_data = {"identifier": user_data["email"], "password": user_data["password"]}
+        client.post("/api/session/login", json=login_data)
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        body = response.get_data(as_text=True)
+        assert 'endpoint="session_auth.login",method="POST",status="200"' in body
+        assert 'auth_dependency_duration_seconds_count{dependency="hash",endpoint="session_auth.login"}' in body
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])